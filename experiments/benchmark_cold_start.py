@@ -0,0 +1,53 @@
+"""
+Cold-start time of a trained pipeline: constructing it from the dataset versus loading a saved artifact.
+
+Usage:
+    python experiments/benchmark_cold_start.py mutagen gnn --subgraphs --chem_rules
+"""
+
+import argparse
+import tempfile
+import time
+
+from chemlogic.utils.Pipeline import Pipeline
+
+
+def benchmark(dataset_name, model_name, repeats=3, **kwargs):
+    pipeline = Pipeline(dataset_name, model_name, 3, 3, **kwargs)
+    pipeline.train_test_cycle(epochs=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline.save(directory)
+
+        construct_times, load_times = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            Pipeline(dataset_name, model_name, 3, 3, **kwargs)
+            construct_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            Pipeline.load(directory)
+            load_times.append(time.perf_counter() - start)
+
+    print(
+        f"{dataset_name} | {model_name} | Construct: {min(construct_times):.3f}s | Load (incl. evaluator): {min(load_times):.3f}s"
+    )
+    return min(construct_times), min(load_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset_name")
+    parser.add_argument("model_name")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--chem_rules", action="store_true")
+    parser.add_argument("--subgraphs", action="store_true")
+    args = parser.parse_args()
+
+    benchmark(
+        args.dataset_name,
+        args.model_name,
+        repeats=args.repeats,
+        chem_rules=args.chem_rules,
+        subgraphs=args.subgraphs,
+    )
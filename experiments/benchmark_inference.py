@@ -0,0 +1,59 @@
+"""
+Latency and throughput of the InferenceEngine compared to `Pipeline.inference`.
+
+Usage:
+    python experiments/benchmark_inference.py path/to/saved/pipeline --requests 200 --request_size 1 16
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from chemlogic.utils.InferenceEngine import InferenceEngine
+
+SMILES = [
+    "CC(=O)Oc1ccccc1C(=O)O",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C",
+    "c1ccc2c(c1)ccc1ccccc12",
+    "O=[N+]([O-])c1ccc(Cl)cc1",
+    "CCN(CC)CCOC(=O)c1ccc(N)cc1",
+    "Nc1ccc(cc1)S(=O)(=O)Nc1ccccn1",
+    "CC(C)Cc1ccc(cc1)C(C)C(=O)O",
+    "OC(=O)CCCCC(=O)O",
+]
+
+
+def benchmark(path, requests=200, request_sizes=(1, 16), batch_size=64, seed=0):
+    engine = InferenceEngine.load(path, batch_size=batch_size)
+    rng = random.Random(seed)
+
+    for size in request_sizes:
+        engine.reset_stats()
+        for _ in range(requests):
+            engine.predict([rng.choice(SMILES) for _ in range(size)])
+        stats = engine.stats()
+        print(
+            f"Engine | request size: {size} | p50: {stats['p50_latency'] * 1000:.1f}ms | p99: {stats['p99_latency'] * 1000:.1f}ms | {stats['throughput']:.1f} molecules/s"
+        )
+
+        latencies = []
+        for _ in range(min(requests, 20)):
+            start = time.perf_counter()
+            engine.pipeline.inference([rng.choice(SMILES) for _ in range(size)])
+            latencies.append(time.perf_counter() - start)
+        print(
+            f"Pipeline.inference | request size: {size} | p50: {np.percentile(latencies, 50) * 1000:.1f}ms | p99: {np.percentile(latencies, 99) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="Directory of a pipeline saved by `Pipeline.save`")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--request_size", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--batch_size", type=int, default=64)
+    args = parser.parse_args()
+
+    benchmark(args.path, args.requests, args.request_size, args.batch_size)
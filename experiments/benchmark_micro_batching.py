@@ -0,0 +1,58 @@
+"""
+Latency and batch sizes of the AsyncInferenceEngine under synthetic single-molecule traffic.
+
+Usage:
+    python experiments/benchmark_micro_batching.py path/to/saved/pipeline --rate 500 --max_wait 0.005
+"""
+
+import argparse
+import asyncio
+
+import numpy as np
+
+from chemlogic.utils.AsyncInferenceEngine import (
+    AsyncInferenceEngine,
+    synthetic_requests,
+)
+from chemlogic.utils.InferenceEngine import InferenceEngine
+
+SMILES = [
+    "CC(=O)Oc1ccccc1C(=O)O",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C",
+    "c1ccc2c(c1)ccc1ccccc12",
+    "O=[N+]([O-])c1ccc(Cl)cc1",
+    "CCN(CC)CCOC(=O)c1ccc(N)cc1",
+    "Nc1ccc(cc1)S(=O)(=O)Nc1ccccn1",
+    "CC(C)Cc1ccc(cc1)C(C)C(=O)O",
+    "OC(=O)CCCCC(=O)O",
+]
+
+
+async def benchmark(path, requests, rate, max_batch_sizes, max_wait):
+    engine = InferenceEngine.load(path, batch_size=max(max_batch_sizes))
+
+    for max_batch_size in max_batch_sizes:
+        engine.reset_stats()
+        async with AsyncInferenceEngine(engine, max_batch_size, max_wait) as batcher:
+            _, latencies = await synthetic_requests(batcher, SMILES, requests, rate)
+            stats = batcher.stats()
+
+        print(
+            f"Max batch size: {max_batch_size} | p50: {np.percentile(latencies, 50) * 1000:.1f}ms | p99: {np.percentile(latencies, 99) * 1000:.1f}ms | Batches: {stats['batches']} | Mean batch size: {stats['mean_batch_size']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="Directory of a pipeline saved by `Pipeline.save`")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=500.0, help="Requests per second")
+    parser.add_argument("--max_batch_size", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max_wait", type=float, default=0.005)
+    args = parser.parse_args()
+
+    asyncio.run(
+        benchmark(
+            args.path, args.requests, args.rate, args.max_batch_size, args.max_wait
+        )
+    )
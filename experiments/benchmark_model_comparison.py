@@ -0,0 +1,85 @@
+"""
+Model selection on a single grounding: one composed comparison pipeline compared to a pipeline per model.
+
+Usage:
+    python experiments/benchmark_model_comparison.py mutagen --models gnn rgcn kgnn ego diffusion cw sgn --chem_rules
+"""
+
+import argparse
+import csv
+import time
+
+from chemlogic.utils.Pipeline import Pipeline
+
+
+def run(name, pipeline, epochs):
+    start = time.perf_counter()
+    train_loss, test_loss, metric, _ = pipeline.train_test_cycle(epochs=epochs)
+    total_time = time.perf_counter() - start
+
+    print(f"{name} | metric: {metric} | time: {total_time:.2f}s")
+    return {
+        "pipeline": name,
+        "train_loss": train_loss,
+        "test_loss": test_loss,
+        "metric": metric,
+        "time": total_time,
+    }
+
+
+def benchmark(dataset_name, models, epochs, param_size=3, layers=3, **kwargs):
+    rows = [
+        run(
+            model,
+            Pipeline(dataset_name, model, param_size, layers, **kwargs),
+            epochs,
+        )
+        for model in models
+    ]
+    separate_time = sum(row["time"] for row in rows)
+
+    pipeline = Pipeline(dataset_name, models, param_size, layers, **kwargs)
+    composed = run("composed", pipeline, epochs)
+    for model in models:
+        test_loss, metric = pipeline.task_scores[model]
+        rows.append(
+            {
+                "pipeline": f"composed_{model}",
+                "test_loss": test_loss,
+                "metric": metric,
+            }
+        )
+
+    print(
+        f"Separate: {separate_time:.2f}s | Composed: {composed['time']:.2f}s | Speedup: {separate_time / composed['time']:.2f}x"
+    )
+    return rows + [composed]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset")
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=["gnn", "rgcn", "kgnn", "ego", "diffusion", "cw", "sgn"],
+    )
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--chem_rules", action="store_true")
+    parser.add_argument("--subgraphs", action="store_true")
+    parser.add_argument("--output", default="experiments/model_comparison.csv")
+    args = parser.parse_args()
+
+    results = benchmark(
+        args.dataset,
+        args.models,
+        args.epochs,
+        chem_rules=args.chem_rules,
+        subgraphs=args.subgraphs,
+    )
+
+    fieldnames = list(results[-1].keys())
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+        writer.writeheader()
+        writer.writerows(results)
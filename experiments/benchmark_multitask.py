@@ -0,0 +1,105 @@
+"""
+Build and training throughput per task label: one multi-task pipeline compared to a pipeline per task.
+
+Usage:
+    python experiments/benchmark_multitask.py cyp2c9_substrate cyp2d6_substrate cyp3a4_substrate --model gnn --epochs 5
+"""
+
+import argparse
+import csv
+import time
+
+from neuralogic.core import Settings
+from neuralogic.nn import get_evaluator
+from neuralogic.optim import Adam
+
+from chemlogic.datasets import MultiTaskDataset
+from chemlogic.utils.Pipeline import Pipeline
+
+
+def measure(name, pipeline, epochs):
+    evaluator = get_evaluator(
+        pipeline.template, Settings(optimizer=Adam(lr=0.001), epochs=epochs)
+    )
+
+    start = time.perf_counter()
+    samples = pipeline._build_dataset(evaluator).samples
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(epochs):
+        next(evaluator.train(samples))
+    train_time = time.perf_counter() - start
+
+    print(
+        f"{name} | labels: {len(samples)} | build: {build_time:.2f}s | training: {train_time:.2f}s"
+    )
+    return {
+        "pipeline": name,
+        "labels": len(samples),
+        "build_time": build_time,
+        "train_time": train_time,
+    }
+
+
+def benchmark(tasks, model_name, epochs, param_size=3, layers=3, **kwargs):
+    rows = [
+        measure(
+            task,
+            Pipeline(task, model_name, param_size, layers, **kwargs),
+            epochs,
+        )
+        for task in tasks
+    ]
+    separate = {
+        "pipeline": "separate",
+        "labels": sum(row["labels"] for row in rows),
+        "build_time": sum(row["build_time"] for row in rows),
+        "train_time": sum(row["train_time"] for row in rows),
+    }
+
+    multitask = measure(
+        "multitask",
+        Pipeline(
+            "multitask",
+            model_name,
+            param_size,
+            layers,
+            dataset=MultiTaskDataset(tasks, param_size),
+            **kwargs,
+        ),
+        epochs,
+    )
+
+    for row in [separate, multitask]:
+        row["labels_per_second"] = row["labels"] * epochs / row["train_time"]
+        row["build_labels_per_second"] = row["labels"] / row["build_time"]
+        print(
+            f"{row['pipeline']} | labels: {row['labels']} | build: {row['build_labels_per_second']:.1f} labels/s | training: {row['labels_per_second']:.1f} labels/s"
+        )
+    return rows + [separate, multitask]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tasks", nargs="+")
+    parser.add_argument("--model", default="gnn")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--chem_rules", action="store_true")
+    parser.add_argument("--subgraphs", action="store_true")
+    parser.add_argument("--output", default="experiments/multitask.csv")
+    args = parser.parse_args()
+
+    results = benchmark(
+        args.tasks,
+        args.model,
+        args.epochs,
+        chem_rules=args.chem_rules,
+        subgraphs=args.subgraphs,
+    )
+
+    fieldnames = list(results[-1].keys())
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,117 @@
+"""
+Wall-clock scaling of the concurrent sharded dataset build, see `build_dataset_sharded`.
+
+With --verify, the neuron counts and predictions of the samples built concurrently are compared to
+the sequentially built ones, checking that the concurrent shard builds do not interfere.
+
+Usage:
+    python experiments/benchmark_parallel_build.py mutagen gnn --workers 1 2 4 8 16 32 --verify
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+from neuralogic.core import Settings
+from neuralogic.nn import get_evaluator
+
+from chemlogic.utils.Pipeline import Pipeline
+from chemlogic.utils.sharding import build_dataset_sharded
+
+
+def fingerprint(evaluator, built_dataset):
+    """Neuron count and prediction of every sample."""
+    neurons = [
+        len(sample.java_sample.query.evidence.allNeuronsTopologic)
+        for sample in built_dataset.samples
+    ]
+    predictions = np.asarray(
+        list(evaluator.test(built_dataset, generator=False)), dtype=float
+    )
+    return neurons, predictions
+
+
+def benchmark(
+    dataset_name, model_name, workers, repeats=1, batches=1, verify=False, **kwargs
+):
+    pipeline = Pipeline(dataset_name, model_name, 3, 3, **kwargs)
+    evaluator = get_evaluator(pipeline.template, Settings())
+
+    reference = None
+    if verify:
+        reference = fingerprint(evaluator, pipeline._build_dataset(evaluator, batches))
+
+    rows = []
+    for worker_count in workers:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            built_dataset = build_dataset_sharded(
+                evaluator,
+                pipeline.dataset.data,
+                worker_count,
+                batch_size=batches,
+                connection=pipeline.dataset.connection,
+                concurrent=True,
+            )
+            times.append(time.perf_counter() - start)
+
+        best = min(times)
+        rows.append(
+            {
+                "dataset": dataset_name,
+                "model": model_name,
+                "workers": worker_count,
+                "samples": len(built_dataset.samples),
+                "time": best,
+                "speedup": rows[0]["time"] / best if rows else 1.0,
+            }
+        )
+        if verify:
+            neurons, predictions = fingerprint(evaluator, built_dataset)
+            rows[-1]["matches"] = neurons == reference[0] and np.allclose(
+                predictions, reference[1]
+            )
+            print(f"Identical to the sequential build: {rows[-1]['matches']}")
+        print(
+            f"{dataset_name} | workers: {worker_count} | time: {best:.2f}s | speedup: {rows[-1]['speedup']:.2f}x"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset_name")
+    parser.add_argument("model_name")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()]
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batches", type=int, default=1)
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Compare the samples to a sequential build.",
+    )
+    parser.add_argument("--chem_rules", action="store_true")
+    parser.add_argument("--subgraphs", action="store_true")
+    parser.add_argument("--output", default="experiments/parallel_build.csv")
+    args = parser.parse_args()
+
+    results = benchmark(
+        args.dataset_name,
+        args.model_name,
+        args.workers,
+        repeats=args.repeats,
+        batches=args.batches,
+        verify=args.verify,
+        chem_rules=args.chem_rules,
+        subgraphs=args.subgraphs,
+    )
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,96 @@
+"""
+Total study wall time with and without pruning of the trials by their intermediate validation scores.
+
+Usage:
+    python experiments/benchmark_pruning.py mutagen --model gnn --trials 30 --pruners none median hyperband
+"""
+
+import argparse
+import csv
+import time
+
+import optuna
+
+from chemlogic.main import main
+
+PRUNERS = {
+    "none": optuna.pruners.NopPruner,
+    "median": lambda: optuna.pruners.MedianPruner(
+        n_startup_trials=5, n_warmup_steps=20
+    ),
+    "hyperband": lambda: optuna.pruners.HyperbandPruner(min_resource=10),
+}
+
+
+def run_study(pruner_name, dataset_name, model_name, trials, seed, **kwargs):
+    study = optuna.create_study(
+        study_name=f"{model_name}_{dataset_name}_{pruner_name}",
+        direction="maximize",
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=PRUNERS[pruner_name](),
+    )
+
+    def objective(trial):
+        return main(
+            trial,
+            dataset_name,
+            model_name,
+            pruning=pruner_name != "none",
+            **kwargs,
+        )[0]
+
+    start = time.perf_counter()
+    study.optimize(objective, n_trials=trials)
+    wall_time = time.perf_counter() - start
+
+    states = [trial.state for trial in study.trials]
+    row = {
+        "pruner": pruner_name,
+        "trials": trials,
+        "complete": states.count(optuna.trial.TrialState.COMPLETE),
+        "pruned": states.count(optuna.trial.TrialState.PRUNED),
+        "best_value": study.best_value,
+        "wall_time": wall_time,
+    }
+    print(
+        f"{pruner_name} | complete: {row['complete']} | pruned: {row['pruned']} | best: {row['best_value']:.4f} | wall time: {wall_time:.1f}s"
+    )
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset", nargs="?", default="mutagen")
+    parser.add_argument("--model", default="gnn")
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument(
+        "--pruners", nargs="+", default=["none", "median"], choices=list(PRUNERS)
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chem_rules", action="store_true")
+    parser.add_argument("--subgraphs", action="store_true")
+    parser.add_argument("--output", default="experiments/pruning.csv")
+    args = parser.parse_args()
+
+    results = [
+        run_study(
+            pruner,
+            args.dataset,
+            args.model,
+            args.trials,
+            args.seed,
+            chemical_rules=args.chem_rules,
+            subgraphs=args.subgraphs,
+            architecture="BARE",
+        )
+        for pruner in args.pruners
+    ]
+
+    baseline = results[0]["wall_time"]
+    for row in results:
+        row["speedup"] = baseline / row["wall_time"]
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,103 @@
+"""
+Successive halving on stratified data subsets compared to training every configuration on the full dataset.
+
+Usage:
+    python experiments/benchmark_successive_halving.py mutagen --model gnn --configs 27 --chem_rules --subgraphs
+"""
+
+import argparse
+import csv
+import time
+
+import optuna
+
+from chemlogic.main import main
+from chemlogic.utils.search import successive_halving
+
+
+def create_study(name, seed):
+    return optuna.create_study(
+        study_name=name,
+        direction="maximize",
+        sampler=optuna.samplers.TPESampler(seed=seed),
+    )
+
+
+def benchmark(dataset_name, model_name, configs, eta, seed, full, **kwargs):
+    rows = []
+
+    start = time.perf_counter()
+    result = successive_halving(
+        create_study("successive_halving", seed),
+        n_configs=configs,
+        eta=eta,
+        seed=seed,
+        dataset_name=dataset_name,
+        model_name=model_name,
+        **kwargs,
+    )
+    rows.append(
+        {
+            "search": "successive_halving",
+            "configurations": configs,
+            "best_value": result["best_value"],
+            "relative_compute": result["relative_compute"],
+            "wall_time": time.perf_counter() - start,
+        }
+    )
+
+    if full:
+        study = create_study("full", seed)
+        start = time.perf_counter()
+        study.optimize(
+            lambda trial: main(trial, dataset_name, model_name, **kwargs)[0],
+            n_trials=configs,
+        )
+        rows.append(
+            {
+                "search": "full",
+                "configurations": configs,
+                "best_value": study.best_value,
+                "relative_compute": 1.0,
+                "wall_time": time.perf_counter() - start,
+            }
+        )
+
+    for row in rows:
+        print(
+            f"{row['search']} | best: {row['best_value']} | compute: {row['relative_compute']:.3f} | wall time: {row['wall_time']:.1f}s"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset", nargs="?", default="mutagen")
+    parser.add_argument("--model", default="gnn")
+    parser.add_argument("--configs", type=int, default=27)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip_full", action="store_true", help="Do not run the full-fidelity search."
+    )
+    parser.add_argument("--chem_rules", action="store_true")
+    parser.add_argument("--subgraphs", action="store_true")
+    parser.add_argument("--output", default="experiments/successive_halving.csv")
+    args = parser.parse_args()
+
+    results = benchmark(
+        args.dataset,
+        args.model,
+        args.configs,
+        args.eta,
+        args.seed,
+        not args.skip_full,
+        chemical_rules=args.chem_rules,
+        subgraphs=args.subgraphs,
+        architecture="BARE",
+    )
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,129 @@
+import argparse
+
+from chemlogic.utils.InferenceEngine import InferenceEngine
+from chemlogic.utils.screening import screen
+from chemlogic.utils.search import PRUNERS, parallel_search
+
+
+def screen_command(args):
+    # Every worker has its own evaluator, the evaluation of a single evaluator is serialized
+    engines = [
+        InferenceEngine.load(args.model, batch_size=args.chunk_size)
+        for _ in range(args.workers)
+    ]
+
+    stats = screen(
+        engines,
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size,
+        top_k=args.top_k,
+        ascending=args.ascending,
+        smiles_column=args.smiles_column,
+        id_column=args.id_column,
+        report_interval=args.report_interval,
+    )
+    print(
+        f"Screened: {stats['molecules']} | Invalid: {stats['invalid']} | Time: {stats['time']:.1f}s | {stats['throughput']:.1f} molecules/s"
+    )
+
+
+def search_command(args):
+    study = parallel_search(
+        args.study_name or f"{args.model_name}_{args.dataset_name}_{args.architecture}",
+        args.storage,
+        args.trials,
+        workers=args.workers,
+        tracking_uri=args.tracking_uri,
+        seed=args.seed,
+        pruner=args.pruner,
+        repeats=args.repeats,
+        dataset_name=args.dataset_name,
+        model_name=args.model_name,
+        chemical_rules=args.chem_rules,
+        subgraphs=args.subgraphs,
+        architecture=args.architecture,
+        batches=args.batches,
+    )
+    states = [trial.state.name for trial in study.trials]
+    print(
+        f"Trials: {len(states)} | Complete: {states.count('COMPLETE')} | Pruned: {states.count('PRUNED')} | Failed: {states.count('FAIL')}"
+    )
+    if "COMPLETE" in states:
+        print(f"Best value: {study.best_value} | Best parameters: {study.best_params}")
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="chemlogic")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    screen_parser = subparsers.add_parser(
+        "screen", help="Score a SMILES library with a saved model."
+    )
+    screen_parser.add_argument(
+        "model", help="Directory of a pipeline saved by `Pipeline.save`."
+    )
+    screen_parser.add_argument("input", help="A `.smi` or `.csv` file of molecules.")
+    screen_parser.add_argument("output", help="The CSV file to write predictions to.")
+    screen_parser.add_argument("--workers", type=int, default=1)
+    screen_parser.add_argument("--chunk-size", type=int, default=1000)
+    screen_parser.add_argument(
+        "--top-k", type=int, default=None, help="Keep only the best k molecules."
+    )
+    screen_parser.add_argument(
+        "--ascending",
+        action="store_true",
+        help="With --top-k, keep the lowest predictions.",
+    )
+    screen_parser.add_argument("--smiles-column", default="smiles")
+    screen_parser.add_argument("--id-column", default=None)
+    screen_parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between progress reports.",
+    )
+    screen_parser.set_defaults(func=screen_command)
+
+    search_parser = subparsers.add_parser(
+        "search", help="Run a parallel hyperparameter search."
+    )
+    search_parser.add_argument("dataset_name")
+    search_parser.add_argument("model_name")
+    search_parser.add_argument("--trials", type=int, default=200)
+    search_parser.add_argument(
+        "--workers", type=int, default=None, help="Defaults to the number of CPUs."
+    )
+    search_parser.add_argument(
+        "--storage",
+        default="study.log",
+        help="A journal file, or a SQLite database for .db/.sqlite paths.",
+    )
+    search_parser.add_argument("--tracking-uri", default="mlruns")
+    search_parser.add_argument("--study-name", default=None)
+    search_parser.add_argument("--seed", type=int, default=None)
+    search_parser.add_argument("--pruner", choices=list(PRUNERS), default=None)
+    search_parser.add_argument("--chem-rules", action="store_true")
+    search_parser.add_argument("--subgraphs", action="store_true")
+    search_parser.add_argument(
+        "--architecture", choices=["BARE", "CCE", "CCD"], default="BARE"
+    )
+    search_parser.add_argument("--batches", type=int, default=1)
+    search_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=None,
+        help="Memoize the configurations, aggregating up to this many differently seeded runs of a repeated one.",
+    )
+    search_parser.set_defaults(func=search_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -105,10 +105,39 @@ class Dataset(Template):
         self.data = self.load_data()
         self.create_template()
 
-    def load_data(self):
+    def vocabulary(self) -> dict:
+        """Returns the dataset vocabulary (predicate names, atom and bond types), i.e. the constructor arguments."""
+        return {
+            "dataset_name": self.dataset_name,
+            "node_embed": self.node_embed,
+            "edge_embed": self.edge_embed,
+            "connection": self.connection,
+            "atom_types": self.atom_types,
+            "key_atom_type": self.key_atom_type,
+            "bond_types": self.bond_types,
+            "single_bond": self.single_bond,
+            "double_bond": self.double_bond,
+            "triple_bond": self.triple_bond,
+            "aliphatic_bonds": self.aliphatic_bonds,
+            "aromatic_bonds": self.aromatic_bonds,
+            "carbon": self.carbon,
+            "oxygen": self.oxygen,
+            "hydrogen": self.hydrogen,
+            "nitrogen": self.nitrogen,
+            "sulfur": self.sulfur,
+            "halogens": self.halogens,
+            "param_size": self.param_size,
+        }
+
+    @staticmethod
+    def dataset_directory(dataset_name: str) -> Path:
+        """Returns the directory of a bundled dataset."""
         # Get the path to the current file and navigate to the package root
         src_dir = Path(__file__).resolve().parent.parent
-        dataset_path = src_dir / "data" / "datasets" / self.dataset_name
+        return src_dir / "data" / "datasets" / dataset_name
+
+    def load_data(self):
+        dataset_path = self.dataset_directory(self.dataset_name)
         if not os.path.isdir(dataset_path):
             raise FileNotFoundError(f"The directory '{dataset_path}' does not exist.")
 
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+from neuralogic.dataset import FileDataset
+
+from chemlogic.datasets.CustomDataset import CustomDataset
+from chemlogic.datasets.utils.molecules import read_examples, read_queries
+
+
+class MultiTaskDataset(CustomDataset):
+    def __init__(
+        self,
+        datasets,
+        param_size: int,
+        dataset_name: str = "multitask",
+        output_directory: str = None,
+    ):
+        """
+        Create a multi-task dataset from datasets sharing molecules, e.g. the `cyp*_substrate` datasets.
+
+        Molecules with identical facts are merged into a single example carrying one query per task, named
+        `predict_<task>`. Missing labels are masked by leaving out the query, so every molecule is grounded once
+        for all of its tasks. If a dataset contains a molecule more than once, the first label is used.
+
+        Args:
+            datasets (list[str] | dict): Names of bundled datasets (used as task names),
+                or a dict mapping task names to (examples path, queries path) pairs.
+            param_size (int): The size of the parameter.
+            dataset_name (str): The name of the dataset.
+            output_directory (Optional[str]): Where to write the merged dataset. If not set, a temporary directory
+                is used and removed together with the dataset.
+        """
+        if not isinstance(datasets, dict):
+            datasets = {
+                name: (
+                    self.dataset_directory(name) / "examples.txt",
+                    self.dataset_directory(name) / "queries.txt",
+                )
+                for name in datasets
+            }
+        if not datasets:
+            raise ValueError("At least one task dataset is required.")
+
+        self.sources = {
+            task: (os.path.abspath(examples), os.path.abspath(queries))
+            for task, (examples, queries) in datasets.items()
+        }
+        self.tasks = list(self.sources)
+        self.output_directory = output_directory
+
+        # Molecule and task index of every query (built sample), in the order of the queries file
+        self.sample_molecules = []
+        self.sample_tasks = []
+
+        super().__init__(None, None, param_size, dataset_name)
+
+    def vocabulary(self) -> dict:
+        vocabulary = super().vocabulary()
+        vocabulary["tasks"] = self.tasks
+        return vocabulary
+
+    def load_data(self):
+        labels = {}
+        for t, (examples_file, queries_file) in enumerate(self.sources.values()):
+            for file in (examples_file, queries_file):
+                if not os.path.isfile(file):
+                    raise FileNotFoundError(f"File not found at path: {file}")
+
+            source = FileDataset(examples_file=examples_file, queries_file=queries_file)
+            for example, query in zip(
+                read_examples(source), read_queries(source), strict=True
+            ):
+                # Queries have the form `<label> predict.`
+                labels.setdefault(example, {}).setdefault(t, query.split()[0])
+
+        if self.output_directory is None:
+            self.output_directory = tempfile.mkdtemp(prefix="chemlogic_")
+            weakref.finalize(
+                self, shutil.rmtree, self.output_directory, ignore_errors=True
+            )
+        os.makedirs(self.output_directory, exist_ok=True)
+
+        examples_file = os.path.join(self.output_directory, "examples.txt")
+        queries_file = os.path.join(self.output_directory, "queries.txt")
+        with open(examples_file, "w") as e_file, open(queries_file, "w") as q_file:
+            for m, (example, task_labels) in enumerate(labels.items()):
+                e_file.write(f"{example}\n")
+                q_file.write(
+                    ", ".join(
+                        f"{label} predict_{self.tasks[t]}"
+                        for t, label in sorted(task_labels.items())
+                    )
+                    + ".\n"
+                )
+                for t in sorted(task_labels):
+                    self.sample_molecules.append(m)
+                    self.sample_tasks.append(t)
+
+        return FileDataset(examples_file=examples_file, queries_file=queries_file)
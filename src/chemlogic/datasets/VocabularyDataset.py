@@ -0,0 +1,18 @@
+from chemlogic.datasets.Dataset import Dataset
+
+
+class VocabularyDataset(Dataset):
+    def __init__(self, vocabulary: dict):
+        """
+        Create a dataset from a saved vocabulary, without loading any data. Used to restore trained pipelines.
+
+        Args:
+            vocabulary (dict): The dataset vocabulary, as returned by `Dataset.vocabulary`.
+        """
+        vocabulary = dict(vocabulary)
+        # The task names of a multi-task dataset, see `MultiTaskDataset`
+        self.tasks = vocabulary.pop("tasks", None)
+        super().__init__(**vocabulary)
+
+    def load_data(self):
+        return None
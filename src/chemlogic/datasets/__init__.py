@@ -6,9 +6,11 @@ from .datasets import get_dataset as get_dataset
 from .datasets import get_dataset_len as get_dataset_len
 from .DHFR import DHFR as DHFR
 from .ER import ER as ER
+from .MultiTaskDataset import MultiTaskDataset as MultiTaskDataset
 from .MUTAG import MUTAG as MUTAG
 from .PTC import PTC as PTC
 from .PTCFM import PTCFM as PTCFM
 from .PTCFR import PTCFR as PTCFR
 from .PTCMM import PTCMM as PTCMM
 from .SmilesDataset import SmilesDataset as SmilesDataset
+from .VocabularyDataset import VocabularyDataset as VocabularyDataset
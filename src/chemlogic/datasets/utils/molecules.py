@@ -0,0 +1,191 @@
+import os
+import re
+from collections import defaultdict
+
+import networkx as nx
+from neuralogic.dataset import FileDataset
+
+# Matches facts such as `<1> bond(0, 1, 2)`, `c(d59_5)` or `atom_3(1)`
+FACT_PATTERN = re.compile(r"([a-z][\w]*)\(([^()]*)\)")
+
+
+def _read_lines(file_path):
+    if file_path is None or not os.path.isfile(file_path):
+        return []
+    with open(file_path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def read_examples(dataset):
+    """Read the examples of a FileDataset, one molecule per entry. Returns an empty list if there are none."""
+    return _read_lines(getattr(dataset, "examples_file", None))
+
+
+def read_queries(dataset):
+    """Read the queries of a FileDataset, one query line per entry."""
+    return _read_lines(getattr(dataset, "queries_file", None))
+
+
+def parse_facts(example: str):
+    """Parse an example line into a list of (predicate, terms) pairs."""
+    return [
+        (name, tuple(term.strip() for term in terms.split(",")))
+        for name, terms in FACT_PATTERN.findall(example)
+    ]
+
+
+def molecule_size(example: str, connection: str = "bond"):
+    """
+    Compute the size of a molecule encoded as an example line.
+
+    Args:
+        example (str): The example line with the molecule facts.
+        connection (str): The connection predicate (expects connection(X, Y, B)).
+
+    Returns:
+        A tuple (atoms, bonds, max_degree).
+    """
+    neighbours = defaultdict(set)
+    bonds = set()
+    constants = set()
+
+    for name, terms in parse_facts(example):
+        if name == connection and len(terms) == 3:
+            first, second, bond = terms
+            neighbours[first].add(second)
+            neighbours[second].add(first)
+            bonds.add(bond)
+            constants.update((first, second))
+        elif len(terms) == 1:
+            constants.add(terms[0])
+
+    atoms = constants - bonds
+    max_degree = max((len(n) for n in neighbours.values()), default=0)
+
+    return len(atoms), len(bonds), max_degree
+
+
+def molecule_cost(atoms: int, bonds: int, max_degree: int) -> int:
+    """Rough grounding cost of a molecule: every atom plus every walk of one step along a bond."""
+    return atoms + bonds * max(max_degree, 1)
+
+
+def molecule_graph(example: str, connection: str = "bond") -> nx.Graph:
+    """
+    Convert an example line into a labeled molecular graph.
+
+    Args:
+        example (str): The example line with the molecule facts.
+        connection (str): The connection predicate (expects connection(X, Y, B)).
+
+    Returns:
+        A networkx graph of the atoms, with the atom predicates as node labels and the bond predicates
+        as edge labels.
+    """
+    facts = parse_facts(example)
+    names = defaultdict(list)
+    bonds = {}
+    for name, terms in facts:
+        if name == connection and len(terms) == 3:
+            bonds[terms[2]] = terms[:2]
+        elif len(terms) == 1:
+            names[terms[0]].append(name)
+
+    graph = nx.Graph()
+    for constant, constant_names in names.items():
+        if constant not in bonds:
+            graph.add_node(constant, label=",".join(sorted(constant_names)))
+    for bond, (first, second) in bonds.items():
+        graph.add_edge(first, second, label=",".join(sorted(names[bond])))
+    for node in graph.nodes:
+        graph.nodes[node].setdefault("label", "")
+
+    return graph
+
+
+def molecule_hash(graph: nx.Graph, iterations: int = 3) -> str:
+    """Weisfeiler-Lehman hash of a molecular graph, equal for isomorphic graphs (see `molecule_graph`)."""
+    return nx.weisfeiler_lehman_graph_hash(
+        graph, node_attr="label", edge_attr="label", iterations=iterations
+    )
+
+
+def same_molecule(graph: nx.Graph, other: nx.Graph) -> bool:
+    """Whether two molecular graphs are isomorphic, including the atom and bond labels."""
+    return nx.is_isomorphic(
+        graph,
+        other,
+        node_match=nx.algorithms.isomorphism.categorical_node_match("label", ""),
+        edge_match=nx.algorithms.isomorphism.categorical_edge_match("label", ""),
+    )
+
+
+def get_molecule_sizes(dataset, connection: str = "bond"):
+    """Compute (atoms, bonds, max_degree) for every example of a FileDataset."""
+    return [molecule_size(example, connection) for example in read_examples(dataset)]
+
+
+def subset_dataset(dataset, indices, output_directory: str):
+    """
+    Create a FileDataset containing only the selected molecules of a FileDataset.
+
+    Args:
+        dataset (FileDataset): The source dataset.
+        indices (list[int]): Indices of the molecules to keep, in the desired order.
+        output_directory (str): Where to write the subset, the caller removes it when done.
+
+    Returns:
+        A FileDataset with the selected examples and queries.
+    """
+    examples = read_examples(dataset)
+    queries = read_queries(dataset)
+
+    os.makedirs(output_directory, exist_ok=True)
+
+    queries_file = os.path.join(output_directory, "queries.txt")
+    with open(queries_file, "w") as f:
+        f.writelines(f"{queries[i]}\n" for i in indices)
+
+    if not examples:
+        return FileDataset(queries_file=queries_file)
+
+    examples_file = os.path.join(output_directory, "examples.txt")
+    with open(examples_file, "w") as f:
+        f.writelines(f"{examples[i]}\n" for i in indices)
+
+    return FileDataset(examples_file=examples_file, queries_file=queries_file)
+
+
+def split_queries(
+    dataset,
+    names: list[str],
+    output_directory: str,
+    output_name: str = "predict",
+):
+    """
+    Create a FileDataset asking every query of a FileDataset for each of the given output predicates,
+    e.g. `1.0 predict.` becomes `1.0 predict_a, 1.0 predict_b.` The examples are shared.
+
+    Args:
+        dataset (FileDataset): The source dataset.
+        names (list[str]): The output predicates to query.
+        output_directory (str): Where to write the queries, the caller removes it when done.
+        output_name (str): The output predicate of the source queries.
+
+    Returns:
+        A FileDataset with the same examples and the split queries.
+    """
+    pattern = re.compile(rf"\b{re.escape(output_name)}\b")
+
+    os.makedirs(output_directory, exist_ok=True)
+
+    queries_file = os.path.join(output_directory, "queries.txt")
+    with open(queries_file, "w") as f:
+        for query in read_queries(dataset):
+            query = query.rstrip(".")
+            f.write(", ".join(pattern.sub(name, query) for name in names) + ".\n")
+
+    examples_file = getattr(dataset, "examples_file", None)
+    if not read_examples(dataset):
+        return FileDataset(queries_file=queries_file)
+    return FileDataset(examples_file=examples_file, queries_file=queries_file)
@@ -3,7 +3,9 @@ import re
 
 import networkx
 import networkx as nx
+from neuralogic.core import R
 from neuralogic.dataset import Data, FileDataset, TensorDataset
+from neuralogic.dataset import Dataset as LogicDataset
 from pysmiles import read_smiles
 from rdkit import Chem
 from rdkit.Chem import AddHs, GetPeriodicTable, MolFromSmiles
@@ -151,6 +153,74 @@ def get_unique_atoms_and_bonds(file_path):
     return list(unique_atoms), list(unique_bonds)
 
 
+def canonical_smiles(smiles: str):
+    """Canonical RDKit SMILES, or None if the SMILES cannot be parsed."""
+    mol = MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(mol)
+
+
+def smiles_to_facts(smiles: str, explicit_hydrogens=True):
+    """
+    Convert SMILES to molecule facts in memory, in the same format as written by `get_dataset_and_mappings`.
+
+    Args:
+        smiles (str): The SMILES representation of the molecule.
+        explicit_hydrogens (bool): Add explicit hydrogens, default True
+
+    Returns:
+        A list of (predicate, terms) pairs, e.g. ("c", (0,)), ("bond", (0, 1, 12)) and ("b_1", (12,)),
+        or None if the SMILES cannot be parsed.
+    """
+    mol = MolFromSmiles(smiles)
+    if mol is None:
+        return None
+
+    if explicit_hydrogens:
+        mol = AddHs(mol)
+
+    bond_types = {bond_type: k for k, bond_type in Chem.rdchem.BondType.values.items()}
+    atom_count = mol.GetNumAtoms()
+
+    facts = [(atom.GetSymbol().lower(), (atom.GetIdx(),)) for atom in mol.GetAtoms()]
+    for bond in mol.GetBonds():
+        # Bond ids follow the atom ids, as in `get_dataset_and_mappings`
+        bond_id = bond.GetIdx() + atom_count
+        first, second = bond.GetBeginAtomIdx(), bond.GetEndAtomIdx()
+        facts.append(("bond", (first, second, bond_id)))
+        facts.append(("bond", (second, first, bond_id)))
+        facts.append((f"b_{bond_types[bond.GetBondType()]}", (bond_id,)))
+    return facts
+
+
+def smiles_to_example(smiles: str, explicit_hydrogens=True):
+    """Convert SMILES to a list of neuralogic relations (one example), or None if the SMILES cannot be parsed."""
+    facts = smiles_to_facts(smiles, explicit_hydrogens)
+    if facts is None:
+        return None
+    return [R.get(predicate)(*terms) for predicate, terms in facts]
+
+
+def inference_dataset(examples, output_names=("predict",)):
+    """
+    Create an in-memory dataset of molecule examples (see `smiles_to_example`), no files are written. Every example
+    is queried for each of the output predicates, so a molecule is grounded once for all of its outputs.
+
+    Args:
+        examples (list): The examples, lists of neuralogic relations.
+        output_names (Sequence[str]): The output predicates to query.
+
+    Returns:
+        A neuralogic Dataset, its built samples are ordered by example and then by output predicate.
+    """
+    dataset = LogicDataset()
+    for example in examples:
+        dataset.add_example(example)
+        dataset.add_query([R.get(name) for name in output_names])
+    return dataset
+
+
 def get_dataset_and_mappings(
     smiles_list, labels=None, file_prefix="", output_location="."
 ):
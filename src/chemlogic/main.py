@@ -1,6 +1,14 @@
+import hashlib
+import json
+import tempfile
+
 import mlflow
+import optuna
 
+from chemlogic.datasets.utils.molecules import subset_dataset
 from chemlogic.utils.Pipeline import ArchitectureType, Pipeline
+from chemlogic.utils.ResultCache import ResultCache
+from chemlogic.utils.TrialCache import TrialCache
 
 
 # TODO: do a better job in refactoring here
@@ -15,7 +23,18 @@ def main(
     smiles_list=None,
     labels=None,
     task="classification",
+    trial_cache: TrialCache = None,
+    pruning=False,
+    report_interval=10,
+    epochs=500,
+    molecules=None,
+    result_cache: ResultCache = None,
 ):
+    # With pruning, the validation score (higher is better, the study should maximize the metric) is reported
+    # to the trial every `report_interval` epochs and the trial is stopped if the pruner decides so.
+    # If `molecules` (indices) is set, the trial trains and tests only on these molecules of the dataset.
+    # With a result cache, a configuration trained before returns its recorded (aggregated) metric immediately.
+    pruned = False
     with mlflow.start_run():
         max_subgraph_depth = 0
         max_cycle_size = 0
@@ -48,30 +67,118 @@ def main(
             max_depth = 1
 
         lr = trial.suggest_float("learning_rate", 1e-5, 1e-1, log=True)
-        epochs = 500
         split = 0.7
+        validation_split = 0.1 if pruning else 0.0
 
-        architecture_type = ArchitectureType.from_string(architecture)
-        pipeline = Pipeline(
-            dataset_name,
-            model_name,
-            param_size,
-            layers,
-            max_depth,
+        # The structural hyperparameters, trials with the same structure can share the dataset and the built samples
+        structure = dict(
+            dataset_name=dataset_name,
+            model_name=model_name,
+            param_size=param_size,
+            layers=layers,
+            max_depth=max_depth,
             max_subgraph_depth=max_subgraph_depth,
             max_cycle_size=max_cycle_size,
-            architecture=architecture_type,
+            architecture=architecture,
             subgraphs=subgraphs,
-            chem_rules=chemical_rules,
+            chemical_rules=chemical_rules,
             funnel=funnel,
-            smiles_list=smiles_list,
-            labels=labels,
-            task=task
+            task=task,
+            # A digest stable across processes, the result cache is shared by the search workers
+            data=hashlib.sha256(
+                json.dumps([smiles_list, labels], default=str).encode()
+            ).hexdigest()
+            if smiles_list
+            else None,
         )
 
-        train_loss, test_loss, metric, evaluator = pipeline.train_test_cycle(
-            lr, epochs, split, batches=batches
-        )
+        seed = None
+        if result_cache is not None:
+            lr = result_cache.normalize(lr)
+            config_key = result_cache.key(
+                **structure,
+                learning_rate=lr,
+                epochs=epochs,
+                split=split,
+                validation_split=validation_split,
+                molecules=molecules,
+            )
+            memoized, seed = result_cache.lookup(trial, config_key)
+            mlflow.log_param("memoized", memoized is not None)
+            if memoized is not None:
+                mlflow.log_param("dataset", dataset_name)
+                mlflow.log_param("model", model_name)
+                mlflow.log_metric("metric", memoized)
+                return memoized, None
+
+        architecture_type = ArchitectureType.from_string(architecture)
+
+        def create_pipeline():
+            return Pipeline(
+                dataset_name,
+                model_name,
+                param_size,
+                layers,
+                max_depth,
+                max_subgraph_depth=max_subgraph_depth,
+                max_cycle_size=max_cycle_size,
+                architecture=architecture_type,
+                subgraphs=subgraphs,
+                chem_rules=chemical_rules,
+                funnel=funnel,
+                smiles_list=smiles_list,
+                labels=labels,
+                task=task,
+            )
+
+        grounding_cache = None
+        if trial_cache is None:
+            pipeline = create_pipeline()
+        else:
+            pipeline, grounding_cache, hit = trial_cache.get(
+                TrialCache.key(**structure), create_pipeline
+            )
+
+        def report(epoch, train_loss, validation_score):
+            nonlocal pruned
+            if validation_score is None:
+                return False
+            trial.report(validation_score, epoch)
+            pruned = trial.should_prune()
+            return pruned
+
+        full_data = pipeline.dataset.data
+        with tempfile.TemporaryDirectory(prefix="chemlogic_") as directory:
+            if molecules is not None:
+                pipeline.dataset.data = subset_dataset(full_data, molecules, directory)
+            try:
+                train_loss, test_loss, metric, evaluator = pipeline.train_test_cycle(
+                    lr,
+                    epochs,
+                    split,
+                    batches=batches,
+                    grounding_cache=grounding_cache,
+                    validation_split=validation_split,
+                    validation_interval=report_interval,
+                    epoch_callback=report if pruning else None,
+                    seed=seed,
+                )
+            finally:
+                pipeline.dataset.data = full_data
+
+        # The cost of the configuration, a cached grounding costs the time of building the molecules of this trial
+        costs = {**pipeline.costs, "neurons": pipeline.neuron_count()}
+        if grounding_cache is not None:
+            costs["build_time"] = grounding_cache.grounding_time()
+        trial.set_user_attr("costs", costs)
+        mlflow.log_metrics(costs)
+
+        if trial_cache is not None:
+            mlflow.log_param("trial_cache_hit", hit)
+            mlflow.log_metric("trial_cache_hit_rate", trial_cache.stats()["hit_rate"])
+            mlflow.log_metric(
+                "grounding_cache_hit_rate", grounding_cache.stats()["hit_rate"]
+            )
 
         mlflow.log_param("dataset", dataset_name)
         mlflow.log_param("model", model_name)
@@ -79,6 +186,9 @@ def main(
         mlflow.log_param("parameter_size", param_size)
         mlflow.log_param("num_layers", layers)
         mlflow.log_param("learning_rate", lr)
+        mlflow.log_param("epochs", epochs)
+        if molecules is not None:
+            mlflow.log_param("molecules", len(molecules))
         mlflow.log_param("architecture", architecture)
         mlflow.log_param("funnel", funnel)
         # for chemical rules
@@ -102,5 +212,14 @@ def main(
         mlflow.log_metric("train_loss", train_loss)
         mlflow.log_metric("test_loss", test_loss)
         mlflow.log_metric("metric", metric)
+        mlflow.log_param("pruned", pruned)
+
+        if result_cache is not None and not pruned:
+            mlflow.log_param("seed", seed)
+            metric = result_cache.record(trial, config_key, metric, seed)
+            mlflow.log_metric("aggregated_metric", metric)
+
+    if pruned:
+        raise optuna.TrialPruned()
 
     return metric, pipeline
@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncInferenceEngine:
+    """
+    Asyncio front end of the `InferenceEngine` micro-batching concurrent requests.
+
+    Single-molecule requests are collected into a batch until it reaches `max_batch_size` or the first request
+    has waited `max_wait` seconds. Every batch is evaluated by a single `InferenceEngine.predict` call on a worker
+    thread (so the event loop is not blocked) and the results are sent back to the waiting requests.
+
+    Usage:
+        async with AsyncInferenceEngine(InferenceEngine(pipeline)) as engine:
+            prediction = await engine.predict("CCO")
+    """
+
+    def __init__(self, engine, max_batch_size: int = 32, max_wait: float = 0.005):
+        """
+        :param engine: The `InferenceEngine` evaluating the batches.
+        :param max_batch_size: Maximal number of requests in a batch.
+        :param max_wait: Maximal time in seconds a request waits for the batch to fill up.
+        """
+        if max_batch_size < 1:
+            raise ValueError("The batch size must be at least 1.")
+        if max_wait < 0:
+            raise ValueError("The wait time must not be negative.")
+
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_sizes = []
+
+        self._queue = None
+        self._collector = None
+        self._executor = None
+        self._batch = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    def _start(self):
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="chemlogic_inference"
+            )
+            self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def predict(self, smiles: str):
+        """
+        Predict a single SMILES string.
+
+        :param smiles: The SMILES string to predict.
+        :return: The prediction, None if the SMILES cannot be parsed.
+        """
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((smiles, future))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch = await self._next_batch()
+            self.batch_sizes.append(len(batch))
+
+            try:
+                predictions = await loop.run_in_executor(
+                    self._executor,
+                    self.engine.predict,
+                    [smiles for smiles, _ in batch],
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), prediction in zip(batch, predictions, strict=True):
+                # The request may have been cancelled while waiting
+                if not future.done():
+                    future.set_result(prediction)
+
+    async def close(self):
+        """Stop collecting requests and shut down the worker thread."""
+        if self._collector is None:
+            return
+
+        self._collector.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._collector
+
+        # Cancel the requests of an interrupted batch and those still queued
+        pending = self._batch
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            future.cancel()
+
+        self._executor.shutdown(wait=True)
+        self._collector = None
+
+    def stats(self) -> dict:
+        """Micro-batching counters: number of batches, their mean and largest size, and the engine statistics."""
+        return {
+            "batches": len(self.batch_sizes),
+            "mean_batch_size": (
+                sum(self.batch_sizes) / len(self.batch_sizes)
+                if self.batch_sizes
+                else 0.0
+            ),
+            "largest_batch": max(self.batch_sizes, default=0),
+            "engine": self.engine.stats(),
+        }
+
+
+async def synthetic_requests(
+    engine: AsyncInferenceEngine,
+    smiles_list: list[str],
+    requests: int = 1000,
+    rate: float = 1000.0,
+    seed: int = 42,
+) -> tuple[list, list]:
+    """
+    Send single-molecule requests with exponentially distributed inter-arrival times (a Poisson process).
+
+    :param engine: The engine receiving the requests.
+    :param smiles_list: The pool of SMILES strings the requests are drawn from.
+    :param requests: Number of requests to send.
+    :param rate: Mean number of requests per second.
+    :param seed: Seed of the arrival times and the drawn molecules.
+    :return: The predictions and the latencies in seconds, both in the order the requests were sent.
+    """
+    rng = random.Random(seed)
+
+    async def request(smiles):
+        start = time.perf_counter()
+        prediction = await engine.predict(smiles)
+        return prediction, time.perf_counter() - start
+
+    tasks = []
+    for _ in range(requests):
+        tasks.append(asyncio.create_task(request(rng.choice(smiles_list))))
+        await asyncio.sleep(rng.expovariate(rate))
+
+    results = await asyncio.gather(*tasks)
+    return [prediction for prediction, _ in results], [
+        latency for _, latency in results
+    ]
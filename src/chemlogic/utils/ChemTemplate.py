@@ -1,9 +1,17 @@
 from abc import abstractmethod
 
-from neuralogic.core import Template
+from neuralogic.core import R, Template
 from neuralogic.core.constructs.relation import BaseRelation, WeightedRelation
 from neuralogic.core.constructs.rule import Rule
 
+from chemlogic.utils.complexity import (
+    counter_depth,
+    edge_predicates,
+    estimate_groundings,
+    local_predicates,
+    rule_complexity,
+)
+
 
 class ChemTemplate(Template):
     """
@@ -14,9 +22,27 @@ class ChemTemplate(Template):
 
     def __init__(self):
         super().__init__()
+        # Maps id(rule) to the name of the chemlogic class that created the rule
+        self.rule_origins = {}
+
+    def add_rules(self, rules):
+        rules = list(rules)
+        super().add_rules(rules)
+        for rule in rules:
+            self.rule_origins.setdefault(id(rule), type(self).__name__)
+
+    def rule_origin(self, rule) -> str:
+        """Returns the name of the chemlogic class (dataset, model or KB module) the rule originates from."""
+        return self.rule_origins.get(id(rule), type(self).__name__)
+
+    def _merge_origins(self, other):
+        if isinstance(other, ChemTemplate):
+            for key, origin in other.rule_origins.items():
+                self.rule_origins.setdefault(key, origin)
 
     def __add__(self, other):
         if isinstance(other, Template):
+            self._merge_origins(other)
             self.add_rules(other.template)
 
         elif isinstance(other, list):
@@ -33,9 +59,83 @@ class ChemTemplate(Template):
             if isinstance(rule, BaseRelation | WeightedRelation | Rule):
                 template.append(rule)
             elif isinstance(rule, Template):
+                self._merge_origins(rule)
+                for nested_rule in rule.template:
+                    self.rule_origins.setdefault(id(nested_rule), type(self).__name__)
                 template.extend(rule.template)
         self.template = template
 
+    def split_output(self, output_name: str, names: list[str]):
+        """
+        Replace the rules of an output predicate by a copy per name, e.g. one output per task.
+        The copies share the rule bodies (the hidden layers), each with its own weights.
+
+        :param output_name: The output predicate to split, e.g. "predict".
+        :param names: The names of the new output predicates.
+        """
+        template = []
+        for rule in self.template:
+            if not isinstance(rule, Rule) or rule.head.predicate.name != output_name:
+                template.append(rule)
+                continue
+
+            for name in names:
+                head = R.get(name)(*rule.head.terms) if rule.head.terms else R.get(name)
+                if isinstance(rule.head, WeightedRelation):
+                    head = head[rule.head.weight]
+
+                copy = head <= list(rule.body)
+                if rule.metadata is not None:
+                    copy = copy | rule.metadata
+                self.rule_origins[id(copy)] = self.rule_origin(rule)
+                template.append(copy)
+
+        self.template = template
+
+    def complexity_report(
+        self,
+        atoms: int = 50,
+        bonds: int = 52,
+        max_degree: int = 4,
+        connection: str = None,
+    ) -> list:
+        """
+        Static complexity report of the template rules, computed without grounding any data.
+
+        The grounding bound is expressed in terms of the number of atoms (n), bonds (m), the maximal
+        atom degree (d) and the depth of the `next` counters (D), and evaluated for a molecule of the given size.
+
+        :param atoms: Number of atoms of the reference molecule.
+        :param bonds: Number of bonds of the reference molecule.
+        :param max_degree: Maximal atom degree of the reference molecule.
+        :param connection: The connection predicate, defaults to `self.connection` or "bond".
+        :return: A list of per-rule dicts, sorted by descending estimated number of groundings.
+        """
+        if connection is None:
+            connection = getattr(self, "connection", "bond")
+
+        depth = counter_depth(self.template)
+        edges = edge_predicates(self.template, connection)
+        local = local_predicates(self.template, connection, edges)
+        report = []
+        for i, rule in enumerate(self.template):
+            if not isinstance(rule, Rule):
+                continue
+
+            complexity = rule_complexity(rule, connection, edges, local)
+            complexity.update(
+                index=i,
+                rule=str(rule),
+                origin=self.rule_origin(rule),
+                counter_depth=depth if complexity["counters"] else 0,
+                estimate=estimate_groundings(
+                    complexity["exponents"], atoms, bonds, max_degree, depth
+                ),
+            )
+            report.append(complexity)
+
+        return sorted(report, key=lambda row: row["estimate"], reverse=True)
+
     @abstractmethod
     def create_template(self):
         pass
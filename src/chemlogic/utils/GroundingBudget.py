@@ -0,0 +1,130 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from neuralogic.core import BuiltDataset
+
+from chemlogic.datasets.utils.molecules import read_queries, subset_dataset
+
+POLICIES = ["skip", "fallback", "truncate"]
+
+
+class GroundingBudget:
+    """
+    Per-molecule grounding limits, classified after the fact while building the dataset.
+
+    Every molecule is built on its own, molecules whose grounding exceeded the neuron count or time limit (or failed)
+    are logged and left out of the built dataset. The policy decides what happens with them afterward:
+    "skip" drops them, "fallback" handles them with a model-only template and "truncate" with a template
+    of reduced pattern depth (grounding them again), see `Pipeline.train_test_cycle`.
+
+    The limits are not enforced during the grounding: the built samples are bound to the evaluator's backend, so a
+    molecule cannot be grounded in a separate process that could be killed. The neuron count is checked after the
+    molecule is fully grounded. A grounding running over the time limit is marked as exceeded right away, but the next
+    molecule is built (and the build returns) only after it finishes, so at most one grounding uses the backend at
+    a time. A molecule whose grounding does not terminate or runs out of memory therefore still stalls the build.
+    """
+
+    def __init__(
+        self,
+        max_neurons: int = None,
+        max_time: float = None,
+        policy: str = "skip",
+        truncated_depth: int = 3,
+        truncated_cycle_size: int = 6,
+    ):
+        """
+        :param max_neurons: Number of neurons of a single molecule above which it exceeds the limits,
+            checked after its grounding.
+        :param max_time: Build time of a single molecule in seconds above which it exceeds the limits,
+            the grounding itself is not interrupted.
+        :param policy: Either "skip", "fallback" or "truncate".
+        :param truncated_depth: Maximal model and subgraph depth of the "truncate" template.
+        :param truncated_cycle_size: Maximal cycle size of the "truncate" template.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Policy must be one of {POLICIES}.")
+        if max_neurons is None and max_time is None:
+            raise ValueError("Either `max_neurons` or `max_time` must be set.")
+
+        self.max_neurons = max_neurons
+        self.max_time = max_time
+        self.policy = policy
+        self.truncated_depth = truncated_depth
+        self.truncated_cycle_size = truncated_cycle_size
+        self.exceeded = []
+        # A timed-out build still running on the backend
+        self._runaway = None
+
+    def _wait_for_runaway(self):
+        if self._runaway is not None:
+            self._runaway.join()
+            self._runaway = None
+
+    def _build_molecule(self, evaluator, molecule):
+        """Build a single-molecule dataset, returns (sample, time, error)."""
+        self._wait_for_runaway()
+
+        result = {}
+
+        def build():
+            try:
+                result["samples"] = evaluator.build_dataset(molecule).samples
+            except Exception as e:
+                result["error"] = e
+
+        start = time.perf_counter()
+        # A daemon thread, so a runaway grounding does not block the interpreter exit
+        thread = threading.Thread(target=build, daemon=True)
+        thread.start()
+        thread.join(self.max_time)
+        elapsed = time.perf_counter() - start
+
+        if thread.is_alive():
+            self._runaway = thread
+            return None, elapsed, "time"
+        if "error" in result:
+            return None, elapsed, repr(result["error"])
+        return result["samples"][0], elapsed, None
+
+    def build(self, evaluator, dataset, indices=None) -> BuiltDataset:
+        """
+        Build the molecules of a FileDataset one by one, leaving out the ones exceeding the limits.
+
+        :param evaluator: The evaluator used for building.
+        :param dataset: The FileDataset to build.
+        :param indices: Build only these molecules, defaults to all of them.
+        :return: The built dataset in the original order, with None in place of the molecules exceeding the limits.
+        """
+        count = len(read_queries(dataset))
+        indices = range(count) if indices is None else indices
+        samples = [None] * count
+        self.exceeded = []
+
+        with tempfile.TemporaryDirectory(prefix="chemlogic_") as directory:
+            for i in indices:
+                molecule = subset_dataset(dataset, [i], os.path.join(directory, str(i)))
+                sample, elapsed, reason = self._build_molecule(evaluator, molecule)
+
+                neurons = None
+                if sample is not None:
+                    neurons = len(sample.java_sample.query.evidence.allNeuronsTopologic)
+                    if self.max_neurons is not None and neurons > self.max_neurons:
+                        reason = "neurons"
+
+                if reason is None:
+                    samples[i] = sample
+                    continue
+
+                self.exceeded.append(
+                    {"index": i, "reason": reason, "neurons": neurons, "time": elapsed}
+                )
+                logging.warning(
+                    f"Molecule {i} exceeded the grounding budget ({reason}) | Neurons: {neurons} | Time: {elapsed:.2f}s"
+                )
+
+            self._wait_for_runaway()
+
+        return BuiltDataset(samples, 1)
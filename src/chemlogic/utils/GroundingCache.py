@@ -0,0 +1,204 @@
+import json
+import os
+import tempfile
+import time
+from enum import Enum
+
+from neuralogic.core import BuiltDataset
+from neuralogic.nn import get_evaluator
+
+from chemlogic.datasets.utils.molecules import (
+    molecule_graph,
+    molecule_hash,
+    read_examples,
+    read_queries,
+    same_molecule,
+    subset_dataset,
+)
+
+
+class GroundingCache:
+    """
+    Built samples shared by duplicate molecules, within a dataset and across datasets grounded with the same template.
+
+    Molecules are identified by the Weisfeiler-Lehman hash of their atom and bond facts, confirmed by an isomorphism
+    check, together with their query, since the label is a part of the built sample. A molecule is grounded once,
+    all of its duplicates share its built sample, so a molecule occurring k times in the training samples is trained
+    on with multiplicity k.
+    """
+
+    def __init__(self, connection: str = "bond", iterations: int = 3):
+        """
+        :param connection: The connection predicate of the datasets (expects connection(X, Y, B)).
+        :param iterations: Number of Weisfeiler-Lehman iterations of the molecule hash.
+        """
+        self.connection = connection
+        self.iterations = iterations
+
+        self.evaluator = None
+        self.template_text = None
+        self.evaluator_settings = None
+
+        # Molecule hash -> list of (graph, query, key), the key indexes the built samples
+        self._molecules = {}
+        self._samples = []
+        # Time spent grounding the built sample of every molecule key
+        self._build_times = []
+        # Molecule key of every sample of the last built dataset
+        self.keys = []
+
+        self.hits = 0
+        self.misses = 0
+        # Total time spent grounding the cached molecules
+        self.build_time = 0.0
+
+    def evaluator_for(self, template, settings):
+        """
+        Evaluator of the cached samples, created with `get_evaluator`. The samples are bound to the weights of the
+        evaluator that built them, so calls whose settings ground the same networks (see `GroundingCache.settings_key`)
+        reuse the evaluator, applying the learning rate of the settings to its optimizer and resetting its parameters,
+        so every training starts from freshly initialized weights. A call with settings grounding
+        other networks creates a new evaluator and drops the built samples (the molecules stay registered).
+
+        :param template: The template of the datasets, must be the same in every call.
+        :param settings: The settings of the evaluator.
+        :return: The evaluator object.
+        """
+        text = str(template)
+        key = self.settings_key(settings)
+        if self.evaluator is not None and text != self.template_text:
+            raise ValueError(
+                "The grounding cache holds samples of a different template."
+            )
+
+        if self.evaluator is not None and key == self.evaluator_settings:
+            # The optimizer of the backend holds the learning rate by reference, setting it applies to training
+            self.evaluator.settings.optimizer.lr = settings.optimizer.lr
+            self.evaluator.reset_parameters()
+            return self.evaluator
+
+        self.evaluator = get_evaluator(template, settings)
+        self.template_text = text
+        self.evaluator_settings = key
+        self._samples = [None] * len(self._samples)
+        return self.evaluator
+
+    @staticmethod
+    def settings_key(settings) -> str:
+        """
+        The settings the built samples and the evaluator depend on, i.e. all but the learning rate and the number of
+        epochs (the pipelines train epoch by epoch). These are the grounder and compression flags, which change the
+        grounded networks, the error function, which changes their output neurons, the weight initializer and the
+        optimizer with its hyperparameters, which are fixed in the training strategy of the evaluator.
+        """
+        # The learning rate of the optimizer is held by its (initialized) backend objects
+        ignored = {"_lr", "_lr_object", "_optimizer"}
+        params = {}
+        for name, value in settings.params.items():
+            if name in ("learning_rate", "epochs"):
+                continue
+            if isinstance(value, Enum):
+                value = value.name
+            elif hasattr(value, "__dict__"):
+                value = {
+                    "type": type(value).__name__,
+                    **{k: v for k, v in vars(value).items() if k not in ignored},
+                }
+            params[name] = value
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def molecule_keys(self, dataset) -> list[int]:
+        """
+        Identify the molecules of a FileDataset, registering the ones not seen before.
+
+        :param dataset: The FileDataset.
+        :return: The molecule key of every sample, equal for duplicate molecules with the same query.
+        """
+        examples = read_examples(dataset)
+        queries = read_queries(dataset)
+        if len(examples) != len(queries):
+            raise ValueError(
+                "Deduplication requires a dataset with one example per query."
+            )
+
+        keys = []
+        for example, query in zip(examples, queries, strict=True):
+            graph = molecule_graph(example, self.connection)
+            candidates = self._molecules.setdefault(
+                molecule_hash(graph, self.iterations), []
+            )
+            key = next(
+                (
+                    key
+                    for other_graph, other_query, key in candidates
+                    if other_query == query and same_molecule(graph, other_graph)
+                ),
+                None,
+            )
+            if key is None:
+                key = len(self._samples)
+                candidates.append((graph, query, key))
+                self._samples.append(None)
+                self._build_times.append(0.0)
+            keys.append(key)
+        return keys
+
+    def build(self, evaluator, dataset, batch_size: int = 1) -> BuiltDataset:
+        """
+        Build a FileDataset, grounding only the molecules without a cached sample.
+
+        :param evaluator: The evaluator used for building, must be the same in every call.
+        :param dataset: The FileDataset to build.
+        :param batch_size: Number of batches to build the new molecules in.
+        :return: The built dataset in the original order, duplicate molecules share the same sample object.
+        """
+        if self.evaluator is None:
+            self.evaluator = evaluator
+        elif evaluator is not self.evaluator:
+            raise ValueError("The cached samples were built by a different evaluator.")
+
+        self.keys = self.molecule_keys(dataset)
+
+        # The first occurrence of every molecule without a built sample
+        new = {}
+        for i, key in enumerate(self.keys):
+            if self._samples[key] is None:
+                new.setdefault(key, i)
+        self.misses += len(new)
+        self.hits += len(self.keys) - len(new)
+
+        if new:
+            start = time.perf_counter()
+            with tempfile.TemporaryDirectory(prefix="chemlogic_") as directory:
+                subset = subset_dataset(
+                    dataset, list(new.values()), os.path.join(directory, "new")
+                )
+                built = evaluator.build_dataset(subset, batch_size=batch_size).samples
+            elapsed = time.perf_counter() - start
+            for key, sample in zip(new, built, strict=True):
+                self._samples[key] = sample
+                self._build_times[key] = elapsed / len(new)
+            self.build_time += elapsed
+
+        return BuiltDataset([self._samples[key] for key in self.keys], 1)
+
+    def grounding_time(self, keys: list[int] = None) -> float:
+        """
+        Time spent grounding the distinct molecules of a dataset, whether they were grounded for it or reused
+        from an earlier dataset, the build time of the molecules grounded together is split evenly among them.
+
+        :param keys: The molecule keys of the dataset, the ones of the last built dataset if None.
+        """
+        keys = self.keys if keys is None else keys
+        return sum(self._build_times[key] for key in set(keys))
+
+    def stats(self) -> dict:
+        """Number of cached molecules, cache hits and misses (grounded molecules), the hit rate and the build time."""
+        requests = self.hits + self.misses
+        return {
+            "molecules": sum(sample is not None for sample in self._samples),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "build_time": self.build_time,
+        }
@@ -0,0 +1,248 @@
+import csv
+import json
+import re
+import tempfile
+import time
+from collections import Counter, defaultdict
+from importlib.metadata import PackageNotFoundError, version
+
+from neuralogic.core import BuiltDataset
+from neuralogic.core.constructs.rule import Rule
+
+from chemlogic.datasets.utils.molecules import (
+    molecule_size,
+    read_examples,
+    subset_dataset,
+)
+
+PREDICATE_PATTERN = re.compile(r"([@\w]+)\(")
+
+FACTS = "facts"
+
+
+def _package_version(name):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def _predicate_name(text: str) -> str:
+    """Extract the predicate name from the string representation of a (possibly weighted) atom."""
+    text = text.strip()
+    bracket = text.find("(")
+    head = text if bracket == -1 else text[:bracket]
+    return head.split()[-1] if head.split() else head
+
+
+def size_bucket(atoms: int, bucket_edges) -> str:
+    """Label of the molecule-size bucket the number of atoms falls into."""
+    lower = 0
+    for edge in bucket_edges:
+        if atoms < edge:
+            return f"{lower}-{edge - 1}"
+        lower = edge
+    return f">={lower}"
+
+
+class GroundingProfiler:
+    """
+    Attributes grounded rule instances, neurons and build time to the rules of a template
+    and to the chemlogic classes (dataset, model or KB module) the rules originate from.
+
+    The dataset is built per molecule-size bucket, each bucket is timed separately and the bucket time
+    is distributed among the rules proportionally to the neurons they produced.
+    """
+
+    def __init__(self, template, connection: str = "bond", bucket_edges=(16, 32, 64)):
+        """
+        :param template: The composed ChemTemplate to profile.
+        :param connection: The connection predicate used to compute molecule sizes.
+        :param bucket_edges: Upper (exclusive) atom-count bounds of the molecule-size buckets.
+        """
+        self.template = template
+        self.connection = connection
+        self.bucket_edges = tuple(bucket_edges)
+        self.records = []
+
+        self.rules = [rule for rule in template.template if isinstance(rule, Rule)]
+        self.by_signature = defaultdict(list)
+        self.by_head = defaultdict(list)
+
+        for i, rule in enumerate(self.rules):
+            head = rule.head.predicate.name
+            self.by_signature[(head, self._rule_body_signature(rule))].append(i)
+            self.by_head[head].append(i)
+
+    @staticmethod
+    def _rule_body_signature(rule):
+        return tuple(
+            sorted(
+                literal.predicate.name
+                for literal in rule.body
+                if not literal.predicate.special
+            )
+        )
+
+    def _rule_origin(self, rule):
+        if hasattr(self.template, "rule_origin"):
+            return self.template.rule_origin(rule)
+        return type(self.template).__name__
+
+    def _match_rules(self, name: str):
+        """Find the template rules a neuron with the given name can originate from."""
+        head, _, body = name.partition(":-")
+        head = _predicate_name(head)
+
+        if body:
+            body_signature = tuple(
+                sorted(p for p in PREDICATE_PATTERN.findall(body) if p[0] != "@")
+            )
+            matched = self.by_signature.get((head, body_signature))
+            if matched:
+                return matched
+        return self.by_head.get(head, [])
+
+    def _count_neurons(self, samples):
+        """Count rule instances and neurons per rule index (or FACTS) over the samples."""
+        instances = Counter()
+        neurons = Counter()
+
+        for sample in samples:
+            for neuron in sample.java_sample.query.evidence.allNeuronsTopologic:
+                node_type = str(neuron.getClass().getSimpleName())
+                name = str(neuron.name).strip()
+
+                if node_type == "FactNeuron":
+                    neurons[FACTS] += 1
+                    continue
+
+                matched = self._match_rules(name)
+                if not matched:
+                    neurons[FACTS] += 1
+                    continue
+
+                share = 1 / len(matched)
+                for i in matched:
+                    neurons[i] += share
+                    if ":-" in name:
+                        instances[i] += share
+        return instances, neurons
+
+    def profile(
+        self, evaluator, dataset, dataset_name: str = "", batch_size: int = 1
+    ) -> BuiltDataset:
+        """
+        Build the dataset per molecule-size bucket and record the grounding profile.
+
+        :param evaluator: The evaluator used to build the dataset.
+        :param dataset: The FileDataset to build.
+        :param dataset_name: Name of the dataset, used in the profile tables.
+        :param batch_size: Number of batches to build each bucket in.
+        :return: The built dataset, with samples in the original order.
+        """
+        examples = read_examples(dataset)
+        buckets = defaultdict(list)
+        for i, example in enumerate(examples):
+            atoms, _, _ = molecule_size(example, self.connection)
+            buckets[size_bucket(atoms, self.bucket_edges)].append(i)
+
+        if not buckets:
+            start = time.perf_counter()
+            built_dataset = evaluator.build_dataset(dataset, batch_size=batch_size)
+            self._record(
+                dataset_name, "all", built_dataset.samples, time.perf_counter() - start
+            )
+            return built_dataset
+
+        samples = [None] * len(examples)
+        for bucket, indices in buckets.items():
+            with tempfile.TemporaryDirectory(prefix="chemlogic_") as directory:
+                subset = subset_dataset(dataset, indices, directory)
+                start = time.perf_counter()
+                built_subset = evaluator.build_dataset(subset, batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+
+            self._record(dataset_name, bucket, built_subset.samples, elapsed)
+            for i, sample in zip(indices, built_subset.samples, strict=True):
+                samples[i] = sample
+
+        return BuiltDataset(samples, batch_size)
+
+    def _record(self, dataset_name, bucket, samples, elapsed):
+        instances, neurons = self._count_neurons(samples)
+        total_neurons = sum(neurons.values())
+
+        for key, count in neurons.items():
+            if key == FACTS:
+                text, origin, head = FACTS, FACTS, FACTS
+            else:
+                rule = self.rules[key]
+                text, origin, head = (
+                    str(rule),
+                    self._rule_origin(rule),
+                    rule.head.predicate.name,
+                )
+
+            self.records.append(
+                {
+                    "dataset": dataset_name,
+                    "bucket": bucket,
+                    "rule": text,
+                    "origin": origin,
+                    "head": head,
+                    "molecules": len(samples),
+                    "instances": instances.get(key, 0),
+                    "neurons": count,
+                    "time": elapsed * count / total_neurons if total_neurons else 0.0,
+                }
+            )
+
+    def table(self, by: str = "rule", per_bucket: bool = False):
+        """
+        Aggregate the recorded profile.
+
+        :param by: Either "rule" or "origin".
+        :param per_bucket: Whether to keep the molecule-size buckets as separate rows.
+        :return: A list of rows (dicts) sorted by descending time.
+        """
+        if by not in ["rule", "origin"]:
+            raise ValueError("`by` must be either 'rule' or 'origin'.")
+
+        keys = ["dataset", "bucket", by] if per_bucket else ["dataset", by]
+        if by == "rule":
+            keys.append("origin")
+
+        rows = {}
+        for record in self.records:
+            key = tuple(record[k] for k in keys)
+            if key not in rows:
+                rows[key] = {k: record[k] for k in keys}
+                rows[key].update(instances=0, neurons=0, time=0.0)
+            rows[key]["instances"] += record["instances"]
+            rows[key]["neurons"] += record["neurons"]
+            rows[key]["time"] += record["time"]
+
+        return sorted(rows.values(), key=lambda row: row["time"], reverse=True)
+
+    def to_csv(self, path: str, by: str = "rule", per_bucket: bool = True):
+        """Export the aggregated profile table to a CSV file."""
+        rows = self.table(by=by, per_bucket=per_bucket)
+        fields = list(rows[0].keys()) if rows else ["dataset", by]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def to_json(self, path: str):
+        """Export the raw profile records together with the package versions."""
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "chemlogic": _package_version("ChemLogic"),
+                    "neuralogic": _package_version("neuralogic"),
+                    "records": self.records,
+                },
+                f,
+                indent=2,
+            )
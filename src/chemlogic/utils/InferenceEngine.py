@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from neuralogic.core.constructs.rule import Rule
+
+from chemlogic.datasets.utils.smiles_conversion import (
+    inference_dataset,
+    smiles_to_example,
+)
+
+
+class InferenceEngine:
+    """
+    Low-latency inference with a trained pipeline.
+
+    The template and weights stay resident in the trained evaluator, SMILES are converted to facts in memory
+    (no files are written) and the requests are grounded and evaluated in batches. The access to the backend
+    is serialized by a lock, so the engine can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        batch_size: int = 64,
+        output_name: str = None,
+        latency_window: int = 10000,
+        cache=None,
+    ):
+        """
+        :param pipeline: A trained (or loaded, see `Pipeline.load`) pipeline.
+        :param batch_size: Maximal number of molecules grounded and evaluated at once.
+        :param output_name: The name of the output predicate of the template, defaults to the outputs of the pipeline:
+            "predict", or "predict_<task>" of every task of a multi-task or model comparison pipeline. With several
+            outputs, the prediction of a molecule is the list of its outputs in the order of the tasks.
+        :param latency_window: Number of the most recent requests the latency percentiles are computed from.
+        :param cache: An optional `PredictionCache`, keyed by the fingerprint of the pipeline at the engine creation.
+        """
+        if not hasattr(pipeline, "evaluator"):
+            raise ValueError(
+                "The model has not been trained yet. Please train or load the model before creating an engine."
+            )
+        if batch_size < 1:
+            raise ValueError("The batch size must be at least 1.")
+
+        output_names = pipeline.output_names if output_name is None else [output_name]
+        heads = {
+            rule.head.predicate.name
+            for rule in pipeline.template.template
+            if isinstance(rule, Rule)
+        }
+        for name in output_names:
+            if name not in heads:
+                raise ValueError(f"The template has no output predicate '{name}'.")
+
+        self.pipeline = pipeline
+        self.evaluator = pipeline.evaluator
+        self.batch_size = batch_size
+        self.output_names = output_names
+        self.cache = cache
+        self.fingerprint = pipeline.fingerprint() if cache is not None else None
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._counters = {
+            "requests": 0,
+            "molecules": 0,
+            "batches": 0,
+            "invalid": 0,
+            "busy_time": 0.0,
+        }
+
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        """Create an engine from a pipeline saved by `Pipeline.save`."""
+        from chemlogic.utils.Pipeline import Pipeline
+
+        return cls(Pipeline.load(path), **kwargs)
+
+    def _evaluate_batch(self, examples):
+        # Every molecule is grounded once, with a query per output
+        built_dataset = self.evaluator.build_dataset(
+            inference_dataset(examples, self.output_names)
+        )
+        outputs = list(self.evaluator.test(built_dataset, generator=False))
+        if len(self.output_names) == 1:
+            return outputs
+        step = len(self.output_names)
+        return [outputs[i : i + step] for i in range(0, len(outputs), step)]
+
+    def _evaluate(self, smiles_list: list[str]) -> list:
+        """Evaluate SMILES with the backend in batches, None for SMILES that cannot be parsed."""
+        examples = [smiles_to_example(smiles) for smiles in smiles_list]
+        valid = [i for i, example in enumerate(examples) if example is not None]
+
+        predictions = [None] * len(smiles_list)
+        with self._lock:
+            for b in range(0, len(valid), self.batch_size):
+                batch = valid[b : b + self.batch_size]
+                outputs = self._evaluate_batch([examples[i] for i in batch])
+                for i, output in zip(batch, outputs, strict=True):
+                    predictions[i] = output
+                self._counters["batches"] += 1
+
+        return predictions
+
+    def predict(self, smiles_list: list[str]) -> list:
+        """
+        Predict a list of SMILES strings.
+
+        :param smiles_list: The SMILES strings to predict.
+        :return: The predictions in the order of the input, None for SMILES that cannot be parsed.
+        """
+        start = time.perf_counter()
+        if self.cache is None:
+            predictions = self._evaluate(smiles_list)
+        else:
+            predictions = self.cache.predict(
+                self.fingerprint, smiles_list, self._evaluate
+            )
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._latencies.append(elapsed)
+            self._counters["requests"] += 1
+            self._counters["molecules"] += len(smiles_list)
+            self._counters["invalid"] += sum(p is None for p in predictions)
+            self._counters["busy_time"] += elapsed
+
+        return predictions
+
+    def stats(self) -> dict:
+        """
+        Latency and throughput counters.
+
+        :return: The number of requests, molecules, batches and invalid SMILES, the p50/p99 request latency
+            in seconds and the throughput in molecules per second of processing time. With a cache, its hit
+            counters are included under "cache".
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = list(self._latencies)
+
+        stats["p50_latency"] = float(np.percentile(latencies, 50)) if latencies else 0.0
+        stats["p99_latency"] = float(np.percentile(latencies, 99)) if latencies else 0.0
+        stats["throughput"] = (
+            stats["molecules"] / stats["busy_time"] if stats["busy_time"] else 0.0
+        )
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def reset_stats(self):
+        """Reset the latency and throughput counters."""
+        with self._lock:
+            self._latencies.clear()
+            for key in self._counters:
+                self._counters[key] = 0
+            self._counters["busy_time"] = 0.0
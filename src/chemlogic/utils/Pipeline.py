@@ -1,17 +1,53 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 
+import numpy as np
 from neuralogic.core import R, Settings, Transformation, V
+from neuralogic.dataset import FileDataset
 from neuralogic.nn import get_evaluator
 from neuralogic.nn.loss import MSE, CrossEntropy, ErrorFunction
 from neuralogic.optim import Adam, Optimizer
 from sklearn.metrics import r2_score, roc_auc_score
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold, train_test_split
 
+from chemlogic.datasets.Dataset import Dataset
 from chemlogic.datasets.datasets import get_dataset
+from chemlogic.datasets.utils.molecules import read_queries, split_queries
+from chemlogic.datasets.utils.smiles_conversion import (
+    inference_dataset,
+    smiles_to_example,
+)
+from chemlogic.datasets.VocabularyDataset import VocabularyDataset
 from chemlogic.knowledge_base.chemrules import get_chem_rules
 from chemlogic.knowledge_base.subgraphs import get_subgraphs
 from chemlogic.models.models import get_model
 from chemlogic.utils.ChemTemplate import ChemTemplate
+from chemlogic.utils.GroundingBudget import GroundingBudget
+from chemlogic.utils.GroundingCache import GroundingCache
+from chemlogic.utils.GroundingProfiler import GroundingProfiler
+from chemlogic.utils.sharding import build_dataset_sharded
+from chemlogic.utils.SizeScheduler import SizeScheduler
+from chemlogic.utils.state import (
+    copy_state_dict,
+    load_checkpoint,
+    load_state_dict,
+    model_fingerprint,
+    save_checkpoint,
+    save_json,
+    save_state_dict,
+    seeded_state_dict,
+)
+
+# Pipeline arguments referring to the training data, not persisted by `Pipeline.save`
+DATA_ARGUMENTS = ["examples", "queries", "smiles_list", "labels", "dataset"]
 
 
 class ArchitectureType(Enum):
@@ -33,7 +69,7 @@ class Pipeline:
     def __init__(
         self,
         dataset_name: str,
-        model_name: str,
+        model_name: str | list[str],
         param_size: int,
         layers: int,
         max_depth: int = 1,
@@ -48,12 +84,15 @@ class Pipeline:
         smiles_list: list[str] = None,
         labels: list[int] = None,
         task: str = "classification",
+        dataset: Dataset = None,
     ):
         """
         Initialize the test setup by configuring the dataset and model along with optional chemical rules and subgraphs.
 
         :param dataset_name: Name of the dataset to use.
-        :param model_name: Name of the model to apply.
+        :param model_name: Name of the model to apply, or a list of models to compare. Compared models are composed
+            into one template, each with its own output predicate `predict_<model>` (see `self.models`), so they are
+            trained and tested on a single grounding, with the per-model scores in `self.task_scores`.
         :param param_size: The size of the parameters.
         :param layers: Number of layers in the model.
         :param max_depth: Maximum depth for the model.
@@ -66,8 +105,11 @@ class Pipeline:
         :param smiles_list: A list of smiles strings to build the dataset with.
         :param labels: A list of integer labels to build the dataset with.
         :param task: The type of task, either "classification" or "regression". - default: "classification"
+        :param dataset: A dataset object to use instead of loading the dataset by its name.
         :return: A tuple containing the template and dataset.
         """
+        # The arguments the pipeline was created with, used to derive reduced pipelines
+        self.config = {k: v for k, v in locals().items() if k != "self"}
 
         if bool(smiles_list) != bool(labels):
             raise ValueError(
@@ -79,7 +121,19 @@ class Pipeline:
         else:
             dataset_args = {"examples": examples, "queries": queries}
 
-        dataset = get_dataset(dataset_name, param_size, **dataset_args)
+        if dataset is None:
+            dataset = get_dataset(dataset_name, param_size, **dataset_args)
+
+        models = list(model_name) if isinstance(model_name, list | tuple) else None
+        if models is not None:
+            if not models or len({m.split("_")[0] for m in models}) != len(models):
+                raise ValueError("The compared models must be distinct.")
+            if getattr(dataset, "tasks", None):
+                raise ValueError("Models cannot be compared on a multi-task dataset.")
+            if architecture == ArchitectureType.CCD:
+                raise ValueError(
+                    "Models cannot be compared with the CCD architecture, their outputs would be mixed."
+                )
 
         if task not in ["regression", "classification"]:
             raise ValueError("Task must be either 'regression' or 'classification'.")
@@ -137,24 +191,23 @@ class Pipeline:
                 f"Invalid architecture: {architecture}. Please use one of the following: {[e.value for e in ArchitectureType]}"
             )
 
-        local = False
-        if model_name == "kgnn_local":
-            local = True
-            model_name = "kgnn"
-
-        template += get_model(
-            model_name,
-            layers,
-            io_layers["nn_input"],
-            dataset.edge_embed,
-            dataset.connection,
-            param_size,
-            edge_types=dataset.bond_types,
-            max_depth=max_depth,
-            local=local,
-            output_layer_name=io_layers["nn_output"],
-            output_layer_transformation=transformation,
-        )
+        for name in models or [model_name]:
+            local = name == "kgnn_local"
+            template += get_model(
+                "kgnn" if local else name,
+                layers,
+                io_layers["nn_input"],
+                dataset.edge_embed,
+                dataset.connection,
+                param_size,
+                edge_types=dataset.bond_types,
+                max_depth=max_depth,
+                local=local,
+                output_layer_name=f"predict_{name}"
+                if models
+                else io_layers["nn_output"],
+                output_layer_transformation=transformation,
+            )
 
         if chem_rules:
             try:
@@ -231,8 +284,55 @@ class Pipeline:
         self.dataset = dataset
         self.template = dataset + template
 
+        # Multi-task datasets have an output predicate per task, sharing the rest of the template
+        self.tasks = getattr(dataset, "tasks", None)
+        self.sample_molecules = getattr(dataset, "sample_molecules", None)
+        self.sample_tasks = getattr(dataset, "sample_tasks", None)
+
+        # Compared models are the tasks of every molecule, the knowledge base outputs are copied to each of them
+        self.models = models
+        if self.models:
+            self.tasks = self.models
+            if dataset.data is not None:
+                # The split queries live as long as the dataset referencing them
+                directory = tempfile.mkdtemp(prefix="chemlogic_")
+                weakref.finalize(dataset, shutil.rmtree, directory, ignore_errors=True)
+                dataset.data = split_queries(
+                    dataset.data, [f"predict_{name}" for name in self.models], directory
+                )
+                molecules = len(read_queries(dataset.data))
+                self.sample_molecules = [
+                    m for m in range(molecules) for _ in self.models
+                ]
+                self.sample_tasks = list(range(len(self.models))) * molecules
+
+        if self.tasks:
+            self.template.split_output(
+                "predict", [f"predict_{name}" for name in self.tasks]
+            )
+
         self.task = task
 
+    @property
+    def output_names(self) -> list[str]:
+        """The output predicates of the template, "predict_<task>" of every task or "predict"."""
+        if self.tasks:
+            return [f"predict_{task}" for task in self.tasks]
+        return ["predict"]
+
+    def complexity_report(self, atoms: int = 50, bonds: int = 52, max_degree: int = 4):
+        """
+        Static complexity report of the composed template, computed without building the dataset.
+
+        :param atoms: Number of atoms of the reference molecule.
+        :param bonds: Number of bonds of the reference molecule.
+        :param max_degree: Maximal atom degree of the reference molecule.
+        :return: A list of per-rule dicts, sorted by descending estimated number of groundings.
+        """
+        return self.template.complexity_report(
+            atoms, bonds, max_degree, connection=self.dataset.connection
+        )
+
     def train_test_cycle(
         self,
         lr: float = 0.001,
@@ -243,6 +343,23 @@ class Pipeline:
         batches: int = 1,
         early_stopping_threshold: float = 0.001,
         early_stopping_rounds: int = 10,
+        profile: bool = False,
+        workers: int = 1,
+        schedule: str = None,
+        budget: GroundingBudget = None,
+        batch_size: int = None,
+        steps_per_batch: int = 1,
+        shuffle: bool = True,
+        validation_split: float = 0.0,
+        validation_interval: int = 1,
+        best_weights_path: str = None,
+        checkpoint_path: str = None,
+        checkpoint_interval: int = 10,
+        resume_from: str = None,
+        deduplicate: bool = False,
+        grounding_cache: GroundingCache = None,
+        epoch_callback=None,
+        seed: int = None,
     ):
         """
         Train and test the model based on the provided template and dataset.
@@ -255,37 +372,790 @@ class Pipeline:
         :param batches: Number of batches to build the dataset in.
         :param early_stopping_threshold: Minimum improvement threshold to reset early stopping counter.
         :param early_stopping_rounds: Number of rounds without improvement to trigger early stopping.
+        :param profile: Attribute grounded rule instances, neurons and build time to the template rules, see `self.profiler`.
+        :param workers: Number of cost-balanced dataset shards, built one after another (see `build_dataset_sharded`).
+        :param schedule: Form the build batches and the training mini-batches (`batch_size` molecules each,
+            `batches` of them if not set) by molecule size, either "sorted" or "balanced", see `self.scheduler`.
+        :param budget: Per-molecule grounding limits, classified after every molecule's grounding (they do not bound
+            the build time or memory, see `GroundingBudget`). The molecules exceeding them are handled according to
+            its policy, see `self.fallback` for the "fallback" and "truncate" policies.
+        :param batch_size: Number of samples in a training mini-batch, the whole training dataset is used if not set.
+        :param steps_per_batch: Number of gradient steps on every mini-batch.
+        :param shuffle: Whether to shuffle the training samples every epoch (mini-batch training only).
+        :param validation_split: Ratio of the training samples used for validation. If set, early stopping is based on
+            the validation AUROC/R2 and the best-scoring weights are restored before testing.
+        :param validation_interval: Number of epochs between two validations.
+        :param best_weights_path: If set, the best-scoring weights are also saved to this JSON file.
+        :param checkpoint_path: If set, a training checkpoint is saved to this JSON file every `checkpoint_interval` epochs.
+        :param checkpoint_interval: Number of epochs between two checkpoints.
+        :param resume_from: Path to a checkpoint to resume the training from (e.g. the previous `checkpoint_path`).
+        :param deduplicate: Ground duplicate molecules once, they share a built sample (trained on with its multiplicity)
+            and are kept in the same split part.
+        :param grounding_cache: Deduplicate using this cache, sharing the built samples with other pipelines of the same
+            template using it (e.g. datasets sharing molecules).
+        :param epoch_callback: Function called after every epoch with the epoch number, the training loss and
+            the validation score (None in epochs without validation), e.g. to report to a hyperparameter search.
+            The training is stopped if it returns True.
+        :param seed: If set, the weights are reinitialized from this seed before training, see `seeded_state_dict`.
         :return: The training loss, testing loss, AUROC validation score for classification or R2 for regression tasks and the evaluator object.
         """
         if error_function is None:
             error_function = MSE if self.task == "regression" else CrossEntropy
 
-        settings = Settings(
-            optimizer=optimizer(lr=lr), epochs=epochs, error_function=error_function()
-        )
+        def create_settings():
+            return Settings(
+                optimizer=optimizer(lr=lr),
+                epochs=epochs,
+                error_function=error_function(),
+            )
+
+        if deduplicate and grounding_cache is None:
+            grounding_cache = GroundingCache(self.dataset.connection)
+        if grounding_cache is not None and self.tasks:
+            raise ValueError(
+                "Multi-task and model comparison pipelines cannot be deduplicated."
+            )
+
+        settings = create_settings()
         # TODO: log instead of print
         print(f"Building dataset in {batches} batches")
-        evaluator = get_evaluator(self.template, settings)
-        built_dataset = evaluator.build_dataset(self.dataset.data, batch_size=batches)
+        if grounding_cache is None:
+            evaluator = get_evaluator(self.template, settings)
+        else:
+            evaluator = grounding_cache.evaluator_for(self.template, settings)
+        start = time.perf_counter()
+        samples = self._build_dataset(
+            evaluator, batches, profile, workers, schedule, budget, grounding_cache
+        ).samples
+        build_time = time.perf_counter() - start
+
+        groups = None
+        if grounding_cache is not None:
+            groups = grounding_cache.keys
+            stats = grounding_cache.stats()
+            print(
+                f"Unique molecules: {len(set(groups))} of {len(groups)} | Cache hit rate: {stats['hit_rate']:.2f}"
+            )
 
-        train_dataset, test_dataset = train_test_split(
-            built_dataset.samples, train_size=split_ratio, random_state=42
+        train_indices, test_indices = self._split(
+            list(range(len(samples))), train_size=split_ratio, groups=groups
         )
+        validation_indices = []
+        if validation_split:
+            train_indices, validation_indices = self._split(
+                train_indices, test_size=validation_split, groups=groups
+            )
+
+        train_kept = [i for i in train_indices if samples[i] is not None]
+        train_dataset = [samples[i] for i in train_kept]
+        validation_dataset = [
+            samples[i] for i in validation_indices if samples[i] is not None
+        ]
+        test_dataset = [samples[i] for i in test_indices if samples[i] is not None]
+
+        # Keep the built samples and the split, so the dataset can be extended, see `self.extend`
+        self.samples = list(samples)
+        self.train_indices = list(train_indices)
+        self.validation_indices = list(validation_indices)
+        self.test_indices = list(test_indices)
+
+        self.fallback = None
+        if budget is not None and budget.exceeded and budget.policy != "skip":
+            print(
+                f"Training {budget.policy} model for {len(budget.exceeded)} molecules exceeding the grounding budget"
+            )
+            self.fallback = self._reduced_pipeline(budget)
+            fallback_evaluator, fallback_samples = self.fallback._train_within_budget(
+                create_settings(),
+                budget,
+                train_indices,
+                early_stopping_rounds,
+                early_stopping_threshold,
+            )
+
+        if seed is not None:
+            evaluator.load_state_dict(seeded_state_dict(evaluator.state_dict(), seed))
+
+        batch_order = None
+        if schedule is not None:
+            # Train on the scheduled (e.g. size-balanced) mini-batches of the training molecules
+            batch_count = (
+                batches if batch_size is None else -(-len(train_kept) // batch_size)
+            )
+            positions = {i: k for k, i in enumerate(train_kept)}
+            batch_order = [
+                [positions[i] for i in batch]
+                for batch in self.scheduler.batches(batch_count, indices=train_kept)
+            ]
+
         print("Training model")
+        start = time.perf_counter()
         train_losses = self._train_model(
             evaluator,
             train_dataset,
             settings.epochs,
             early_stopping_rounds,
             early_stopping_threshold,
+            batch_size=batch_size,
+            steps_per_batch=steps_per_batch,
+            shuffle=shuffle,
+            validation_dataset=validation_dataset,
+            validation_interval=validation_interval,
+            best_weights_path=best_weights_path,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+            resume_from=resume_from,
+            epoch_callback=epoch_callback,
+            batch_order=batch_order,
         )
-        test_loss, other_metric = self._evaluate_model(evaluator, test_dataset)
+        # The measured cost of the cycle, see also `self.neuron_count`
+        self.costs = {
+            "build_time": build_time,
+            "train_time": time.perf_counter() - start,
+        }
+
+        if self.tasks:
+            test_loss, other_metric = self._evaluate_tasks(
+                evaluator, [i for i in test_indices if samples[i] is not None]
+            )
+        elif self.fallback is None:
+            test_loss, other_metric = self._evaluate_model(evaluator, test_dataset)
+        else:
+            fallback_test_dataset = [
+                fallback_samples[i]
+                for i in test_indices
+                if samples[i] is None and fallback_samples[i] is not None
+            ]
+            predictions, targets = self._predict(evaluator, test_dataset)
+            fallback_predictions, fallback_targets = self._predict(
+                fallback_evaluator, fallback_test_dataset
+            )
+            test_loss, other_metric = self._score(
+                predictions + fallback_predictions, targets + fallback_targets
+            )
 
         # Save the trained model
         self.evaluator = evaluator
 
         return train_losses[-1], test_loss, other_metric, evaluator
 
+    def neuron_count(self) -> int:
+        """Number of neurons of the samples built by the last training, samples shared by molecules are counted once."""
+        if not hasattr(self, "samples"):
+            raise ValueError(
+                "The model has not been trained yet. Please train the model before counting its neurons."
+            )
+        unique = {id(sample): sample for sample in self.samples if sample is not None}
+        return sum(
+            len(sample.java_sample.query.evidence.allNeuronsTopologic)
+            for sample in unique.values()
+        )
+
+    def _split(self, indices, train_size=None, test_size=None, groups=None):
+        """
+        Split sample indices into two parts. The samples are split by group (molecule), so all tasks of a molecule
+        of a multi-task dataset, or all duplicates of a deduplicated molecule, end up in the same part.
+
+        :param groups: The group of every sample, defaults to the molecules of a multi-task dataset.
+        """
+        if groups is None and self.tasks:
+            groups = self.sample_molecules
+        if groups is None:
+            return train_test_split(
+                indices, train_size=train_size, test_size=test_size, random_state=42
+            )
+
+        molecules = groups
+        first, _ = train_test_split(
+            sorted({molecules[i] for i in indices}),
+            train_size=train_size,
+            test_size=test_size,
+            random_state=42,
+        )
+        first = set(first)
+        return (
+            [i for i in indices if molecules[i] in first],
+            [i for i in indices if molecules[i] not in first],
+        )
+
+    def _evaluate_tasks(self, evaluator, indices, samples=None):
+        """
+        Evaluate a multi-task model, storing the per-task testing loss and metric score in `self.task_scores`.
+
+        :param evaluator: The evaluator object used for testing.
+        :param indices: Indices of the samples to test on.
+        :param samples: The built samples, defaults to `self.samples`.
+        :return: The testing loss over all tasks and the mean metric score of the tasks.
+        """
+        samples = self.samples if samples is None else samples
+        predictions, targets = self._predict(evaluator, [samples[i] for i in indices])
+        return self._score_tasks(predictions, targets, indices)
+
+    def _score_tasks(self, predictions, targets, indices):
+        """
+        Score the predictions of a multi-task model per task, storing the scores in `self.task_scores`.
+
+        :param predictions: The predictions of the samples.
+        :param targets: The targets of the samples.
+        :param indices: Indices of the predicted samples.
+        :return: The loss over all tasks and the mean metric score of the tasks.
+        """
+        sample_tasks = [self.sample_tasks[i] for i in indices]
+
+        self.task_scores = {}
+        for t, name in enumerate(self.tasks):
+            selected = [k for k, task in enumerate(sample_tasks) if task == t]
+            task_predictions = [predictions[k] for k in selected]
+            task_targets = [targets[k] for k in selected]
+            try:
+                self.task_scores[name] = self._score(task_predictions, task_targets)
+            except ValueError:
+                # No or single-class labels of the task in the test split
+                self.task_scores[name] = (
+                    self._score_loss(task_predictions, task_targets)
+                    if selected
+                    else None,
+                    None,
+                )
+
+        metric_scores = [
+            metric for _, metric in self.task_scores.values() if metric is not None
+        ]
+        metric_score = float(np.nanmean(metric_scores)) if metric_scores else None
+        return self._score_loss(predictions, targets), metric_score
+
+    def cross_validate(
+        self,
+        k: int = 5,
+        lr: float = 0.001,
+        epochs: int = 100,
+        optimizer: Optimizer = Adam,
+        error_function: ErrorFunction = None,
+        batches: int = 1,
+        early_stopping_threshold: float = 0.001,
+        early_stopping_rounds: int = 10,
+        batch_size: int = None,
+        steps_per_batch: int = 1,
+        shuffle: bool = True,
+        seed: int = 42,
+        workers: int = 1,
+    ):
+        """
+        K-fold cross-validation reusing a single grounding of the dataset. The dataset is built once and the weights
+        are reinitialized from the seed before every fold, which is trained and tested on the shared built samples.
+        The tasks of a molecule of a multi-task dataset are kept in the same fold.
+
+        :param k: Number of folds.
+        :param lr: Learning rate for the optimizer.
+        :param epochs: Number of training epochs of every fold.
+        :param optimizer: The optimizer class to be used.
+        :param error_function: The error function to be used.
+        :param batches: Number of batches to build the dataset in.
+        :param early_stopping_threshold: Minimum improvement threshold to reset early stopping counter.
+        :param early_stopping_rounds: Number of rounds without improvement to trigger early stopping.
+        :param batch_size: Number of samples in a training mini-batch, the whole training fold is used if not set.
+        :param steps_per_batch: Number of gradient steps on every mini-batch.
+        :param shuffle: Whether to shuffle the training samples every epoch (mini-batch training only).
+        :param seed: Seed of the fold assignment, the weight initialization (`seed + fold`) and the shuffling.
+        :param workers: Number of processes running the folds. The built samples are bound to the backend of the process
+            that built them, so every process builds the dataset once and runs its share of the folds.
+        :return: A dictionary with the per-fold training loss, testing loss and AUROC/R2 score under "folds",
+            and their mean and standard deviation over the folds under "mean" and "std".
+        """
+        if k < 2:
+            raise ValueError("Cross-validation requires at least 2 folds.")
+
+        arguments = {
+            "k": k,
+            "lr": lr,
+            "epochs": epochs,
+            "optimizer": optimizer,
+            "error_function": error_function,
+            "batches": batches,
+            "early_stopping_threshold": early_stopping_threshold,
+            "early_stopping_rounds": early_stopping_rounds,
+            "batch_size": batch_size,
+            "steps_per_batch": steps_per_batch,
+            "shuffle": shuffle,
+            "seed": seed,
+        }
+
+        workers = min(workers, k)
+        if workers <= 1:
+            folds = self._cross_validate_folds(list(range(k)), **arguments)
+        else:
+            # Spawned processes start their own backend, a forked one would be unusable
+            with ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _cross_validate_worker,
+                        self.config,
+                        list(range(w, k, workers)),
+                        arguments,
+                    )
+                    for w in range(workers)
+                ]
+                folds = [fold for future in futures for fold in future.result()]
+            folds.sort(key=lambda fold: fold["fold"])
+
+        metrics = ["train_loss", "test_loss", "metric"]
+        return {
+            "folds": folds,
+            "mean": {
+                m: float(np.nanmean([fold[m] for fold in folds], dtype=float))
+                for m in metrics
+            },
+            "std": {
+                m: float(np.nanstd([fold[m] for fold in folds], dtype=float))
+                for m in metrics
+            },
+        }
+
+    def _cross_validate_folds(
+        self,
+        fold_numbers,
+        k,
+        lr,
+        epochs,
+        optimizer,
+        error_function,
+        batches,
+        early_stopping_threshold,
+        early_stopping_rounds,
+        batch_size,
+        steps_per_batch,
+        shuffle,
+        seed,
+    ):
+        """
+        Build the dataset once and train and test the given folds on it, see `cross_validate`.
+
+        :return: A list of per-fold results.
+        """
+        if error_function is None:
+            error_function = MSE if self.task == "regression" else CrossEntropy
+
+        settings = Settings(
+            optimizer=optimizer(lr=lr), epochs=epochs, error_function=error_function()
+        )
+
+        print(f"Building dataset in {batches} batches")
+        evaluator = get_evaluator(self.template, settings)
+        samples = self._build_dataset(evaluator, batches).samples
+        splits = self._folds(len(samples), k, seed)
+
+        results = []
+        for fold in fold_numbers:
+            print(f"Training fold {fold + 1}/{k}")
+            train_indices, test_indices = splits[fold]
+            evaluator.load_state_dict(
+                seeded_state_dict(evaluator.state_dict(), seed + fold)
+            )
+
+            train_losses = self._train_model(
+                evaluator,
+                [samples[i] for i in train_indices],
+                epochs,
+                early_stopping_rounds,
+                early_stopping_threshold,
+                batch_size=batch_size,
+                steps_per_batch=steps_per_batch,
+                shuffle=shuffle,
+                seed=seed + fold,
+            )
+            if self.tasks:
+                test_loss, metric = self._evaluate_tasks(
+                    evaluator, test_indices, samples
+                )
+            else:
+                test_loss, metric = self._evaluate_model(
+                    evaluator, [samples[i] for i in test_indices]
+                )
+            results.append(
+                {
+                    "fold": fold,
+                    "train_loss": train_losses[-1],
+                    "test_loss": test_loss,
+                    "metric": metric,
+                }
+            )
+            print(
+                f"Fold {fold + 1}/{k} | Train loss: {train_losses[-1]} | Test loss: {test_loss} | Metric: {metric}"
+            )
+
+        return results
+
+    def _folds(self, count, k, seed):
+        """
+        K-fold splits of the sample indices. The samples of a multi-task dataset are split by molecule,
+        like in `self._split`.
+
+        :return: A list of (train indices, test indices) pairs, one per fold.
+        """
+        kfold = KFold(n_splits=k, shuffle=True, random_state=seed)
+        if not self.tasks:
+            return [
+                (list(train), list(test)) for train, test in kfold.split(range(count))
+            ]
+
+        molecules = sorted(set(self.sample_molecules[:count]))
+        splits = []
+        for _, test in kfold.split(molecules):
+            test = {molecules[m] for m in test}
+            splits.append(
+                (
+                    [i for i in range(count) if self.sample_molecules[i] not in test],
+                    [i for i in range(count) if self.sample_molecules[i] in test],
+                )
+            )
+        return splits
+
+    def train_ensemble(
+        self,
+        seeds: list[int] = (0, 1, 2, 3, 4),
+        lr: float = 0.001,
+        epochs: int = 100,
+        split_ratio: float = 0.75,
+        optimizer: Optimizer = Adam,
+        error_function: ErrorFunction = None,
+        batches: int = 1,
+        early_stopping_threshold: float = 0.001,
+        early_stopping_rounds: int = 10,
+        batch_size: int = None,
+        steps_per_batch: int = 1,
+        shuffle: bool = True,
+        workers: int = 1,
+    ):
+        """
+        Train an ensemble of independently seeded models on a single grounding of the dataset.
+
+        The built samples are bound to the weights of the evaluator that built them, so the members share one evaluator:
+        before training a member, its weights are reinitialized from the member's seed, after training they are stored
+        in `self.ensemble`. Use `ensemble_inference` for ensemble-averaged predictions.
+        The tasks of a molecule of a multi-task or model comparison pipeline are kept in the same part and scored
+        per task, under "task_scores" of every member and in `self.task_scores` for the ensemble.
+
+        :param seeds: The weight initialization seeds, one per member.
+        :param lr: Learning rate for the optimizer.
+        :param epochs: Number of training epochs of every member.
+        :param split_ratio: The ratio to split the dataset into training and testing.
+        :param optimizer: The optimizer class to be used.
+        :param error_function: The error function to be used.
+        :param batches: Number of batches to build the dataset in.
+        :param early_stopping_threshold: Minimum improvement threshold to reset early stopping counter.
+        :param early_stopping_rounds: Number of rounds without improvement to trigger early stopping.
+        :param batch_size: Number of samples in a training mini-batch, the whole training dataset is used if not set.
+        :param steps_per_batch: Number of gradient steps on every mini-batch.
+        :param shuffle: Whether to shuffle the training samples every epoch (mini-batch training only).
+        :param workers: Number of processes training the members. The built samples are bound to the backend of the
+            process that built them, so every process grounds the whole dataset again (`workers` groundings instead of
+            one), trading the single grounding for training the members in parallel.
+        :return: A dictionary with the per-member training loss, testing loss and AUROC/R2 score under "members",
+            their mean and standard deviation under "mean" and "std", the testing loss and score of the
+            ensemble-averaged predictions under "ensemble" and the averaged test predictions and targets.
+        """
+        seeds = list(seeds)
+        if not seeds:
+            raise ValueError("At least one seed is required.")
+
+        arguments = {
+            "lr": lr,
+            "epochs": epochs,
+            "split_ratio": split_ratio,
+            "optimizer": optimizer,
+            "error_function": error_function,
+            "batches": batches,
+            "early_stopping_threshold": early_stopping_threshold,
+            "early_stopping_rounds": early_stopping_rounds,
+            "batch_size": batch_size,
+            "steps_per_batch": steps_per_batch,
+            "shuffle": shuffle,
+        }
+
+        workers = min(workers, len(seeds))
+        if workers <= 1:
+            evaluator, members = self._train_members(seeds, **arguments)
+        else:
+            with ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _ensemble_worker, self.config, seeds[w::workers], arguments
+                    )
+                    for w in range(workers)
+                ]
+                members = [member for future in futures for member in future.result()]
+            members.sort(key=lambda member: seeds.index(member["seed"]))
+
+            # The members were trained in other processes, an evaluator with their settings is needed for inference,
+            # it grounds the molecules to predict only
+            evaluator = get_evaluator(
+                self.template,
+                self._settings(lr, epochs, optimizer, error_function),
+            )
+            evaluator.load_state_dict(members[-1]["state_dict"])
+
+        self.evaluator = evaluator
+        self.ensemble = [member.pop("state_dict") for member in members]
+
+        predictions = np.mean(
+            [np.asarray(member.pop("predictions"), dtype=float) for member in members],
+            axis=0,
+        ).tolist()
+        targets = members[0].pop("targets")
+        test_indices = members[0].pop("test_indices")
+        for member in members[1:]:
+            del member["targets"], member["test_indices"]
+        if self.tasks:
+            ensemble_loss, ensemble_metric = self._score_tasks(
+                predictions, targets, test_indices
+            )
+        else:
+            ensemble_loss, ensemble_metric = self._score(predictions, targets)
+
+        metrics = ["train_loss", "test_loss", "metric"]
+        return {
+            "members": members,
+            "mean": {
+                m: float(np.nanmean([member[m] for member in members], dtype=float))
+                for m in metrics
+            },
+            "std": {
+                m: float(np.nanstd([member[m] for member in members], dtype=float))
+                for m in metrics
+            },
+            "ensemble": {"test_loss": ensemble_loss, "metric": ensemble_metric},
+            "predictions": predictions,
+            "targets": targets,
+        }
+
+    def _train_members(
+        self,
+        seeds,
+        lr,
+        epochs,
+        split_ratio,
+        optimizer,
+        error_function,
+        batches,
+        early_stopping_threshold,
+        early_stopping_rounds,
+        batch_size,
+        steps_per_batch,
+        shuffle,
+    ):
+        """
+        Build the dataset once and train a member for every seed on it, see `train_ensemble`.
+
+        :return: The evaluator and a list of members, each with its scores, test predictions and weights.
+        """
+        settings = self._settings(lr, epochs, optimizer, error_function)
+
+        print(f"Building dataset in {batches} batches")
+        evaluator = get_evaluator(self.template, settings)
+        samples = self._build_dataset(evaluator, batches).samples
+        train_indices, test_indices = self._split(
+            list(range(len(samples))), train_size=split_ratio
+        )
+        train_dataset = [samples[i] for i in train_indices]
+        test_dataset = [samples[i] for i in test_indices]
+
+        members = []
+        for seed in seeds:
+            print(f"Training ensemble member with seed {seed}")
+            evaluator.load_state_dict(seeded_state_dict(evaluator.state_dict(), seed))
+
+            train_losses = self._train_model(
+                evaluator,
+                train_dataset,
+                epochs,
+                early_stopping_rounds,
+                early_stopping_threshold,
+                batch_size=batch_size,
+                steps_per_batch=steps_per_batch,
+                shuffle=shuffle,
+                seed=seed,
+            )
+            predictions, targets = self._predict(evaluator, test_dataset)
+            member = {"seed": seed}
+            if self.tasks:
+                test_loss, metric = self._score_tasks(
+                    predictions, targets, test_indices
+                )
+                member["task_scores"] = self.task_scores
+            else:
+                test_loss, metric = self._score(predictions, targets)
+            members.append(
+                {
+                    **member,
+                    "train_loss": train_losses[-1],
+                    "test_loss": test_loss,
+                    "metric": metric,
+                    "predictions": predictions,
+                    "targets": targets,
+                    "test_indices": test_indices,
+                    "state_dict": copy_state_dict(evaluator.state_dict()),
+                }
+            )
+            print(
+                f"Seed {seed} | Train loss: {train_losses[-1]} | Test loss: {test_loss} | Metric: {metric}"
+            )
+
+        return evaluator, members
+
+    def _settings(self, lr, epochs, optimizer, error_function):
+        """Settings of an evaluator, the error function defaults to the one of the task."""
+        if error_function is None:
+            error_function = MSE if self.task == "regression" else CrossEntropy
+        return Settings(
+            optimizer=optimizer(lr=lr), epochs=epochs, error_function=error_function()
+        )
+
+    def _train_within_budget(
+        self,
+        settings: Settings,
+        budget: GroundingBudget,
+        train_indices,
+        early_stopping_rounds=10,
+        early_stopping_threshold=0.001,
+    ):
+        """
+        Build the dataset within the budget (skipping the molecules exceeding it) and train on the training split.
+
+        :param settings: The settings of the evaluator.
+        :param budget: The grounding budget.
+        :param train_indices: Indices of the training molecules.
+        :param early_stopping_rounds: Number of rounds without improvement to trigger early stopping.
+        :param early_stopping_threshold: Minimum improvement threshold to reset early stopping counter.
+        :return: The trained evaluator and the built samples, with None in place of the skipped molecules.
+        """
+        evaluator = get_evaluator(self.template, settings)
+        samples = (
+            GroundingBudget(budget.max_neurons, budget.max_time)
+            .build(evaluator, self.dataset.data)
+            .samples
+        )
+        self._train_model(
+            evaluator,
+            [samples[i] for i in train_indices if samples[i] is not None],
+            settings.epochs,
+            early_stopping_rounds,
+            early_stopping_threshold,
+        )
+        self.evaluator = evaluator
+        return evaluator, samples
+
+    def _reduced_pipeline(self, budget: GroundingBudget):
+        """
+        Create a pipeline with a cheaper template for the molecules exceeding the grounding budget.
+
+        :param budget: The grounding budget, "fallback" drops the knowledge base and keeps the model only,
+            "truncate" keeps the configuration with reduced depth and cycle size.
+        :return: The reduced pipeline.
+        """
+        config = dict(self.config)
+        if budget.policy == "fallback":
+            config.update(
+                subgraphs=None, chem_rules=None, architecture=ArchitectureType.BARE
+            )
+        else:
+            config.update(
+                max_depth=min(config["max_depth"], budget.truncated_depth),
+                max_subgraph_depth=min(
+                    config["max_subgraph_depth"], budget.truncated_depth
+                ),
+                max_cycle_size=min(
+                    config["max_cycle_size"], budget.truncated_cycle_size
+                ),
+            )
+        return Pipeline(**config)
+
+    def _build_dataset(
+        self,
+        evaluator,
+        batches: int = 1,
+        profile: bool = False,
+        workers: int = 1,
+        schedule: str = None,
+        budget: GroundingBudget = None,
+        grounding_cache: GroundingCache = None,
+    ):
+        """
+        Build (ground and neuralize) the dataset.
+
+        :param evaluator: The evaluator object used for building.
+        :param batches: Number of batches to build the dataset in.
+        :param profile: Record a per-rule grounding profile in `self.profiler`.
+        :param workers: Number of cost-balanced dataset shards, built one after another (see `build_dataset_sharded`).
+        :param schedule: Form the build batches by molecule size, either "sorted" or "balanced".
+        :param budget: Build the molecules one by one, leaving out the ones exceeding the per-molecule limits.
+        :param grounding_cache: Build only the molecules without a cached sample, see `GroundingCache`.
+        :return: The built dataset.
+        """
+        if (
+            sum(
+                [
+                    profile,
+                    workers > 1,
+                    schedule is not None,
+                    budget is not None,
+                    grounding_cache is not None,
+                ]
+            )
+            > 1
+        ):
+            raise ValueError(
+                "Only one of `profile`, `workers`, `schedule`, `budget` and `grounding_cache` can be used at a time."
+            )
+        # These build the molecules separately and place one sample per molecule, while a multi-task
+        # (or model comparison) molecule has a sample per task
+        if self.tasks and (
+            profile or workers > 1 or schedule is not None or budget is not None
+        ):
+            raise ValueError(
+                "Multi-task and model comparison pipelines support neither `profile`, `workers`, `schedule` nor `budget`."
+            )
+
+        if grounding_cache is not None:
+            return grounding_cache.build(evaluator, self.dataset.data, batches)
+
+        if budget is not None:
+            return budget.build(evaluator, self.dataset.data)
+
+        if schedule is not None:
+            self.scheduler = SizeScheduler.from_dataset(
+                self.dataset.data, self.dataset.connection, self.template, schedule
+            )
+            built_dataset = self.scheduler.build(evaluator, self.dataset.data, batches)
+            summary = self.scheduler.summary(self.scheduler.build_statistics)
+            print(
+                f"Built {summary['batches']} {schedule} batches | Mean cost: {summary['mean_cost']:.0f} | Max cost: {summary['max_cost']:.0f} | Imbalance: {summary['imbalance']:.2f}"
+            )
+            return built_dataset
+
+        if workers > 1:
+            return build_dataset_sharded(
+                evaluator,
+                self.dataset.data,
+                workers,
+                batch_size=batches,
+                connection=self.dataset.connection,
+            )
+
+        if not profile:
+            return evaluator.build_dataset(self.dataset.data, batch_size=batches)
+
+        self.profiler = GroundingProfiler(self.template, self.dataset.connection)
+        return self.profiler.profile(
+            evaluator,
+            self.dataset.data,
+            dataset_name=self.dataset.dataset_name,
+            batch_size=batches,
+        )
+
     def _train_model(
         self,
         evaluator,
@@ -293,6 +1163,18 @@ class Pipeline:
         epochs,
         early_stopping_rounds=10,
         early_stopping_threshold=0.001,
+        batch_size: int = None,
+        steps_per_batch: int = 1,
+        shuffle: bool = True,
+        seed: int = 42,
+        validation_dataset=None,
+        validation_interval: int = 1,
+        best_weights_path: str = None,
+        checkpoint_path: str = None,
+        checkpoint_interval: int = 10,
+        resume_from: str = None,
+        epoch_callback=None,
+        batch_order: list = None,
     ):
         """
         Train the model on the training dataset.
@@ -302,31 +1184,156 @@ class Pipeline:
         :param epochs: Number of training epochs.
         :param early_stopping_rounds: Number of rounds without improvement to trigger early stopping.
         :param early_stopping_threshold: Minimum improvement threshold to reset early stopping counter.
-        :return: List of average training losses per epoch.
+        :param batch_size: Number of samples in a mini-batch, the whole training dataset is used if not set.
+        :param steps_per_batch: Number of gradient steps on every mini-batch.
+        :param shuffle: Whether to shuffle the training samples every epoch (mini-batch training only).
+        :param seed: Seed of the shuffling.
+        :param validation_dataset: If set, early stopping is based on the validation AUROC/R2 instead of the training
+            loss, and the best-scoring weights are restored after training.
+        :param validation_interval: Number of epochs between two validations, the early stopping rounds are counted
+            in validations.
+        :param best_weights_path: If set, the best-scoring weights are also saved to this JSON file.
+        :param checkpoint_path: If set, a training checkpoint is saved to this JSON file every `checkpoint_interval`
+            epochs, see `utils.state.save_checkpoint`.
+        :param checkpoint_interval: Number of epochs between two checkpoints.
+        :param resume_from: Path to a checkpoint to resume the training from.
+        :param epoch_callback: Function called after every epoch with the epoch number, the training loss and
+            the validation score (None in epochs without validation). The training is stopped if it returns True.
+        :param batch_order: Fixed mini-batches, each a list of positions in `train_dataset` (e.g. size-balanced
+            batches, see `SizeScheduler.batches`), used instead of `batch_size`. With `shuffle`, the order of the
+            batches is shuffled every epoch.
+        :return: List of average training losses per epoch. The throughput (samples per second) of every epoch is
+            stored in `self.throughput` and the validation scores in `self.validation_scores`.
         """
-        average_losses = []
-        best_loss = float("inf")
-        rounds_without_improvement = 0
+        progress = {
+            "epoch": 0,
+            "losses": [],
+            "throughput": [],
+            "validation_scores": [],
+            "best_loss": float("inf"),
+            "best_score": float("-inf"),
+            "best_state": None,
+            "rounds_without_improvement": 0,
+            "order": list(range(len(train_dataset))),
+            "batch_order": None if batch_order is None else list(batch_order),
+            "rng_state": None,
+        }
+        rng = random.Random(seed)
 
-        for epoch in range(epochs):
-            current_total_loss, number_of_samples = next(evaluator.train(train_dataset))
-            train_loss = current_total_loss / number_of_samples
-            average_losses.append(train_loss)
+        if resume_from is not None:
+            progress.update(load_checkpoint(resume_from))
+            rng.setstate(progress["rng_state"])
+            evaluator.load_state_dict(progress.pop("state_dict"))
+            print(f"Resuming training from epoch {progress['epoch']}")
+
+        self.throughput = progress["throughput"]
+        self.validation_scores = progress["validation_scores"]
 
-            if train_loss < best_loss - early_stopping_threshold:
-                best_loss = train_loss
-                rounds_without_improvement = 0
+        for epoch in range(progress["epoch"], epochs):
+            if progress["batch_order"] is not None:
+                if shuffle:
+                    rng.shuffle(progress["batch_order"])
+                batches = [
+                    [train_dataset[i] for i in batch]
+                    for batch in progress["batch_order"]
+                ]
+            elif batch_size is None:
+                batches = [train_dataset]
             else:
-                rounds_without_improvement += 1
-            print(
-                f"Epoch {epoch + 1}/{epochs} | Train loss: {train_loss} | Best loss: {best_loss} | Difference: {best_loss - train_loss}"
+                if shuffle:
+                    rng.shuffle(progress["order"])
+                batches = [
+                    [train_dataset[i] for i in progress["order"][j : j + batch_size]]
+                    for j in range(0, len(train_dataset), batch_size)
+                ]
+
+            start = time.perf_counter()
+            current_total_loss, number_of_samples = 0, 0
+            for batch in batches:
+                for _ in range(steps_per_batch):
+                    batch_loss, batch_samples = next(evaluator.train(batch))
+                current_total_loss += batch_loss
+                number_of_samples += batch_samples
+            elapsed = time.perf_counter() - start
+
+            train_loss = current_total_loss / number_of_samples
+            progress["epoch"] = epoch + 1
+            progress["losses"].append(train_loss)
+            self.throughput.append(
+                number_of_samples * steps_per_batch / elapsed if elapsed else 0.0
             )
 
-            if rounds_without_improvement >= early_stopping_rounds:
-                print(f"Early stopping triggered after {epoch + 1} epochs.")
+            score = None
+            if not validation_dataset:
+                if train_loss < progress["best_loss"] - early_stopping_threshold:
+                    progress["best_loss"] = train_loss
+                    progress["rounds_without_improvement"] = 0
+                else:
+                    progress["rounds_without_improvement"] += 1
+                print(
+                    f"Epoch {epoch + 1}/{epochs} | Train loss: {train_loss} | Best loss: {progress['best_loss']} | Difference: {progress['best_loss'] - train_loss} | Samples/s: {self.throughput[-1]:.1f}"
+                )
+            elif (epoch + 1) % validation_interval == 0 or epoch + 1 == epochs:
+                score = self._validation_score(evaluator, validation_dataset)
+                self.validation_scores.append((epoch + 1, score))
+                if score > progress["best_score"] + early_stopping_threshold:
+                    progress["best_score"] = score
+                    progress["best_state"] = copy_state_dict(evaluator.state_dict())
+                    if best_weights_path is not None:
+                        save_state_dict(progress["best_state"], best_weights_path)
+                    progress["rounds_without_improvement"] = 0
+                else:
+                    progress["rounds_without_improvement"] += 1
+                print(
+                    f"Epoch {epoch + 1}/{epochs} | Train loss: {train_loss} | Validation score: {score} | Best score: {progress['best_score']} | Samples/s: {self.throughput[-1]:.1f}"
+                )
+
+            stopped = epoch_callback is not None and bool(
+                epoch_callback(epoch + 1, train_loss, score)
+            )
+            stop = (
+                stopped
+                or progress["rounds_without_improvement"] >= early_stopping_rounds
+            )
+            if checkpoint_path is not None and (
+                (epoch + 1) % checkpoint_interval == 0 or stop or epoch + 1 == epochs
+            ):
+                progress["rng_state"] = rng.getstate()
+                save_checkpoint(checkpoint_path, progress, evaluator.state_dict())
+
+            if stop:
+                if stopped:
+                    print(f"Training stopped by the callback after {epoch + 1} epochs.")
+                else:
+                    print(f"Early stopping triggered after {epoch + 1} epochs.")
                 break
 
-        return average_losses
+        if progress["best_state"] is not None:
+            print(
+                f"Restoring the best weights (validation score: {progress['best_score']})"
+            )
+            evaluator.load_state_dict(progress["best_state"])
+
+        return progress["losses"]
+
+    def _validation_score(self, evaluator, validation_dataset):
+        """
+        Score the model on the validation dataset, higher is better.
+
+        :param evaluator: The evaluator object used for testing.
+        :param validation_dataset: The dataset to validate on.
+        :return: The AUROC for classification or R2 for regression tasks, or the negative loss if the metric
+            is undefined (e.g. a single class in the validation dataset).
+        """
+        predictions, targets = self._predict(evaluator, validation_dataset)
+        try:
+            loss, metric_score = self._score(predictions, targets)
+        except ValueError:
+            return -self._score_loss(predictions, targets)
+
+        if metric_score is None or np.isnan(metric_score):
+            return -loss
+        return metric_score
 
     def _evaluate_model(self, evaluator, test_dataset):
         """
@@ -336,62 +1343,329 @@ class Pipeline:
         :param test_dataset: The dataset to test on.
         :return: The testing loss and the specified metric score.
         """
+        return self._score(*self._predict(evaluator, test_dataset))
+
+    def _predict(self, evaluator, test_dataset):
+        """
+        Predict the test dataset.
 
+        :param evaluator: The evaluator object used for testing.
+        :param test_dataset: The dataset to test on.
+        :return: The predictions and targets.
+        """
         predictions = []
         targets = []
+        if not test_dataset:
+            return predictions, targets
+
         for sample, y_hat in zip(
             test_dataset, evaluator.test(test_dataset, generator=False), strict=False
         ):
             predictions.append(y_hat)
             targets.append(sample.java_sample.target.value)
+        return predictions, targets
+
+    def _score(self, predictions, targets):
+        """
+        Score the predictions.
+
+        :param predictions: The predicted values.
+        :param targets: The target values.
+        :return: The testing loss and the specified metric score.
+        """
+        loss = self._score_loss(predictions, targets)
 
         metric_score = None
         if self.task == "classification":
             metric_score = roc_auc_score(targets, predictions)
-            # Accuracy
-            loss = sum(
-                round(pred) != target
-                for pred, target in zip(predictions, targets, strict=False)
-            ) / len(test_dataset)
         elif self.task == "regression":
             metric_score = r2_score(targets, predictions)
-            # Mean Squared Error
-            loss = sum(
-                (pred - target) ** 2
-                for pred, target in zip(predictions, targets, strict=False)
-            ) / len(test_dataset)
 
         return loss, metric_score
 
-    def inference(self, smiles_list: list[str]):
+    def _score_loss(self, predictions, targets):
+        """
+        Compute the testing loss: the error rate for classification or the mean squared error for regression tasks.
+
+        :param predictions: The predicted values.
+        :param targets: The target values.
+        :return: The testing loss.
+        """
+        predictions = np.asarray(predictions, dtype=float)
+        targets = np.asarray(targets, dtype=float)
+
+        if self.task == "classification":
+            # Accuracy
+            return float(np.mean(np.round(predictions) != targets))
+        # Mean Squared Error
+        return float(np.mean((predictions - targets) ** 2))
+
+    def extend(
+        self,
+        examples: str = None,
+        queries: str = None,
+        smiles_list: list[str] = None,
+        labels: list[int] = None,
+        split_ratio: float = 0.75,
+        fine_tune_epochs: int = 0,
+        early_stopping_threshold: float = 0.001,
+        early_stopping_rounds: int = 10,
+    ):
+        """
+        Add new molecules to the built dataset, grounding only the new molecules against the trained template.
+
+        :param examples: Path to the examples file of the new molecules.
+        :param queries: Path to the queries file of the new molecules.
+        :param smiles_list: A list of SMILES strings of the new molecules, used instead of the files.
+        :param labels: A list of labels of the new molecules.
+        :param split_ratio: The ratio to split the new molecules into training and testing.
+        :param fine_tune_epochs: Number of epochs to continue training the evaluator on the enlarged training set.
+        :param early_stopping_threshold: Minimum improvement threshold to reset early stopping counter.
+        :param early_stopping_rounds: Number of rounds without improvement to trigger early stopping.
+        :return: The training loss (None without fine-tuning), testing loss, AUROC validation score for classification
+            or R2 for regression tasks on the enlarged test set and the evaluator object.
+        """
+        if not hasattr(self, "evaluator"):
+            raise ValueError(
+                "The model has not been trained yet. Please train the model before extending the dataset."
+            )
+        if self.tasks:
+            # The new samples would need their molecules and tasks, see `self.sample_molecules`
+            raise ValueError(
+                "Multi-task and model comparison pipelines cannot be extended."
+            )
+        if bool(smiles_list) != bool(labels):
+            raise ValueError(
+                "If extending the dataset from SMILES, make sure to provide both `smiles_list` and `labels` params."
+            )
+        if not smiles_list and not queries:
+            raise ValueError("Provide either `smiles_list` and `labels` or `queries`.")
+
+        if smiles_list:
+            new_data = get_dataset(
+                self.dataset.dataset_name,
+                self.dataset.param_size,
+                smiles_list=smiles_list,
+                labels=labels,
+            ).data
+        else:
+            new_data = FileDataset(examples_file=examples, queries_file=queries)
+
+        print("Building new molecules")
+        new_samples = self.evaluator.build_dataset(new_data, batch_size=1).samples
+
+        new_indices = list(
+            range(len(self.samples), len(self.samples) + len(new_samples))
+        )
+        if len(new_indices) > 1:
+            train_indices, test_indices = train_test_split(
+                new_indices, train_size=split_ratio, random_state=42
+            )
+        else:
+            train_indices, test_indices = new_indices, []
+
+        self.samples.extend(new_samples)
+        self.train_indices.extend(train_indices)
+        self.test_indices.extend(test_indices)
+
+        train_loss = None
+        if fine_tune_epochs:
+            print("Fine-tuning model")
+            train_loss = self._train_model(
+                self.evaluator,
+                [
+                    self.samples[i]
+                    for i in self.train_indices
+                    if self.samples[i] is not None
+                ],
+                fine_tune_epochs,
+                early_stopping_rounds,
+                early_stopping_threshold,
+            )[-1]
+
+        test_loss, other_metric = self._evaluate_model(
+            self.evaluator,
+            [self.samples[i] for i in self.test_indices if self.samples[i] is not None],
+        )
+        return train_loss, test_loss, other_metric, self.evaluator
+
+    def save(self, path: str):
+        """
+        Save the trained pipeline as a self-contained artifact: the configuration, dataset vocabulary,
+        composed template and learned weights. The training data is not included.
+
+        :param path: The directory to save the pipeline to.
+        """
+        if not hasattr(self, "evaluator"):
+            raise ValueError(
+                "The model has not been trained yet. Please train the model before saving it."
+            )
+
+        config = {
+            key: value
+            for key, value in self.config.items()
+            if key not in DATA_ARGUMENTS
+        }
+        config["architecture"] = config["architecture"].name
+
+        save_json(
+            {"config": config, "vocabulary": self.dataset.vocabulary()},
+            os.path.join(path, "pipeline.json"),
+        )
+        with open(os.path.join(path, "template.txt"), "w") as f:
+            f.write(str(self.template))
+        save_state_dict(self.evaluator.state_dict(), os.path.join(path, "weights.json"))
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load a pipeline saved by `Pipeline.save`, ready for inference. The training data is not read.
+
+        :param path: The directory the pipeline was saved to.
+        :return: The loaded pipeline.
+        """
+        with open(os.path.join(path, "pipeline.json")) as f:
+            saved = json.load(f)
+
+        config = saved["config"]
+        config["architecture"] = ArchitectureType.from_string(config["architecture"])
+        pipeline = cls(**config, dataset=VocabularyDataset(saved["vocabulary"]))
+
+        with open(os.path.join(path, "template.txt")) as f:
+            if f.read() != str(pipeline.template):
+                raise ValueError(
+                    "The saved template does not match the template created from the saved configuration."
+                )
+
+        pipeline.evaluator = get_evaluator(pipeline.template, Settings())
+        pipeline.evaluator.load_state_dict(
+            load_state_dict(os.path.join(path, "weights.json"))
+        )
+        return pipeline
+
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the trained model, changes with the template and the weights.
+        Used to key the `PredictionCache`.
+        """
+        if not hasattr(self, "evaluator"):
+            raise ValueError(
+                "The model has not been trained yet. Please train the model before computing its fingerprint."
+            )
+
+        return model_fingerprint(str(self.template), self.evaluator.state_dict())
+
+    def inference(self, smiles_list: list[str], cache=None):
         """
         Perform inference on a list of SMILES strings.
 
         :param smiles_list: A list of SMILES strings to perform inference on.
-        :return: A list of predictions corresponding to the input SMILES strings.
+        :param cache: An optional `PredictionCache`. Only the molecules not yet predicted by this model are evaluated,
+            SMILES that cannot be parsed are predicted as None.
+        :return: A list of predictions corresponding to the input SMILES strings, None for SMILES that cannot be parsed.
+            The prediction of a multi-task or model comparison pipeline is the list of its outputs in the order of
+            the tasks, see `self.output_names`.
         """
         if not hasattr(self, "evaluator"):
             raise ValueError(
                 "The model has not been trained yet. Please train the model before performing inference."
             )
 
-        inference_dataset = get_dataset(
-            self.dataset.dataset_name,
-            self.dataset.param_size,
-            smiles_list=smiles_list,
-            labels=[0] * len(smiles_list),  # Dummy labels
-        )
+        if cache is not None:
+            return cache.predict(self.fingerprint(), smiles_list, self.inference)
+
+        predictions = [None] * len(smiles_list)
+        built_dataset, valid = self._build_inference_dataset(smiles_list)
+        if not valid:
+            return predictions
 
-        built_dataset = self.evaluator.build_dataset(
-            inference_dataset.data, batch_size=1
+        outputs = self._group_outputs(
+            list(self.evaluator.test(built_dataset, generator=False))
         )
+        for i, y_hat in zip(valid, outputs, strict=True):
+            predictions[i] = y_hat
 
-        predictions = []
-        for _, y_hat in zip(
-            built_dataset.samples,
-            self.evaluator.test(built_dataset, generator=False),
-            strict=False,
+        return predictions
+
+    def ensemble_inference(self, smiles_list: list[str], return_std: bool = False):
+        """
+        Perform ensemble inference on a list of SMILES strings. The molecules are grounded once and evaluated
+        with the weights of every member trained by `train_ensemble`.
+
+        :param smiles_list: A list of SMILES strings to perform inference on.
+        :param return_std: Also return the standard deviation of the member predictions.
+        :return: A list of ensemble-averaged predictions corresponding to the input SMILES strings
+            (and a list of their standard deviations), None for SMILES that cannot be parsed. Like in `inference`,
+            the prediction of a multi-task or model comparison pipeline is the list of its outputs.
+        """
+        if not getattr(self, "ensemble", None):
+            raise ValueError(
+                "No ensemble has been trained yet. Please train an ensemble before performing ensemble inference."
+            )
+
+        predictions = [None] * len(smiles_list)
+        deviations = [None] * len(smiles_list)
+        built_dataset, valid = self._build_inference_dataset(smiles_list)
+        if not valid:
+            return (predictions, deviations) if return_std else predictions
+
+        current_state = copy_state_dict(self.evaluator.state_dict())
+
+        member_predictions = []
+        try:
+            for state_dict in self.ensemble:
+                self.evaluator.load_state_dict(state_dict)
+                member_predictions.append(
+                    np.asarray(
+                        list(self.evaluator.test(built_dataset, generator=False)),
+                        dtype=float,
+                    )
+                )
+        finally:
+            self.evaluator.load_state_dict(current_state)
+
+        for i, mean, std in zip(
+            valid,
+            self._group_outputs(np.mean(member_predictions, axis=0).tolist()),
+            self._group_outputs(np.std(member_predictions, axis=0).tolist()),
+            strict=True,
         ):
-            predictions.append(y_hat)
+            predictions[i], deviations[i] = mean, std
 
+        if return_std:
+            return predictions, deviations
         return predictions
+
+    def _build_inference_dataset(self, smiles_list: list[str]):
+        """
+        Build SMILES strings for inference, converted in memory (no files are written) and queried for every output
+        predicate, see `self.output_names`.
+
+        :return: The built dataset (None if no SMILES can be parsed) and the indices of the SMILES in it,
+            SMILES that cannot be parsed are left out.
+        """
+        examples = [smiles_to_example(smiles) for smiles in smiles_list]
+        valid = [i for i, example in enumerate(examples) if example is not None]
+        if not valid:
+            return None, valid
+
+        dataset = inference_dataset([examples[i] for i in valid], self.output_names)
+        return self.evaluator.build_dataset(dataset, batch_size=1), valid
+
+    def _group_outputs(self, outputs: list) -> list:
+        """Group the outputs of the inference samples by molecule, into lists of the task outputs with several outputs."""
+        step = len(self.output_names)
+        if step == 1:
+            return outputs
+        return [outputs[i : i + step] for i in range(0, len(outputs), step)]
+
+
+def _cross_validate_worker(config: dict, fold_numbers: list, arguments: dict):
+    """Run folds of a cross-validation in a separate process, see `Pipeline.cross_validate`."""
+    return Pipeline(**config)._cross_validate_folds(fold_numbers, **arguments)
+
+
+def _ensemble_worker(config: dict, seeds: list, arguments: dict):
+    """Train ensemble members in a separate process, see `Pipeline.train_ensemble`."""
+    _, members = Pipeline(**config)._train_members(seeds, **arguments)
+    return members
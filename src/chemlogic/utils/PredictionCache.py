@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from chemlogic.datasets.utils.smiles_conversion import canonical_smiles
+
+
+class PredictionCache:
+    """
+    Cache of predictions keyed by the canonical SMILES and a model fingerprint (see `Pipeline.fingerprint`).
+
+    Differently written SMILES of the same molecule share an entry and a retrained model never reads
+    predictions of its previous weights. The in-memory tier is a bounded LRU, the optional on-disk tier
+    is an SQLite file shared across runs. The cache can be used with `Pipeline.inference` and `InferenceEngine`.
+    """
+
+    def __init__(self, max_size: int = 100000, path: str = None):
+        """
+        :param max_size: Maximal number of predictions kept in memory.
+        :param path: Path to an SQLite file for the on-disk tier, the disk is not used if None.
+        """
+        if max_size < 1:
+            raise ValueError("The cache size must be at least 1.")
+
+        self.max_size = max_size
+        self.path = path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "duplicates": 0,
+            "invalid": 0,
+        }
+
+        self._connection = None
+        if path is not None:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(fingerprint TEXT, smiles TEXT, prediction TEXT, PRIMARY KEY (fingerprint, smiles))"
+            )
+            self._connection.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, fingerprint: str, smiles: str):
+        """
+        Look up a prediction of a canonical SMILES.
+
+        :return: A (found, prediction) pair.
+        """
+        key = (fingerprint, smiles)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters["hits"] += 1
+                return True, self._memory[key]
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT prediction FROM predictions WHERE fingerprint = ? AND smiles = ?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self._counters["disk_hits"] += 1
+                    return True, value
+
+            self._counters["misses"] += 1
+            return False, None
+
+    def put_many(self, fingerprint: str, predictions: dict):
+        """Store predictions given as a {canonical SMILES: prediction} dict."""
+        with self._lock:
+            for smiles, value in predictions.items():
+                self._remember((fingerprint, smiles), value)
+
+            if self._connection is not None:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                    [
+                        (fingerprint, smiles, json.dumps(np.asarray(value).tolist()))
+                        for smiles, value in predictions.items()
+                    ],
+                )
+                self._connection.commit()
+
+    def predict(self, fingerprint: str, smiles_list: list[str], predict) -> list:
+        """
+        Predict a batch of SMILES through the cache.
+
+        The SMILES are canonicalized and deduplicated, only the molecules missing in both tiers are passed
+        to `predict`, once each.
+
+        :param fingerprint: Fingerprint of the model making the predictions.
+        :param smiles_list: The SMILES strings to predict.
+        :param predict: A function predicting a list of SMILES strings, e.g. `Pipeline.inference`.
+        :return: The predictions in the order of the input, None for SMILES that cannot be parsed.
+        """
+        canonical = [canonical_smiles(smiles) for smiles in smiles_list]
+        unique = list(dict.fromkeys(c for c in canonical if c is not None))
+
+        with self._lock:
+            self._counters["invalid"] += canonical.count(None)
+            self._counters["duplicates"] += (
+                len(canonical) - canonical.count(None) - len(unique)
+            )
+
+        found = {}
+        missing = []
+        for smiles in unique:
+            hit, value = self.get(fingerprint, smiles)
+            if hit:
+                found[smiles] = value
+            else:
+                missing.append(smiles)
+
+        if missing:
+            computed = dict(zip(missing, predict(missing), strict=True))
+            self.put_many(fingerprint, computed)
+            found.update(computed)
+
+        return [None if c is None else found[c] for c in canonical]
+
+    def stats(self) -> dict:
+        """
+        Hit counters of the cache.
+
+        :return: The number of memory hits, disk hits, misses, duplicates within requests and invalid SMILES,
+            the hit rate over the looked up molecules and the number of predictions kept in memory.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._memory)
+
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def reset_stats(self):
+        """Reset the hit counters."""
+        with self._lock:
+            for key in self._counters:
+                self._counters[key] = 0
+
+    def clear(self):
+        """Remove all predictions from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM predictions")
+                self._connection.commit()
+
+    def close(self):
+        """Close the on-disk tier."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
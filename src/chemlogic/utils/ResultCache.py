@@ -0,0 +1,123 @@
+import hashlib
+import itertools
+import json
+
+import optuna
+
+
+class ResultCache:
+    """
+    Results of hyperparameter search trials keyed by the complete normalized configuration.
+
+    The results are persisted alongside the study, as user attributes of its trials, so they are shared by the
+    workers of a parallel search and survive continuing the study. Up to `repeats` seeded runs are aggregated as
+    repeated configurations are sampled: until then, every duplicate trains the configuration with a new seed and
+    gets the mean of its runs so far, later duplicates return the mean immediately. Every run
+    claims the lowest seed not used by a completed or running trial of the configuration, so concurrent workers
+    train it with different seeds, and runs repeating a seed are counted once.
+    """
+
+    def __init__(self, study: optuna.Study, repeats: int = 1, precision: int = 3):
+        """
+        :param study: The study whose trials hold the results.
+        :param repeats: Number of differently seeded runs of a configuration aggregated into its result.
+        :param precision: Number of significant digits the float hyperparameters (e.g. the learning rate)
+            are rounded to, so nearly identical configurations are memoized too. Exact if None.
+        """
+        if repeats < 1:
+            raise ValueError("`repeats` must be a positive integer.")
+
+        self.study = study
+        self.repeats = repeats
+        self.precision = precision
+
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, value):
+        """Round a float hyperparameter to the cache precision, other values are returned unchanged."""
+        if isinstance(value, float) and self.precision is not None:
+            return float(f"{value:.{self.precision}g}")
+        return value
+
+    def key(self, **config) -> str:
+        """The cache key of a configuration."""
+        config = {name: self.normalize(value) for name, value in config.items()}
+        dump = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha256(dump.encode()).hexdigest()
+
+    def _trials(self, key: str, state) -> list[dict]:
+        """The user attributes of the trials of a configuration in the given state."""
+        return [
+            trial.user_attrs
+            for trial in self.study.get_trials(deepcopy=False, states=(state,))
+            if trial.user_attrs.get("config_key") == key
+        ]
+
+    def runs(self, key: str) -> list[dict]:
+        """
+        The user attributes of the completed trials which trained the configuration, in the order of the trials.
+        Of the runs with the same seed, only the first one is kept.
+        """
+        runs = {}
+        for attrs in self._trials(key, optuna.trial.TrialState.COMPLETE):
+            if "result" in attrs:
+                runs.setdefault(attrs["seed"], attrs)
+        return list(runs.values())
+
+    def lookup(self, trial, key: str):
+        """
+        Look up the result of a configuration, a memoized trial gets the costs of the configuration's last run.
+
+        :param trial: The trial of the configuration.
+        :param key: The cache key, see `ResultCache.key`.
+        :return: The aggregated result and None on a hit, None and the seed of the next run on a miss.
+        """
+        trial.set_user_attr("config_key", key)
+        runs = self.runs(key)
+        if len(runs) < self.repeats:
+            self.misses += 1
+            taken = {run["seed"] for run in runs} | {
+                attrs["seed"]
+                for attrs in self._trials(key, optuna.trial.TrialState.RUNNING)
+                if "seed" in attrs
+            }
+            seed = next(seed for seed in itertools.count() if seed not in taken)
+            # Claim the seed, so concurrent trials of the configuration use other ones
+            trial.set_user_attr("seed", seed)
+            return None, seed
+
+        self.hits += 1
+        trial.set_user_attr("memoized", True)
+        if "costs" in runs[-1]:
+            trial.set_user_attr("costs", runs[-1]["costs"])
+        return _mean(run["result"] for run in runs), None
+
+    def record(self, trial, key: str, result: float, seed: int) -> float:
+        """
+        Record the result of a run of a configuration.
+
+        :return: The mean result of the configuration's runs, including this one unless its seed was used before.
+        """
+        trial.set_user_attr("config_key", key)
+        trial.set_user_attr("result", result)
+        trial.set_user_attr("seed", seed)
+        runs = self.runs(key)
+        results = [run["result"] for run in runs]
+        if seed not in {run["seed"] for run in runs}:
+            results.append(result)
+        return _mean(results)
+
+    def stats(self) -> dict:
+        """Number of memoized (hits) and trained (misses) configurations and the hit rate."""
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+
+def _mean(values) -> float:
+    values = list(values)
+    return sum(values) / len(values)
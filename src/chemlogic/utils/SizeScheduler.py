@@ -0,0 +1,184 @@
+import statistics
+import tempfile
+import time
+
+from neuralogic.core import BuiltDataset
+from neuralogic.core.constructs.rule import Rule
+
+from chemlogic.datasets.utils.molecules import (
+    get_molecule_sizes,
+    molecule_cost,
+    read_queries,
+    subset_dataset,
+)
+from chemlogic.utils.complexity import (
+    counter_depth,
+    edge_predicates,
+    estimate_groundings,
+    grounding_exponents,
+    local_predicates,
+)
+from chemlogic.utils.sharding import shard_indices
+
+STRATEGIES = ["sorted", "balanced"]
+
+
+class SizeScheduler:
+    """
+    Forms batches of molecules with controlled grounding cost.
+
+    The "sorted" strategy groups molecules of similar size together, so the large molecules do not end up
+    scattered over every batch, the "balanced" strategy distributes the cost evenly over the batches.
+    """
+
+    def __init__(self, costs, strategy: str = "balanced"):
+        """
+        :param costs: Estimated grounding cost of every example.
+        :param strategy: Either "sorted" or "balanced".
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Strategy must be one of {STRATEGIES}.")
+
+        self.costs = list(costs)
+        self.strategy = strategy
+        self.build_statistics = []
+
+    @classmethod
+    def from_dataset(
+        cls,
+        dataset,
+        connection: str = "bond",
+        template=None,
+        strategy: str = "balanced",
+    ):
+        """
+        Estimate the costs of the examples of a FileDataset.
+
+        :param dataset: The FileDataset to schedule.
+        :param connection: The connection predicate used to compute molecule sizes.
+        :param template: If set, the cost is the template's estimated number of groundings (see `complexity`),
+            otherwise a size-based cost is used.
+        :param strategy: Either "sorted" or "balanced".
+        """
+        sizes = get_molecule_sizes(dataset, connection)
+        if not sizes:
+            return cls([1] * len(read_queries(dataset)), strategy)
+
+        if template is None:
+            return cls([molecule_cost(*size) for size in sizes], strategy)
+
+        edges = edge_predicates(template.template, connection)
+        local = local_predicates(template.template, connection, edges)
+        depth = counter_depth(template.template)
+        exponents = [
+            grounding_exponents(rule, connection, edges, local)
+            for rule in template.template
+            if isinstance(rule, Rule)
+        ]
+
+        return cls(
+            [
+                sum(
+                    estimate_groundings(e, atoms, bonds, max_degree, depth)
+                    for e in exponents
+                )
+                for atoms, bonds, max_degree in sizes
+            ],
+            strategy,
+        )
+
+    def batches(
+        self, batch_count: int = None, max_cost: float = None, indices=None
+    ) -> list:
+        """
+        Split the examples into batches.
+
+        :param batch_count: Number of batches to form.
+        :param max_cost: Maximal total cost of a "sorted" batch, used instead of `batch_count`.
+            A single example exceeding the budget forms its own batch.
+        :param indices: Restrict the batches to these examples (e.g. the training split).
+        :return: A list of batches, each a list of example indices.
+        """
+        if indices is None:
+            indices = list(range(len(self.costs)))
+        if not indices:
+            return []
+
+        if batch_count is None and max_cost is None:
+            raise ValueError("Either `batch_count` or `max_cost` must be set.")
+
+        if self.strategy == "balanced":
+            if batch_count is None:
+                total = sum(self.costs[i] for i in indices)
+                batch_count = max(1, round(total / max_cost))
+            partition = shard_indices([self.costs[i] for i in indices], batch_count)
+            return [[indices[i] for i in batch] for batch in partition]
+
+        ordered = sorted(indices, key=lambda i: self.costs[i])
+        if max_cost is None:
+            size = -(-len(ordered) // batch_count)
+            return [ordered[i : i + size] for i in range(0, len(ordered), size)]
+
+        batches = [[]]
+        load = 0
+        for i in ordered:
+            if batches[-1] and load + self.costs[i] > max_cost:
+                batches.append([])
+                load = 0
+            batches[-1].append(i)
+            load += self.costs[i]
+        return batches
+
+    def statistics(self, batches) -> list:
+        """Per-batch cost statistics: number of molecules, total, mean and maximal cost."""
+        return [
+            {
+                "batch": b,
+                "molecules": len(batch),
+                "cost": sum(self.costs[i] for i in batch),
+                "mean_cost": statistics.mean(self.costs[i] for i in batch),
+                "max_cost": max(self.costs[i] for i in batch),
+            }
+            for b, batch in enumerate(batches)
+        ]
+
+    @staticmethod
+    def summary(batch_statistics) -> dict:
+        """Summary of the per-batch statistics, the imbalance is the ratio of the largest to the mean batch cost."""
+        costs = [row["cost"] for row in batch_statistics]
+        mean = statistics.mean(costs) if costs else 0
+        return {
+            "batches": len(costs),
+            "mean_cost": mean,
+            "max_cost": max(costs, default=0),
+            "min_cost": min(costs, default=0),
+            "imbalance": max(costs) / mean if mean else 0,
+        }
+
+    def build(
+        self, evaluator, dataset, batch_count: int = None, max_cost: float = None
+    ) -> BuiltDataset:
+        """
+        Build the dataset batch by batch, recording the build time of each batch in `self.build_statistics`.
+
+        :param evaluator: The evaluator used for building.
+        :param dataset: The FileDataset to build.
+        :param batch_count: Number of batches to build the dataset in.
+        :param max_cost: Maximal total cost of a "sorted" batch.
+        :return: The built dataset, with samples in the original order.
+        """
+        batches = self.batches(batch_count, max_cost)
+        self.build_statistics = self.statistics(batches)
+
+        samples = [None] * len(self.costs)
+        for batch, row in zip(batches, self.build_statistics, strict=True):
+            with tempfile.TemporaryDirectory(prefix="chemlogic_") as directory:
+                subset = subset_dataset(dataset, batch, directory)
+                start = time.perf_counter()
+                built_batch = evaluator.build_dataset(subset)
+                row["time"] = time.perf_counter() - start
+
+            for i, sample in zip(batch, built_batch.samples, strict=True):
+                samples[i] = sample
+
+        return BuiltDataset(samples, 1)
@@ -0,0 +1,76 @@
+import json
+from collections import OrderedDict
+
+from chemlogic.utils.GroundingCache import GroundingCache
+
+
+class TrialCache:
+    """
+    Pipelines of hyperparameter search trials, with their built samples, keyed by the structural hyperparameters.
+
+    Trials of the same structure reuse the loaded dataset, the composed template and the grounding of a previous
+    trial, see `GroundingCache`, so trials differing only in the learning rate or the number of epochs start training
+    immediately.
+    The cached pipelines are reused, so a pipeline returned by a trial is overwritten by later trials of its structure.
+    """
+
+    def __init__(self, max_size: int = 4):
+        """
+        :param max_size: Maximal number of cached pipelines, the least recently used ones are evicted.
+        """
+        if max_size < 1:
+            raise ValueError("`max_size` must be a positive integer.")
+
+        self.max_size = max_size
+        # Key -> (pipeline, grounding cache)
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(**structure) -> str:
+        """The cache key of the structural hyperparameters."""
+        return json.dumps(structure, sort_keys=True, default=str)
+
+    def get(self, key: str, create_pipeline):
+        """
+        Get the cached pipeline of a structure, creating it on a miss.
+
+        :param key: The cache key, see `TrialCache.key`.
+        :param create_pipeline: Function creating the pipeline of the structure.
+        :return: The pipeline, the grounding cache holding its built samples and whether it was a hit.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return *self._entries[key], True
+
+        self.misses += 1
+        pipeline = create_pipeline()
+        self._entries[key] = (pipeline, GroundingCache(pipeline.dataset.connection))
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return *self._entries[key], False
+
+    def stats(self) -> dict:
+        """Number of cached pipelines, cache hits and misses and the hit rate."""
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+    def retain(self, pipelines: list):
+        """Evict all cached pipelines except the given ones, e.g. the ones of the trials still running."""
+        kept = {id(pipeline) for pipeline in pipelines}
+        for key in [key for key, (p, _) in self._entries.items() if id(p) not in kept]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,254 @@
+from neuralogic.core.constructs.rule import Rule
+
+# Symbols of the asymptotic grounding bound:
+# n - number of atoms, m - number of bonds, d - maximal atom degree, D - depth of the `next` counters
+BOUND_SYMBOLS = {"atoms": "n", "bonds": "m", "degree": "d", "depth": "D"}
+
+
+def _is_variable(term) -> bool:
+    term = str(term)
+    return term[:1].isupper()
+
+
+def _variables(literal) -> list:
+    return [str(term) for term in literal.terms if _is_variable(term)]
+
+
+def _key(literal) -> tuple:
+    return literal.predicate.name, len(literal.terms)
+
+
+def counter_depth(template) -> int:
+    """Returns the number of `next` counter facts (recursion depth) defined in the template."""
+    return sum(
+        1
+        for entry in template
+        if not isinstance(entry, Rule)
+        and getattr(entry, "predicate", None) is not None
+        and entry.predicate.name == "next"
+    )
+
+
+def _is_edge(literal, edges) -> bool:
+    return literal.predicate.name in edges and len(literal.terms) in (2, 3)
+
+
+def edge_predicates(template, connection: str = "bond") -> set:
+    """
+    Find the predicates that behave like the connection predicate, i.e. p(X, Y) or p(X, Y, B) derived from
+    a connection (or another edge predicate) over the same X and Y, such as `chem_single_bonded`.
+    """
+    rules = [rule for rule in template if isinstance(rule, Rule)]
+    edges = {connection}
+    changed = True
+    while changed:
+        changed = False
+        for rule in rules:
+            name = rule.head.predicate.name
+            if name in edges or len(rule.head.terms) not in (2, 3):
+                continue
+            head = {str(term) for term in rule.head.terms[:2]}
+            for literal in rule.body:
+                if (
+                    _is_edge(literal, edges)
+                    and {str(term) for term in literal.terms[:2]} == head
+                ):
+                    edges.add(name)
+                    changed = True
+                    break
+    return edges
+
+
+def local_predicates(template, connection: str = "bond", edges=None) -> set:
+    """
+    Find the predicates whose groundings stay local: once one of their variables is bound,
+    every rule defining them only walks along bonds, so the other variables are bounded by the max degree.
+    Predicates are returned as (name, arity) pairs.
+    """
+    edges = edge_predicates(template, connection) if edges is None else edges
+    rules = [rule for rule in template if isinstance(rule, Rule) and rule.head.terms]
+
+    local = {(edge, arity) for edge in edges for arity in (2, 3)}
+    changed = True
+    while changed:
+        changed = False
+        candidates = {}
+        for rule in rules:
+            name = _key(rule.head)
+            if name in local:
+                continue
+            exponents = grounding_exponents(
+                rule, connection, edges, local, bind_head=True
+            )
+            is_local = exponents["atoms"] == 0 and exponents["bonds"] == 0
+            candidates[name] = candidates.get(name, True) and is_local
+        for name, is_local in candidates.items():
+            if is_local:
+                local.add(name)
+                changed = True
+    return local
+
+
+def grounding_exponents(
+    rule: Rule, connection: str = "bond", edges=None, local=None, bind_head=False
+) -> dict:
+    """
+    Estimate the asymptotic number of groundings of a rule body.
+
+    Variables are bound greedily: the first connection literal binds an edge (m choices), every atom reached
+    through a connection literal from a bound atom adds a factor of the max degree d, bond variables with both
+    endpoints bound are determined, variables joined through a local predicate add a factor of d,
+    and any other variable is bounded by the number of atoms n.
+    Every `next` counter literal adds a factor of the counter depth D.
+
+    :param rule: The rule to analyse.
+    :param connection: The connection predicate (expects connection(X, Y, B)).
+    :param edges: Predicates treated as connections, see `edge_predicates`. Defaults to the connection only.
+    :param local: Predicates with local groundings, see `local_predicates`. Defaults to the edges.
+    :param bind_head: Whether the first head variable is already bound.
+    :return: The exponents of atoms, bonds, degree and depth in the bound.
+    """
+    edges = {connection} if edges is None else edges
+    if local is None:
+        local = {(edge, arity) for edge in edges for arity in (2, 3)}
+    exponents = {"atoms": 0, "bonds": 0, "degree": 0, "depth": 0}
+
+    special = [literal for literal in rule.body if literal.predicate.special]
+    regular = [literal for literal in rule.body if not literal.predicate.special]
+    connections = [literal for literal in regular if _is_edge(literal, edges)]
+    others = [literal for literal in regular if literal not in connections]
+
+    bound = set(_variables(rule.head)[:1]) if bind_head else set()
+    for literal in special:
+        if literal.predicate.name == "next":
+            exponents["depth"] += 1
+            bound.update(_variables(literal))
+
+    remaining = []
+    for literal in regular:
+        remaining.extend(v for v in _variables(literal) if v not in remaining)
+
+    def bind(variables, factor=None):
+        for variable in variables:
+            if variable not in bound:
+                bound.add(variable)
+                if factor is not None:
+                    exponents[factor] += 1
+
+    while any(variable not in bound for variable in remaining):
+        progress = False
+
+        # Walk along a bond from an already bound atom
+        for literal in connections:
+            x, y, *b = (str(term) for term in literal.terms)
+            x_bound = x in bound or not _is_variable(x)
+            y_bound = y in bound or not _is_variable(y)
+            b = [term for term in b if _is_variable(term) and term not in bound]
+            if x_bound != y_bound:
+                bind([y if x_bound else x], "degree")
+                bind(b)
+                progress = True
+                break
+            if x_bound and y_bound and b:
+                bind(b)
+                progress = True
+                break
+        if progress:
+            continue
+
+        # Anchor on any bond
+        anchored = any(variable in bound for variable in remaining)
+        anchors = [literal for literal in connections if _variables(literal)]
+        if anchors and not anchored:
+            variables = _variables(anchors[0])
+            bind(variables[:1], "bonds")
+            bind(variables[1:])
+            continue
+
+        # Join through a non-connection literal sharing a bound variable
+        for literal in others:
+            variables = _variables(literal)
+            if any(v in bound for v in variables) and any(
+                v not in bound for v in variables
+            ):
+                bind(
+                    variables,
+                    "degree" if _key(literal) in local else "atoms",
+                )
+                progress = True
+                break
+        if progress:
+            continue
+
+        bind(
+            [next(variable for variable in remaining if variable not in bound)],
+            "atoms",
+        )
+
+    return exponents
+
+
+def format_bound(exponents: dict) -> str:
+    """Format grounding exponents as an asymptotic bound, e.g. `O(m * d^3)`."""
+    factors = []
+    for key, symbol in BOUND_SYMBOLS.items():
+        exponent = exponents.get(key, 0)
+        if exponent == 1:
+            factors.append(symbol)
+        elif exponent > 1:
+            factors.append(f"{symbol}^{exponent}")
+    return f"O({' * '.join(factors) if factors else '1'})"
+
+
+def estimate_groundings(
+    exponents: dict, atoms: int, bonds: int, max_degree: int, depth: int = 1
+) -> float:
+    """Evaluate the grounding bound for a molecule of the given size."""
+    return (
+        atoms ** exponents.get("atoms", 0)
+        * bonds ** exponents.get("bonds", 0)
+        * max_degree ** exponents.get("degree", 0)
+        * max(depth, 1) ** exponents.get("depth", 0)
+    )
+
+
+def rule_complexity(
+    rule: Rule, connection: str = "bond", edges=None, local=None
+) -> dict:
+    """
+    Static complexity of a single rule.
+
+    :param rule: The rule to analyse.
+    :param connection: The connection predicate (expects connection(X, Y, B)).
+    :param edges: Predicates treated as connections, see `edge_predicates`.
+    :param local: Predicates with local groundings, see `local_predicates`.
+    :return: A dict with the number of body literals, free variables, `alldiff` arity,
+        recursion flags and the grounding bound exponents.
+    """
+    head_variables = set(_variables(rule.head))
+    body_variables = set()
+    for literal in rule.body:
+        if not literal.predicate.special:
+            body_variables.update(_variables(literal))
+
+    alldiff_arity = max(
+        (
+            len(literal.terms)
+            for literal in rule.body
+            if literal.predicate.special and literal.predicate.name == "alldiff"
+        ),
+        default=0,
+    )
+    recursive = any(_key(literal) == _key(rule.head) for literal in rule.body)
+    exponents = grounding_exponents(rule, connection, edges, local)
+
+    return {
+        "head": rule.head.predicate.name,
+        "body_literals": len(rule.body),
+        "free_variables": len(body_variables - head_variables),
+        "alldiff_arity": alldiff_arity,
+        "recursive": recursive,
+        "counters": exponents["depth"],
+        "exponents": exponents,
+        "bound": format_bound(exponents),
+    }
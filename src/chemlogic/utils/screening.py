@@ -0,0 +1,159 @@
+import csv
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def read_smiles(path: str, smiles_column: str = "smiles", id_column: str = None):
+    """
+    Lazily read molecules from a `.smi` or `.csv` file.
+
+    A `.smi` line is a SMILES optionally followed by whitespace and an identifier, a `.csv` file must have
+    a header with the `smiles_column` (and optionally the `id_column`). Without identifiers, the line number
+    is used.
+
+    :return: A generator of (identifier, SMILES) pairs.
+    """
+    with open(path, newline="") as f:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            reader = csv.DictReader(f)
+            if smiles_column not in (reader.fieldnames or []):
+                raise ValueError(f"Column '{smiles_column}' not found in {path}.")
+            for i, row in enumerate(reader):
+                yield (row[id_column] if id_column else str(i)), row[smiles_column]
+        else:
+            for i, line in enumerate(f):
+                fields = line.split(maxsplit=1)
+                if not fields or fields[0].startswith("#"):
+                    continue
+                yield (fields[1].strip() if len(fields) > 1 else str(i)), fields[0]
+
+
+def chunks(iterable, size: int):
+    """Split an iterable into lists of at most `size` items, without materializing it."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def score(prediction) -> float:
+    """The ranking score of a scalar prediction."""
+    values = np.ravel(prediction)
+    if values.size != 1:
+        raise ValueError("Top-k screening requires a model with a single output.")
+    return float(values[0])
+
+
+def screen(
+    engines: list,
+    input_path: str,
+    output_path: str,
+    chunk_size: int = 1000,
+    top_k: int = None,
+    ascending: bool = False,
+    smiles_column: str = "smiles",
+    id_column: str = None,
+    report_interval: float = 10.0,
+) -> dict:
+    """
+    Stream a SMILES file through trained models and write the predictions.
+
+    The file is read in chunks, each chunk is converted and evaluated by an idle engine on its own worker thread.
+    At most one chunk per engine is in flight, so memory stays bounded regardless of the file size.
+
+    :param engines: The `InferenceEngine`s evaluating the chunks, each with its own evaluator.
+    :param input_path: The `.smi` or `.csv` file to screen.
+    :param output_path: The CSV file to write. All predictions are written incrementally, in the input order,
+        or, with `top_k`, only the best `top_k` molecules at the end.
+    :param chunk_size: Number of molecules evaluated at once.
+    :param top_k: Keep only the `top_k` highest scoring molecules (using a heap).
+    :param ascending: With `top_k`, keep the lowest scoring molecules instead.
+    :param smiles_column: The SMILES column of a `.csv` input.
+    :param id_column: The identifier column of a `.csv` input.
+    :param report_interval: Seconds between progress reports.
+    :return: The number of screened molecules, invalid SMILES, elapsed time and throughput in molecules per second.
+    """
+    if not engines:
+        raise ValueError("At least one engine is required.")
+
+    sign = -1 if ascending else 1
+    heap = []
+    stats = {"molecules": 0, "invalid": 0}
+    start = last_report = time.perf_counter()
+
+    idle = deque(engines)
+    in_flight = deque()
+
+    def evaluate(engine, chunk):
+        try:
+            return chunk, engine.predict([smiles for _, smiles in chunk])
+        finally:
+            idle.append(engine)
+
+    with (
+        open(output_path, "w", newline="") as f,
+        ThreadPoolExecutor(max_workers=len(engines)) as executor,
+    ):
+        writer = csv.writer(f)
+        writer.writerow(["id", "smiles", "prediction"])
+
+        def collect():
+            nonlocal last_report
+            chunk, predictions = in_flight.popleft().result()
+
+            for (identifier, smiles), prediction in zip(
+                chunk, predictions, strict=True
+            ):
+                if prediction is None:
+                    stats["invalid"] += 1
+                elif top_k is not None:
+                    item = (
+                        sign * score(prediction),
+                        stats["molecules"],
+                        identifier,
+                        smiles,
+                    )
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, item)
+                    else:
+                        heapq.heappushpop(heap, item)
+                stats["molecules"] += 1
+
+                if top_k is None:
+                    writer.writerow(
+                        [identifier, smiles, "" if prediction is None else prediction]
+                    )
+            f.flush()
+
+            now = time.perf_counter()
+            if now - last_report >= report_interval:
+                last_report = now
+                print(
+                    f"Screened: {stats['molecules']} | Invalid: {stats['invalid']} | {stats['molecules'] / (now - start):.1f} molecules/s"
+                )
+
+        for chunk in chunks(
+            read_smiles(input_path, smiles_column, id_column), chunk_size
+        ):
+            # The results are written in order, so an engine finishing early waits for the oldest chunk
+            # instead of taking more chunks while it is being evaluated
+            while not idle or len(in_flight) >= len(engines):
+                collect()
+            in_flight.append(executor.submit(evaluate, idle.popleft(), chunk))
+
+        while in_flight:
+            collect()
+
+        for value, _, identifier, smiles in sorted(
+            heap, key=lambda item: (-item[0], item[1])
+        ):
+            writer.writerow([identifier, smiles, sign * value])
+
+    stats["time"] = time.perf_counter() - start
+    stats["throughput"] = stats["molecules"] / stats["time"] if stats["time"] else 0.0
+    return stats
@@ -0,0 +1,427 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import defaultdict
+
+import mlflow
+import optuna
+from optuna.storages.journal import JournalFileBackend
+
+from chemlogic.datasets.datasets import get_dataset
+from chemlogic.datasets.utils.molecules import read_queries
+from chemlogic.main import main
+from chemlogic.utils.ResultCache import ResultCache
+from chemlogic.utils.TrialCache import TrialCache
+
+# Objectives of the multi-objective search, the metric is maximized and the costs minimized
+OBJECTIVES = ["metric", "build_time", "train_time", "neurons"]
+
+PRUNERS = {
+    "median": lambda: optuna.pruners.MedianPruner(
+        n_startup_trials=5, n_warmup_steps=20
+    ),
+    "hyperband": lambda: optuna.pruners.HyperbandPruner(min_resource=10),
+}
+
+
+def get_storage(path: str):
+    """
+    Local Optuna storage shared by the search workers: a SQLite database for `.db`/`.sqlite` paths,
+    a journal file (safer with many concurrent writers) otherwise.
+    """
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return optuna.storages.RDBStorage(
+            f"sqlite:///{path}", engine_kwargs={"connect_args": {"timeout": 60}}
+        )
+    return optuna.storages.JournalStorage(JournalFileBackend(path))
+
+
+def get_pruner(name: str = None):
+    """The pruner of the given name ("median" or "hyperband"), no pruning if None."""
+    if name is None:
+        return None
+    if name not in PRUNERS:
+        raise ValueError(f"Pruner must be one of {list(PRUNERS)}.")
+    return PRUNERS[name]()
+
+
+def parallel_search(
+    study_name: str,
+    storage_path: str,
+    n_trials: int,
+    workers: int = None,
+    tracking_uri: str = "mlruns",
+    seed: int = None,
+    pruner: str = None,
+    trial_cache_size: int = 4,
+    max_restarts: int = None,
+    poll_interval: float = 1.0,
+    repeats: int = None,
+    objective_function=main,
+    **main_arguments,
+) -> optuna.Study:
+    """
+    Run a hyperparameter search with worker processes sharing a local Optuna storage and MLflow file store.
+
+    Every worker is a long-lived process with its own backend and trial cache (reusing the groundings of trials
+    with the same structure, see `TrialCache`), running trials until the study has `n_trials` of them. A trial raising
+    an exception is recorded as failed and the worker continues. If a worker process dies, its running trials are
+    marked as failed and the worker is restarted.
+
+    :param study_name: Name of the study, an existing study of this name is continued.
+    :param storage_path: Path of the storage, see `get_storage`.
+    :param n_trials: Total number of trials of the study.
+    :param workers: Number of worker processes, defaults to the number of CPUs.
+    :param tracking_uri: The MLflow tracking URI, e.g. the directory of a local file store.
+    :param seed: Seed of the samplers, every worker samples with its own seed derived from it.
+    :param pruner: Prune trials by their intermediate validation scores with this pruner, see `get_pruner`.
+    :param trial_cache_size: Number of pipelines cached by every worker.
+    :param max_restarts: Maximal number of restarts of dead workers, defaults to `workers`.
+    :param poll_interval: Seconds between two checks of the worker processes.
+    :param repeats: If set, memoize the results of the configurations (see `ResultCache`) stored in the study,
+        every configuration is trained this many times with different seeds and its mean result is reused.
+    :param objective_function: The function running a trial, `main.main` or a function with its signature.
+    :param main_arguments: Arguments of `main.main`, e.g. `dataset_name`, `model_name`, `chemical_rules`.
+    :return: The study.
+    """
+    workers = workers or os.cpu_count()
+    max_restarts = workers if max_restarts is None else max_restarts
+    get_pruner(pruner)
+
+    # The sampler and pruner are not persisted, they are set up by every worker
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=get_storage(storage_path),
+        direction="maximize",
+        load_if_exists=True,
+    )
+
+    context = multiprocessing.get_context("spawn")
+    worker_arguments = (
+        study_name,
+        storage_path,
+        n_trials,
+        tracking_uri,
+        pruner,
+        trial_cache_size,
+        objective_function,
+        main_arguments,
+        repeats,
+    )
+
+    def start(number):
+        worker_seed = None if seed is None else seed + number
+        process = context.Process(
+            target=_search_worker, args=(worker_seed, *worker_arguments)
+        )
+        process.start()
+        return process
+
+    processes = [start(i) for i in range(workers)]
+    started = workers
+    while processes:
+        time.sleep(poll_interval)
+        for process in [process for process in processes if not process.is_alive()]:
+            processes.remove(process)
+            if process.exitcode == 0:
+                continue
+
+            failed = fail_worker_trials(study, process.pid)
+            print(
+                f"Worker {process.pid} died (exit code {process.exitcode}), failed trials: {failed}"
+            )
+            if len(study.trials) < n_trials and started - workers < max_restarts:
+                processes.append(start(started))
+                started += 1
+
+    return study
+
+
+def fail_worker_trials(study: optuna.Study, pid: int) -> list[int]:
+    """
+    Mark the running trials of a dead worker as failed, so they do not stay running forever.
+
+    :param study: The study.
+    :param pid: The process ID of the worker.
+    :return: Numbers of the failed trials.
+    """
+    failed = []
+    for trial in study.get_trials(
+        deepcopy=False, states=(optuna.trial.TrialState.RUNNING,)
+    ):
+        if trial.user_attrs.get("worker_pid") == pid:
+            study.tell(trial.number, state=optuna.trial.TrialState.FAIL)
+            failed.append(trial.number)
+    return failed
+
+
+def _search_worker(
+    seed: int,
+    study_name: str,
+    storage_path: str,
+    n_trials: int,
+    tracking_uri: str,
+    pruner: str,
+    trial_cache_size: int,
+    objective_function,
+    main_arguments: dict,
+    repeats: int = None,
+):
+    if "://" not in tracking_uri:
+        # A local file store, newer MLflow versions require opting into it
+        os.environ.setdefault("MLFLOW_ALLOW_FILE_STORE", "true")
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment(study_name)
+
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=get_storage(storage_path),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=get_pruner(pruner),
+    )
+    if len(study.trials) >= n_trials:
+        return
+
+    # The backend and the groundings of the trials live as long as the worker
+    trial_cache = TrialCache(trial_cache_size)
+    if repeats is not None:
+        main_arguments = {
+            **main_arguments,
+            "result_cache": ResultCache(study, repeats),
+        }
+
+    def objective(trial):
+        trial.set_user_attr("worker_pid", os.getpid())
+        return objective_function(
+            trial,
+            trial_cache=trial_cache,
+            pruning=pruner is not None,
+            **main_arguments,
+        )[0]
+
+    study.optimize(
+        objective,
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=None)],
+        catch=(Exception,),
+    )
+
+
+def stratified_order(labels: list, seed: int = 42) -> list[int]:
+    """
+    Order the molecules so that every prefix of the order is a stratified random subset, i.e. the subsets
+    of increasing size are nested and keep the label proportions.
+
+    :param labels: The label of every molecule (compared as given, e.g. the label strings of the queries).
+    :param seed: Seed of the shuffling.
+    :return: The molecule indices in the order.
+    """
+    rng = random.Random(seed)
+    classes = defaultdict(list)
+    for i, label in enumerate(labels):
+        classes[label].append(i)
+
+    # Spread every class evenly over the order, with a random offset
+    keys = {}
+    for indices in classes.values():
+        rng.shuffle(indices)
+        for rank, i in enumerate(indices):
+            keys[i] = (rank + rng.random()) / len(indices)
+    return sorted(keys, key=keys.get)
+
+
+def successive_halving(
+    study: optuna.Study,
+    n_configs: int = 27,
+    rungs: list = ((1 / 9, 50), (1 / 3, 150), (1.0, 500)),
+    eta: int = 3,
+    seed: int = 42,
+    objective_function=main,
+    **main_arguments,
+) -> dict:
+    """
+    Multi-fidelity search by successive halving: the configurations sampled by the study are first trained on a small
+    stratified subset of the molecules for a few epochs, and only the best `1 / eta` of them are promoted to the next,
+    larger subset with more epochs, up to the full training.
+
+    The subsets are nested (see `stratified_order`) and every configuration keeps its pipeline and grounding cache
+    between the rungs (see `TrialCache`), so a promotion grounds only the molecules added by the larger subset.
+    The score of every rung is reported to the trial as its intermediate value, the configurations dropped
+    at a rung are recorded as pruned.
+
+    :param study: The study sampling the configurations, it should maximize the metric.
+    :param n_configs: Number of configurations of the first rung.
+    :param rungs: (fraction of the molecules, epochs) of every rung.
+    :param eta: The reduction factor, `1 / eta` of the configurations of a rung are promoted.
+    :param seed: Seed of the subsets.
+    :param objective_function: The function running a trial, `main.main` or a function with its signature.
+    :param main_arguments: Arguments of `main.main`, e.g. `dataset_name`, `model_name`, `chemical_rules`.
+    :return: The per-rung summary, the best trial and its score, and the compute (molecules times epochs)
+        relative to the full training of all configurations.
+    """
+    if eta < 2:
+        raise ValueError("`eta` must be at least 2.")
+
+    data_arguments = {}
+    if main_arguments.get("smiles_list"):
+        data_arguments = {
+            "smiles_list": main_arguments["smiles_list"],
+            "labels": main_arguments["labels"],
+        }
+    dataset = get_dataset(main_arguments["dataset_name"], 1, **data_arguments)
+    labels = [query.split()[0] for query in read_queries(dataset.data)]
+    order = stratified_order(labels, seed)
+
+    trial_cache = TrialCache(n_configs)
+    candidates = [study.ask() for _ in range(n_configs)]
+    summary = []
+    scores = {}
+    compute = 0
+
+    for rung, (fraction, epochs) in enumerate(rungs):
+        molecules = sorted(order[: max(1, round(fraction * len(order)))])
+        last = rung == len(rungs) - 1
+
+        scores = {}
+        pipelines = {}
+        for trial in candidates:
+            try:
+                scores[trial.number], pipelines[trial.number] = objective_function(
+                    trial,
+                    trial_cache=trial_cache,
+                    epochs=epochs,
+                    molecules=molecules,
+                    **main_arguments,
+                )
+            except Exception as e:
+                print(f"Trial {trial.number} failed at rung {rung}: {e!r}")
+                study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                continue
+
+            if scores[trial.number] is None or math.isnan(scores[trial.number]):
+                scores[trial.number] = float("-inf")
+            trial.report(scores[trial.number], rung)
+            compute += len(molecules) * epochs
+
+        survivors = sorted(
+            (trial for trial in candidates if trial.number in scores),
+            key=lambda trial: scores[trial.number],
+            reverse=True,
+        )
+        promoted = survivors if last else survivors[: max(1, len(survivors) // eta)]
+        for trial in survivors:
+            if last:
+                study.tell(trial, scores[trial.number])
+            elif trial not in promoted:
+                study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+
+        summary.append(
+            {
+                "rung": rung,
+                "molecules": len(molecules),
+                "epochs": epochs,
+                "configurations": len(candidates),
+                "best": max(scores.values(), default=None),
+            }
+        )
+        print(
+            f"Rung {rung} | Molecules: {len(molecules)} | Epochs: {epochs} | Configurations: {len(candidates)} | Best: {summary[-1]['best']}"
+        )
+
+        candidates = promoted
+        trial_cache.retain([pipelines[trial.number] for trial in promoted])
+        if not candidates:
+            break
+
+    best = max(candidates, key=lambda trial: scores[trial.number], default=None)
+    full_epochs = rungs[-1][1]
+    return {
+        "rungs": summary,
+        "best_trial": best.number if best is not None else None,
+        "best_params": best.params if best is not None else None,
+        "best_value": scores[best.number] if best is not None else None,
+        "relative_compute": compute / (n_configs * len(order) * full_epochs),
+    }
+
+
+def multi_objective_search(
+    n_trials: int,
+    study_name: str = None,
+    storage_path: str = None,
+    seed: int = None,
+    trial_cache_size: int = 4,
+    objective_function=main,
+    **main_arguments,
+) -> tuple[optuna.Study, list[dict]]:
+    """
+    Search for configurations maximizing the metric and minimizing their cost: the build time, training time
+    and neuron count measured by the pipeline. A grounding reused from the trial cache costs the time of building
+    the molecules of the trial, see `GroundingCache.grounding_time`, so the cost does not depend on the sampling order.
+
+    :param n_trials: Number of trials.
+    :param study_name: Name of the study, an existing study of this name is continued if a storage is set.
+    :param storage_path: Path of the storage, see `get_storage`. The study is kept in memory if not set.
+    :param seed: Seed of the sampler.
+    :param trial_cache_size: Number of cached pipelines, see `TrialCache`.
+    :param objective_function: The function running a trial, `main.main` or a function with its signature.
+    :param main_arguments: Arguments of `main.main`, e.g. `dataset_name`, `model_name`, `chemical_rules`.
+    :return: The study and its Pareto front, see `pareto_front`.
+    """
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=None if storage_path is None else get_storage(storage_path),
+        directions=["maximize", "minimize", "minimize", "minimize"],
+        sampler=optuna.samplers.NSGAIISampler(seed=seed),
+        load_if_exists=True,
+    )
+    trial_cache = TrialCache(trial_cache_size)
+
+    def objective(trial):
+        metric, _ = objective_function(trial, trial_cache=trial_cache, **main_arguments)
+        costs = trial.user_attrs["costs"]
+        return metric, costs["build_time"], costs["train_time"], costs["neurons"]
+
+    study.optimize(objective, n_trials=n_trials, catch=(Exception,))
+    return study, pareto_front(study)
+
+
+def pareto_front(study: optuna.Study) -> list[dict]:
+    """
+    The Pareto-optimal trials of a multi-objective study, see `multi_objective_search`.
+
+    :param study: The study.
+    :return: The number, parameters and objectives of every Pareto-optimal trial, by descending metric.
+    """
+    front = [
+        {
+            "number": trial.number,
+            "params": trial.params,
+            **dict(zip(OBJECTIVES, trial.values, strict=True)),
+        }
+        for trial in study.best_trials
+    ]
+    return sorted(front, key=lambda row: row["metric"], reverse=True)
+
+
+def cheapest_configuration(
+    front: list[dict], tolerance: float = 0.01, cost: str = "neurons"
+) -> dict:
+    """
+    The cheapest configuration of a Pareto front whose metric is within a tolerance of the best one.
+
+    :param front: The Pareto front, see `pareto_front`.
+    :param tolerance: The maximal metric difference from the best configuration.
+    :param cost: The cost to minimize, one of "build_time", "train_time" and "neurons".
+    :return: The selected entry of the front.
+    """
+    if cost not in OBJECTIVES[1:]:
+        raise ValueError(f"Cost must be one of {OBJECTIVES[1:]}.")
+    if not front:
+        raise ValueError("The Pareto front is empty.")
+
+    best = max(row["metric"] for row in front)
+    return min(
+        (row for row in front if row["metric"] >= best - tolerance),
+        key=lambda row: row[cost],
+    )
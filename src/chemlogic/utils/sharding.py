@@ -0,0 +1,104 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from neuralogic.core import BuiltDataset
+from neuralogic.dataset import FileDataset
+
+from chemlogic.datasets.utils.molecules import (
+    molecule_cost,
+    molecule_size,
+    read_examples,
+    read_queries,
+    subset_dataset,
+)
+
+
+def shard_indices(costs, shards: int):
+    """
+    Partition the examples into shards of balanced cost.
+
+    Examples are assigned greedily, most expensive first, to the currently cheapest shard.
+
+    :param costs: Estimated grounding cost of every example.
+    :param shards: Number of shards.
+    :return: A list of index lists, each sorted in the original order. Empty shards are dropped.
+    """
+    if shards < 1:
+        raise ValueError("The number of shards must be at least 1.")
+
+    partition = [[] for _ in range(shards)]
+    loads = [0] * shards
+    for i in sorted(range(len(costs)), key=lambda i: costs[i], reverse=True):
+        shard = loads.index(min(loads))
+        partition[shard].append(i)
+        loads[shard] += costs[i]
+
+    return [sorted(indices) for indices in partition if indices]
+
+
+def build_dataset_sharded(
+    evaluator,
+    dataset,
+    workers: int = None,
+    batch_size: int = 1,
+    connection: str = "bond",
+    concurrent: bool = False,
+) -> BuiltDataset:
+    """
+    Build (ground and neuralize) a FileDataset in shards of balanced grounding cost.
+
+    All shards are built by the one evaluator, since samples reference the weights of the template they were built
+    against: samples built by separate evaluators (or processes) could not be trained together. By default, the shard
+    builds are serialized. With `concurrent`, they run on threads of this process (the backend releases the GIL):
+    every `build_dataset` call of a FileDataset creates its own backend grounding and neuralization pipeline, but the
+    calls share the evaluator's settings and parsed template, whose thread safety the backend does not guarantee.
+    Check that the concurrent builds match a plain build (`experiments/benchmark_parallel_build.py --verify`)
+    before relying on them. Other datasets are built directly.
+
+    :param evaluator: The evaluator used for building.
+    :param dataset: The FileDataset to build.
+    :param workers: Number of shards, defaults to the number of CPUs.
+    :param batch_size: Number of batches to build each shard in.
+    :param connection: The connection predicate used to estimate the molecule sizes.
+    :param concurrent: Build the shards concurrently, on a thread per shard.
+    :return: The built dataset, with samples in the original order.
+    """
+    workers = workers or os.cpu_count() or 1
+    if not isinstance(dataset, FileDataset):
+        return evaluator.build_dataset(dataset, batch_size=batch_size)
+
+    examples = read_examples(dataset)
+
+    if examples:
+        costs = [
+            molecule_cost(*molecule_size(example, connection)) for example in examples
+        ]
+    else:
+        costs = [1] * len(read_queries(dataset))
+
+    shards = shard_indices(costs, workers)
+    if len(shards) <= 1:
+        return evaluator.build_dataset(dataset, batch_size=batch_size)
+
+    def build(subset):
+        return evaluator.build_dataset(subset, batch_size=batch_size)
+
+    samples = [None] * len(costs)
+    with tempfile.TemporaryDirectory(prefix="chemlogic_") as directory:
+        subsets = [
+            subset_dataset(dataset, indices, os.path.join(directory, str(i)))
+            for i, indices in enumerate(shards)
+        ]
+
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                built_shards = list(executor.map(build, subsets))
+        else:
+            built_shards = [build(subset) for subset in subsets]
+
+        for indices, built_shard in zip(shards, built_shards, strict=True):
+            for i, sample in zip(indices, built_shard.samples, strict=True):
+                samples[i] = sample
+
+    return BuiltDataset(samples, batch_size)
@@ -0,0 +1,103 @@
+import copy
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def copy_state_dict(state_dict: dict) -> dict:
+    """Returns a detached copy of an evaluator state dict."""
+    return copy.deepcopy(state_dict)
+
+
+def seeded_state_dict(state_dict: dict, seed: int, scale: float = 2.0) -> dict:
+    """
+    Reinitialize the weights of a state dict with seeded uniformly distributed samples from
+    `[-scale / 2, scale / 2]`, the interval of the backend's default initializer.
+    """
+    rng = np.random.default_rng(seed)
+    weights = {}
+    for index, value in sorted(state_dict["weights"].items()):
+        sample = rng.uniform(-scale / 2, scale / 2, np.shape(value))
+        weights[index] = sample.tolist() if np.ndim(value) else float(sample)
+    return {**state_dict, "weights": weights}
+
+
+def state_dict_to_json(state_dict: dict) -> dict:
+    """Convert an evaluator state dict to a JSON-serializable dict (weight indices become strings)."""
+    return {
+        key: {str(index): value for index, value in entries.items()}
+        for key, entries in state_dict.items()
+    }
+
+
+def state_dict_from_json(data: dict) -> dict:
+    """Inverse of `state_dict_to_json`, restores the integer weight indices."""
+    return {
+        key: {int(index): value for index, value in entries.items()}
+        for key, entries in data.items()
+    }
+
+
+def model_fingerprint(template_text: str, state_dict: dict) -> str:
+    """SHA-256 digest identifying a model by its composed template and weights."""
+    digest = hashlib.sha256(template_text.encode())
+    digest.update(json.dumps(state_dict_to_json(state_dict), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def save_json(data, path: str):
+    """Write JSON data atomically, so an interrupted write does not corrupt an existing file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary_path, path)
+
+
+def save_state_dict(state_dict: dict, path: str):
+    """Save an evaluator state dict to a JSON file."""
+    save_json(state_dict_to_json(state_dict), path)
+
+
+def load_state_dict(path: str) -> dict:
+    """Load an evaluator state dict saved by `save_state_dict`."""
+    with open(path) as f:
+        return state_dict_from_json(json.load(f))
+
+
+def save_checkpoint(path: str, progress: dict, state_dict: dict):
+    """
+    Save a training checkpoint.
+
+    :param path: Path to the JSON checkpoint file.
+    :param progress: The training progress (epoch counter, loss history, early stopping state, shuffling order
+        and RNG state) as kept by `Pipeline._train_model`.
+    :param state_dict: The current evaluator state dict.
+    """
+    checkpoint = dict(progress)
+    checkpoint["state_dict"] = state_dict_to_json(state_dict)
+    if progress["best_state"] is not None:
+        checkpoint["best_state"] = state_dict_to_json(progress["best_state"])
+    save_json(checkpoint, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """Load a training checkpoint saved by `save_checkpoint`."""
+    with open(path) as f:
+        checkpoint = json.load(f)
+
+    checkpoint["state_dict"] = state_dict_from_json(checkpoint["state_dict"])
+    if checkpoint["best_state"] is not None:
+        checkpoint["best_state"] = state_dict_from_json(checkpoint["best_state"])
+
+    # JSON stores tuples as lists
+    version, internal_state, gauss = checkpoint["rng_state"]
+    checkpoint["rng_state"] = (version, tuple(internal_state), gauss)
+    checkpoint["validation_scores"] = [
+        tuple(score) for score in checkpoint["validation_scores"]
+    ]
+    return checkpoint
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import unittest
+
+from chemlogic.utils.AsyncInferenceEngine import (
+    AsyncInferenceEngine,
+    synthetic_requests,
+)
+
+
+class FakeEngine:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.threads = set()
+        self.fail = fail
+
+    def predict(self, smiles_list):
+        self.calls.append(list(smiles_list))
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise RuntimeError("backend failure")
+        return [
+            None if smiles == "x((" else float(len(smiles)) for smiles in smiles_list
+        ]
+
+    def stats(self):
+        return {"requests": len(self.calls)}
+
+
+class TestAsyncInferenceEngine(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_requests_are_batched(self):
+        engine = FakeEngine()
+        smiles = ["C" * (i + 1) for i in range(10)]
+
+        async with AsyncInferenceEngine(
+            engine, max_batch_size=4, max_wait=1.0
+        ) as batcher:
+            predictions = await asyncio.gather(*(batcher.predict(s) for s in smiles))
+
+        self.assertEqual(predictions, [float(i + 1) for i in range(10)])
+        self.assertEqual([len(call) for call in engine.calls], [4, 4, 2])
+        self.assertNotIn(threading.current_thread().name, engine.threads)
+
+        stats = batcher.stats()
+        self.assertEqual(stats["batches"], 3)
+        self.assertEqual(stats["largest_batch"], 4)
+        self.assertEqual(stats["engine"]["requests"], 3)
+
+    async def test_max_wait_flushes_partial_batch(self):
+        engine = FakeEngine()
+
+        async with AsyncInferenceEngine(
+            engine, max_batch_size=64, max_wait=0.01
+        ) as batcher:
+            self.assertEqual(await batcher.predict("CC"), 2.0)
+            self.assertIsNone(await batcher.predict("x(("))
+
+        self.assertEqual(engine.calls, [["CC"], ["x(("]])
+
+    async def test_errors_reach_all_requests(self):
+        async with AsyncInferenceEngine(
+            FakeEngine(fail=True), max_wait=0.01
+        ) as batcher:
+            results = await asyncio.gather(
+                batcher.predict("C"), batcher.predict("CC"), return_exceptions=True
+            )
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    async def test_synthetic_requests(self):
+        engine = FakeEngine()
+
+        async with AsyncInferenceEngine(
+            engine, max_batch_size=8, max_wait=0.005
+        ) as batcher:
+            predictions, latencies = await synthetic_requests(
+                batcher, ["C", "CC", "CCC"], requests=50, rate=5000.0
+            )
+
+        self.assertEqual(len(predictions), 50)
+        self.assertEqual(len(latencies), 50)
+        self.assertTrue(set(predictions) <= {1.0, 2.0, 3.0})
+        self.assertEqual(sum(len(call) for call in engine.calls), 50)
+        self.assertLess(len(engine.calls), 50)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            AsyncInferenceEngine(FakeEngine(), max_batch_size=0)
+        with self.assertRaises(ValueError):
+            AsyncInferenceEngine(FakeEngine(), max_wait=-1)
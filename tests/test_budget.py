@@ -0,0 +1,137 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from neuralogic.dataset import FileDataset
+
+from chemlogic.datasets.utils.molecules import molecule_size, read_examples
+from chemlogic.utils.GroundingBudget import GroundingBudget
+from chemlogic.utils.Pipeline import Pipeline
+
+
+def make_sample(neurons):
+    sample = MagicMock()
+    sample.java_sample.query.evidence.allNeuronsTopologic = [None] * neurons
+    return sample
+
+
+class TestGroundingBudget(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        examples = os.path.join(self.directory.name, "examples.txt")
+        queries = os.path.join(self.directory.name, "queries.txt")
+
+        sizes = [3, 40, 5]
+        with open(examples, "w") as f:
+            for size in sizes:
+                f.write(
+                    ",".join(f"c({i})" for i in range(size))
+                    + ","
+                    + ",".join(
+                        f"bond({i}, {i + 1}, {100 + i})" for i in range(size - 1)
+                    )
+                    + ".\n"
+                )
+        with open(queries, "w") as f:
+            f.writelines("1.0 predict.\n" for _ in sizes)
+        self.dataset = FileDataset(examples_file=examples, queries_file=queries)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _evaluator(self, delay=0.0, fail=False):
+        def build_dataset(dataset):
+            atoms, _, _ = molecule_size(read_examples(dataset)[0])
+            if atoms > 10:
+                if fail:
+                    raise RuntimeError("out of memory")
+                time.sleep(delay)
+            return MagicMock(samples=[make_sample(atoms * 10)])
+
+        evaluator = MagicMock()
+        evaluator.build_dataset.side_effect = build_dataset
+        return evaluator
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            GroundingBudget(max_neurons=10, policy="ignore")
+        with self.assertRaises(ValueError):
+            GroundingBudget()
+
+    def test_neuron_budget(self):
+        budget = GroundingBudget(max_neurons=100)
+        with self.assertLogs(level="WARNING"):
+            built = budget.build(self._evaluator(), self.dataset)
+
+        self.assertIsNone(built.samples[1])
+        self.assertIsNotNone(built.samples[0])
+        self.assertEqual(budget.exceeded[0]["index"], 1)
+        self.assertEqual(budget.exceeded[0]["reason"], "neurons")
+
+    def test_time_budget(self):
+        budget = GroundingBudget(max_time=0.1)
+        with self.assertLogs(level="WARNING"):
+            built = budget.build(self._evaluator(delay=1.0), self.dataset)
+
+        self.assertEqual([s is None for s in built.samples], [False, True, False])
+        self.assertEqual(budget.exceeded[0]["reason"], "time")
+
+    def test_runaway_build_not_overlapped(self):
+        running = []
+        overlaps = []
+        evaluator = self._evaluator(delay=0.5)
+        build_dataset = evaluator.build_dataset.side_effect
+
+        def exclusive_build(dataset):
+            overlaps.append(bool(running))
+            running.append(dataset)
+            try:
+                return build_dataset(dataset)
+            finally:
+                running.remove(dataset)
+
+        evaluator.build_dataset.side_effect = exclusive_build
+        budget = GroundingBudget(max_time=0.1)
+        with self.assertLogs(level="WARNING"):
+            built = budget.build(evaluator, self.dataset)
+
+        self.assertEqual(overlaps, [False, False, False])
+        self.assertEqual([s is None for s in built.samples], [False, True, False])
+        self.assertLess(budget.exceeded[0]["time"], 0.5)
+
+    def test_failed_build_is_exceeded(self):
+        budget = GroundingBudget(max_neurons=1000)
+        with self.assertLogs(level="WARNING"):
+            built = budget.build(self._evaluator(fail=True), self.dataset)
+
+        self.assertIsNone(built.samples[1])
+        self.assertIn("out of memory", budget.exceeded[0]["reason"])
+
+
+class TestReducedPipeline(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = Pipeline(
+            "mutagen", "gnn", 1, 1, subgraphs=True, chem_rules=True, max_cycle_size=8
+        )
+
+    def test_fallback_drops_knowledge_base(self):
+        reduced = self.pipeline._reduced_pipeline(
+            GroundingBudget(max_neurons=10, policy="fallback")
+        )
+        origins = {reduced.template.rule_origin(r) for r in reduced.template.template}
+
+        self.assertNotIn("CyclePattern", origins)
+        self.assertIn("GNN", origins)
+
+    def test_truncate_reduces_depth(self):
+        reduced = self.pipeline._reduced_pipeline(
+            GroundingBudget(max_neurons=10, policy="truncate", truncated_cycle_size=5)
+        )
+
+        self.assertEqual(reduced.config["max_cycle_size"], 5)
+        self.assertEqual(reduced.config["max_subgraph_depth"], 3)
+        self.assertLess(
+            len(reduced.template.template), len(self.pipeline.template.template)
+        )
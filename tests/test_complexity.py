@@ -0,0 +1,90 @@
+import time
+import unittest
+
+from chemlogic.knowledge_base.subgraph_patterns.CyclePattern import CyclePattern
+from chemlogic.knowledge_base.subgraph_patterns.NeighborhoodPatterns import (
+    NeighborhoodPatterns,
+)
+from chemlogic.knowledge_base.subgraph_patterns.PathPattern import PathPattern
+from chemlogic.models import KGNN
+from chemlogic.utils.complexity import estimate_groundings, format_bound
+from chemlogic.utils.Pipeline import Pipeline
+
+
+class TestTemplateComplexity(unittest.TestCase):
+    def setUp(self):
+        self.kb_args = {
+            "layer_name": "sub",
+            "node_embed": "node",
+            "edge_embed": "edge",
+            "connection": "bond",
+            "param_size": (1,),
+        }
+
+    def _by_head(self, report, head):
+        return [row for row in report if row["head"] == head]
+
+    def test_cycle_bound(self):
+        report = CyclePattern(**self.kb_args, max_cycle_size=7).complexity_report()
+        cycles = self._by_head(report, "sub_cycle")
+        worst = cycles[0]
+
+        self.assertEqual(worst["bound"], "O(m * d^4)")
+        self.assertEqual(worst["alldiff_arity"], 6)
+        self.assertEqual(worst["free_variables"], 11)
+
+    def test_neighborhood_bound(self):
+        report = NeighborhoodPatterns(
+            **self.kb_args, atom_type="key", carbon="c", nbh_max_size=5
+        ).complexity_report()
+        nbhood = self._by_head(report, "sub_5_nbhood")[0]
+
+        self.assertEqual(nbhood["bound"], "O(m * d^4)")
+        self.assertEqual(nbhood["alldiff_arity"], 6)
+
+    def test_path_recursion_counters(self):
+        path = PathPattern(**self.kb_args, max_depth=4)
+        report = path.complexity_report()
+        recursive = [row for row in report if row["recursive"]]
+
+        self.assertEqual(len(recursive), 1)
+        self.assertEqual(recursive[0]["counters"], 1)
+        self.assertEqual(recursive[0]["counter_depth"], 4)
+
+    def test_kgnn_is_cubic_in_atoms(self):
+        model = KGNN(
+            layers=1,
+            node_embed="node",
+            edge_embed="edge",
+            connection="bond",
+            param_size=1,
+            max_depth=2,
+            local=False,
+        )
+        report = model.complexity_report()
+        self.assertEqual(report[0]["bound"], "O(n^3)")
+
+    def test_format_and_estimate(self):
+        exponents = {"atoms": 0, "bonds": 1, "degree": 2, "depth": 0}
+        self.assertEqual(format_bound(exponents), "O(m * d^2)")
+        self.assertEqual(format_bound({}), "O(1)")
+        self.assertEqual(estimate_groundings(exponents, 10, 12, 3), 108)
+
+    def test_pipeline_report_ranks_patterns(self):
+        pipeline = Pipeline(
+            "mutagen",
+            "gnn",
+            1,
+            1,
+            subgraphs=(True, False, False, True, False, False),
+            max_cycle_size=11,
+        )
+        start = time.perf_counter()
+        report = pipeline.complexity_report()
+        self.assertLess(time.perf_counter() - start, 1)
+
+        worst = report[0]
+        self.assertEqual(worst["origin"], "CyclePattern")
+        self.assertEqual(worst["bound"], "O(m * d^8)")
+        origins = [row["origin"] for row in report[:10]]
+        self.assertIn("NeighborhoodPatterns", origins)
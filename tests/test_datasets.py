@@ -1,3 +1,6 @@
+import gc
+import os
+import tempfile
 import unittest
 
 from neuralogic.core import R, Settings, V
@@ -14,11 +17,19 @@ from chemlogic.datasets import (
     PTCMM,
     CustomDataset,
     Dataset,
+    MultiTaskDataset,
     SmilesDataset,
     get_available_datasets,
     get_dataset,
     get_dataset_len,
 )
+from chemlogic.datasets.utils.molecules import (
+    molecule_size,
+    parse_facts,
+    read_examples,
+    read_queries,
+    subset_dataset,
+)
 
 
 class TestDataset(unittest.TestCase):
@@ -228,6 +239,63 @@ class TestDatasetClasses(unittest.TestCase):
         dataset.clear()
 
 
+class TestMultiTaskDataset(unittest.TestCase):
+    def test_bundled_tasks_share_molecules(self):
+        tasks = ["cyp2c9_substrate", "cyp2d6_substrate", "cyp3a4_substrate"]
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = MultiTaskDataset(tasks, param_size=1, output_directory=directory)
+            examples = read_examples(dataset.data)
+            queries = read_queries(dataset.data)
+
+        self.assertEqual(dataset.tasks, tasks)
+        self.assertEqual(len(examples), len(set(examples)))
+        self.assertLess(len(examples), sum(get_dataset_len(task) for task in tasks))
+        self.assertEqual(
+            len(dataset.sample_tasks), sum(q.count("predict_") for q in queries)
+        )
+        self.assertEqual(dataset.vocabulary()["tasks"], tasks)
+
+    def test_missing_labels_are_masked(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = {}
+            for task, lines in {
+                "a": [("<1> c(0).", "1.0"), ("<1> o(0).", "0.0")],
+                "b": [("<1> o(0).", "1.0"), ("<1> n(0).", "0.0"), ("<1> o(0).", "0.0")],
+            }.items():
+                examples = os.path.join(directory, f"{task}_examples.txt")
+                queries = os.path.join(directory, f"{task}_queries.txt")
+                with open(examples, "w") as e_file, open(queries, "w") as q_file:
+                    for example, label in lines:
+                        e_file.write(f"{example}\n")
+                        q_file.write(f"{label} predict.\n")
+                files[task] = (examples, queries)
+
+            dataset = MultiTaskDataset(
+                files, param_size=1, output_directory=os.path.join(directory, "merged")
+            )
+            queries = read_queries(dataset.data)
+
+        self.assertEqual(
+            queries,
+            ["1.0 predict_a.", "0.0 predict_a, 1.0 predict_b.", "0.0 predict_b."],
+        )
+        self.assertEqual(dataset.sample_molecules, [0, 1, 1, 2])
+        self.assertEqual(dataset.sample_tasks, [0, 0, 1, 1])
+
+    def test_no_tasks(self):
+        with self.assertRaises(ValueError):
+            MultiTaskDataset([], param_size=1)
+
+    def test_temporary_directory_removed_with_dataset(self):
+        dataset = MultiTaskDataset(["cyp2c9_substrate"], param_size=1)
+        directory = dataset.output_directory
+        self.assertTrue(os.path.isfile(dataset.data.queries_file))
+
+        del dataset
+        gc.collect()
+        self.assertFalse(os.path.exists(directory))
+
+
 class TestDatasetLoader(unittest.TestCase):
     def test_get_available_datasets(self):
         datasets = get_available_datasets()
@@ -251,6 +319,34 @@ class TestDatasetLoader(unittest.TestCase):
             get_dataset("invalid_dataset", param_size=1)
 
 
+class TestMoleculeUtils(unittest.TestCase):
+    def test_parse_facts(self):
+        facts = parse_facts("<1> bond(0, 1, 2),<1> b_1(2),<1> c(0).")
+        self.assertEqual(
+            facts, [("bond", ("0", "1", "2")), ("b_1", ("2",)), ("c", ("0",))]
+        )
+
+    def test_molecule_size(self):
+        example = (
+            "<1> bond(0, 1, 5),<1> bond(1, 0, 5),<1> b_1(5), <1> bond(1, 2, 6),"
+            "<1> bond(2, 1, 6),<1> b_2(6),<1> c(0),<1> c(1),<1> o(2)."
+        )
+        self.assertEqual(molecule_size(example), (3, 2, 2))
+
+    def test_molecule_size_single_atom(self):
+        self.assertEqual(molecule_size("<1> o(0)."), (1, 0, 0))
+
+    def test_subset_dataset(self):
+        dataset = PTC(param_size=1).data
+        with tempfile.TemporaryDirectory() as directory:
+            subset = subset_dataset(dataset, [2, 0], directory)
+            self.assertEqual(
+                read_examples(subset),
+                [read_examples(dataset)[2], read_examples(dataset)[0]],
+            )
+            self.assertEqual(len(read_queries(subset)), 2)
+
+
 class TestDatasetsBuildable(unittest.TestCase):
     def test_anti_sarscov2_activity_buildable(self):
         dataset = CustomDataset(
@@ -422,6 +518,23 @@ class TestDatasetsBuildable(unittest.TestCase):
         evaluator = get_evaluator(dataset, Settings())
         evaluator.build_dataset(dataset.data)
 
+    def test_multitask_dataset_buildable(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = MultiTaskDataset(
+                ["cyp2c9_substrate", "cyp2d6_substrate"],
+                param_size=1,
+                output_directory=directory,
+            )
+            dataset.add_rules(
+                [
+                    R.get(f"predict_{task}") <= R.get(dataset.node_embed)(V.X)
+                    for task in dataset.tasks
+                ]
+            )
+            evaluator = get_evaluator(dataset, Settings())
+            built_dataset = evaluator.build_dataset(dataset.data)
+            self.assertEqual(len(built_dataset.samples), len(dataset.sample_tasks))
+
     def test_smiles_dataset_buildable(self):
         dataset = SmilesDataset(
             smiles_list=["O"],
@@ -0,0 +1,209 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from neuralogic.core import Settings
+from neuralogic.dataset import FileDataset
+from neuralogic.nn.loss import SoftEntropy
+from neuralogic.optim import SGD, Adam
+
+from chemlogic.datasets.utils.molecules import (
+    molecule_graph,
+    molecule_hash,
+    read_queries,
+    same_molecule,
+)
+from chemlogic.utils.GroundingCache import GroundingCache
+from chemlogic.utils.Pipeline import Pipeline
+
+ETHANOL = "c(0), c(1), o(2), bond(0, 1, 10), bond(1, 0, 10), bond(1, 2, 11), bond(2, 1, 11), b_1(10), b_1(11)."
+# Ethanol with permuted atom and bond constants
+ETHANOL_PERMUTED = "o(5), c(7), c(3), bond(3, 7, 21), bond(7, 3, 21), bond(7, 5, 20), bond(5, 7, 20), b_1(20), b_1(21)."
+# Acetaldehyde, the same atoms with a double bond
+ACETALDEHYDE = "c(0), c(1), o(2), bond(0, 1, 10), bond(1, 0, 10), bond(1, 2, 11), bond(2, 1, 11), b_1(10), b_2(11)."
+
+
+class FakeEvaluator:
+    def __init__(self):
+        self.built = []
+
+    def build_dataset(self, dataset, batch_size=1):
+        queries = read_queries(dataset)
+        self.built.append(queries)
+        return SimpleNamespace(samples=[object() for _ in queries])
+
+
+class TestMoleculeHash(unittest.TestCase):
+    def test_permuted_molecules_are_equal(self):
+        first, second = molecule_graph(ETHANOL), molecule_graph(ETHANOL_PERMUTED)
+
+        self.assertEqual(molecule_hash(first), molecule_hash(second))
+        self.assertTrue(same_molecule(first, second))
+        self.assertEqual(first.number_of_nodes(), 3)
+        self.assertEqual(first.number_of_edges(), 2)
+
+    def test_bond_types_distinguish_molecules(self):
+        first, second = molecule_graph(ETHANOL), molecule_graph(ACETALDEHYDE)
+
+        self.assertNotEqual(molecule_hash(first), molecule_hash(second))
+        self.assertFalse(same_molecule(first, second))
+
+
+class TestGroundingCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_dataset(self, name, molecules):
+        examples = os.path.join(self.directory.name, f"{name}_examples.txt")
+        queries = os.path.join(self.directory.name, f"{name}_queries.txt")
+        with open(examples, "w") as e_file, open(queries, "w") as q_file:
+            for example, label in molecules:
+                e_file.write(f"{example}\n")
+                q_file.write(f"{label} predict.\n")
+        return FileDataset(examples_file=examples, queries_file=queries)
+
+    def test_duplicates_share_samples(self):
+        dataset = self.make_dataset(
+            "a",
+            [
+                (ETHANOL, 1.0),
+                (ACETALDEHYDE, 0.0),
+                (ETHANOL_PERMUTED, 1.0),
+                (ETHANOL, 0.0),
+            ],
+        )
+        evaluator = FakeEvaluator()
+        cache = GroundingCache()
+
+        samples = cache.build(evaluator, dataset).samples
+
+        self.assertEqual(len(evaluator.built[0]), 3)
+        self.assertIs(samples[0], samples[2])
+        # Different labels are different samples
+        self.assertIsNot(samples[0], samples[3])
+        self.assertEqual(cache.keys[0], cache.keys[2])
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["molecules"], 3)
+
+    def test_samples_shared_across_datasets(self):
+        evaluator = FakeEvaluator()
+        cache = GroundingCache()
+
+        first = cache.build(
+            evaluator,
+            self.make_dataset("a", [(ETHANOL, 1.0), (ACETALDEHYDE, 0.0)]),
+        ).samples
+        second = cache.build(
+            evaluator,
+            self.make_dataset("b", [(ACETALDEHYDE, 0.0), (ETHANOL_PERMUTED, 0.0)]),
+        ).samples
+
+        self.assertEqual([len(queries) for queries in evaluator.built], [2, 1])
+        self.assertIs(second[0], first[1])
+        self.assertIsNot(second[1], first[0])
+        self.assertAlmostEqual(cache.stats()["hit_rate"], 0.25)
+
+        with self.assertRaises(ValueError):
+            cache.build(FakeEvaluator(), self.make_dataset("c", [(ETHANOL, 1.0)]))
+
+    @patch("chemlogic.utils.GroundingCache.time.perf_counter")
+    def test_grounding_time_of_reused_molecules(self, mock_perf_counter):
+        mock_perf_counter.side_effect = [0.0, 2.0, 10.0, 11.0]
+        evaluator = FakeEvaluator()
+        cache = GroundingCache()
+        first = self.make_dataset("a", [(ETHANOL, 1.0), (ACETALDEHYDE, 0.0)])
+        second = self.make_dataset("b", [(ACETALDEHYDE, 0.0), (ETHANOL, 0.0)])
+
+        cache.build(evaluator, first)
+        self.assertAlmostEqual(cache.grounding_time(), 2.0)
+        cache.build(evaluator, second)
+        self.assertAlmostEqual(cache.grounding_time(), 2.0)
+        # Building a dataset again does not change its grounding time
+        cache.build(evaluator, first)
+        self.assertAlmostEqual(cache.grounding_time(), 2.0)
+        self.assertAlmostEqual(cache.stats()["build_time"], 3.0)
+
+    @patch("chemlogic.utils.GroundingCache.get_evaluator")
+    def test_evaluator_for_reuses_evaluator_of_same_grounding(self, mock_get_evaluator):
+        mock_get_evaluator.side_effect = lambda template, settings: MagicMock(
+            build_dataset=FakeEvaluator().build_dataset
+        )
+        cache = GroundingCache()
+        template = MagicMock()
+        dataset = self.make_dataset("a", [(ETHANOL, 1.0)])
+
+        first = cache.evaluator_for(
+            template, Settings(optimizer=Adam(lr=0.01), epochs=50)
+        )
+        cache.build(first, dataset)
+        # Other training settings train the built samples with a new learning rate
+        second = cache.evaluator_for(
+            template, Settings(optimizer=Adam(lr=0.001), epochs=150)
+        )
+        self.assertIs(second, first)
+        self.assertEqual(first.settings.optimizer.lr, 0.001)
+        first.reset_parameters.assert_called_once()
+        cache.build(second, dataset)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        # The samples are bound to the first evaluator, they are built again
+        third = cache.evaluator_for(
+            template, Settings(optimizer=Adam(lr=0.001), chain_pruning=False)
+        )
+        self.assertIsNot(third, first)
+        self.assertEqual(mock_get_evaluator.call_count, 2)
+        cache.build(third, dataset)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+        with self.assertRaises(ValueError):
+            cache.evaluator_for(MagicMock(), Settings())
+
+    def test_settings_key(self):
+        key = GroundingCache.settings_key(Settings(optimizer=Adam(lr=0.01)))
+
+        self.assertEqual(
+            key,
+            GroundingCache.settings_key(Settings(optimizer=Adam(lr=0.1), epochs=5)),
+        )
+        self.assertNotEqual(
+            key, GroundingCache.settings_key(Settings(optimizer=SGD(lr=0.01)))
+        )
+        self.assertNotEqual(
+            key,
+            GroundingCache.settings_key(
+                Settings(optimizer=Adam(lr=0.01), error_function=SoftEntropy())
+            ),
+        )
+
+    @patch("chemlogic.utils.GroundingCache.get_evaluator")
+    def test_pipeline_keeps_duplicates_in_one_part(self, mock_get_evaluator):
+        mock_get_evaluator.return_value = FakeEvaluator()
+        molecules = [(ETHANOL, 1.0), (ACETALDEHYDE, 0.0)] * 4 + [
+            (ETHANOL_PERMUTED, 0.0),
+            (ACETALDEHYDE, 1.0),
+        ]
+
+        pipeline = Pipeline(
+            dataset_name="mutagen", model_name="gnn", param_size=4, layers=2
+        )
+        pipeline.dataset = MagicMock(
+            data=self.make_dataset("a", molecules), connection="bond"
+        )
+        trained = []
+        pipeline._train_model = lambda e, d, *args, **kwargs: trained.append(d) or [0.1]
+        pipeline._evaluate_model = lambda e, d: (0.2, 0.9)
+
+        pipeline.train_test_cycle(epochs=1, split_ratio=0.5, deduplicate=True)
+
+        self.assertEqual(len(mock_get_evaluator.return_value.built[0]), 4)
+        self.assertEqual(len(set(map(id, pipeline.samples))), 4)
+        train = {id(pipeline.samples[i]) for i in pipeline.train_indices}
+        test = {id(pipeline.samples[i]) for i in pipeline.test_indices}
+        self.assertFalse(train & test)
+        # Duplicates stay in the training samples, weighting the molecule by its multiplicity
+        self.assertEqual(len(trained[0]), len(pipeline.train_indices))
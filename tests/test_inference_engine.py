@@ -0,0 +1,130 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from neuralogic.core import R, V
+
+from chemlogic.datasets.utils.smiles_conversion import (
+    smiles_to_example,
+    smiles_to_facts,
+)
+from chemlogic.utils.InferenceEngine import InferenceEngine
+
+
+class TestSmilesToFacts(unittest.TestCase):
+    def test_facts(self):
+        facts = smiles_to_facts("C=O", explicit_hydrogens=False)
+
+        self.assertEqual(
+            facts,
+            [
+                ("c", (0,)),
+                ("o", (1,)),
+                ("bond", (0, 1, 2)),
+                ("bond", (1, 0, 2)),
+                ("b_2", (2,)),
+            ],
+        )
+
+    def test_invalid_smiles(self):
+        self.assertIsNone(smiles_to_facts("not a molecule"))
+        self.assertIsNone(smiles_to_example("not a molecule"))
+
+    def test_example_relations(self):
+        example = smiles_to_example("CO")
+        self.assertIn("bond(0, 1, 6).", [str(relation) for relation in example])
+
+
+class TestInferenceEngine(unittest.TestCase):
+    def setUp(self):
+        self.built = []
+
+        def build_dataset(dataset):
+            self.built.append(dataset)
+            # A sample per query of every example
+            return MagicMock(
+                samples=[
+                    example
+                    for example, queries in zip(
+                        dataset._examples, dataset._queries, strict=True
+                    )
+                    for _ in queries
+                ]
+            )
+
+        def test(built_dataset, generator=False):
+            # Predict the number of facts of every molecule
+            return [float(len(example)) for example in built_dataset.samples]
+
+        self.pipeline = MagicMock(output_names=["predict"])
+        self.pipeline.template.template = [R.predict <= R.c(V.X)]
+        self.pipeline.evaluator.build_dataset.side_effect = build_dataset
+        self.pipeline.evaluator.test.side_effect = test
+
+    def test_requires_trained_pipeline(self):
+        with self.assertRaises(ValueError):
+            InferenceEngine(object())
+
+    def test_output_predicates(self):
+        with self.assertRaises(ValueError):
+            InferenceEngine(self.pipeline, output_name="predict_a")
+
+        # A multi-task (or model comparison) pipeline predicts every task
+        self.pipeline.output_names = ["predict_a", "predict_b"]
+        self.pipeline.template.template = [
+            R.predict_a <= R.c(V.X),
+            R.predict_b <= R.c(V.X),
+        ]
+        with self.assertRaises(ValueError):
+            InferenceEngine(self.pipeline, output_name="predict")
+
+        engine = InferenceEngine(self.pipeline)
+        predictions = engine.predict(["C", "invalid((", "CC"])
+
+        self.assertEqual(predictions, [[17.0, 17.0], None, [29.0, 29.0]])
+        # Every molecule is grounded once, with a query per task
+        self.assertEqual(len(self.built[0]._examples), 2)
+        queries = [
+            [str(query) for query in queries] for queries in self.built[0]._queries
+        ]
+        self.assertEqual(queries, [["predict_a.", "predict_b."]] * 2)
+
+    def test_batched_predictions_keep_order(self):
+        engine = InferenceEngine(self.pipeline, batch_size=2)
+        predictions = engine.predict(["C", "invalid((", "CC", "O", "N#N"])
+
+        self.assertEqual(predictions, [17.0, None, 29.0, 9.0, 5.0])
+        self.assertEqual(len(self.built), 2)
+        self.assertEqual(len(self.built[0]._queries), 2)
+
+    def test_stats(self):
+        engine = InferenceEngine(self.pipeline, batch_size=8)
+        engine.predict(["C", "CC"])
+        engine.predict(["x("])
+        stats = engine.stats()
+
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["molecules"], 3)
+        self.assertEqual(stats["invalid"], 1)
+        self.assertEqual(stats["batches"], 1)
+        self.assertGreaterEqual(stats["p99_latency"], stats["p50_latency"])
+
+        engine.reset_stats()
+        self.assertEqual(engine.stats()["requests"], 0)
+
+    def test_thread_safe(self):
+        engine = InferenceEngine(self.pipeline, batch_size=4)
+        results = {}
+
+        def worker(i):
+            results[i] = engine.predict(["C"] * (i + 1))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i in range(8):
+            self.assertEqual(results[i], [17.0] * (i + 1))
+        self.assertEqual(engine.stats()["molecules"], sum(range(1, 9)))
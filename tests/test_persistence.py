@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from chemlogic.datasets import MUTAG, MultiTaskDataset, VocabularyDataset
+from chemlogic.utils.Pipeline import ArchitectureType, Pipeline
+
+
+class TestPipelinePersistence(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pipeline = Pipeline(
+            "mutagen",
+            "gnn",
+            2,
+            2,
+            subgraphs=(True, False, False, False, False, False),
+            max_cycle_size=6,
+            architecture=ArchitectureType.CCD,
+        )
+        self.state = {"weights": {0: [0.5, 0.25]}, "weight_names": {0: "w"}}
+        self.pipeline.evaluator = MagicMock()
+        self.pipeline.evaluator.state_dict.return_value = self.state
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_requires_trained_model(self):
+        pipeline = Pipeline("mutagen", "gnn", 1, 1)
+        with self.assertRaises(ValueError):
+            pipeline.save(self.directory.name)
+
+    def test_vocabulary_dataset_has_no_data(self):
+        dataset = VocabularyDataset(MUTAG(2).vocabulary())
+
+        self.assertIsNone(dataset.data)
+        self.assertEqual(str(dataset), str(MUTAG(2)))
+
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_save_and_load_multitask(self, mock_get_evaluator):
+        dataset = MultiTaskDataset(
+            ["cyp2c9_substrate", "cyp2d6_substrate"],
+            param_size=2,
+            output_directory=os.path.join(self.directory.name, "data"),
+        )
+        pipeline = Pipeline("multitask", "gnn", 2, 2, dataset=dataset)
+        pipeline.evaluator = self.pipeline.evaluator
+        pipeline.save(self.directory.name)
+
+        loaded = Pipeline.load(self.directory.name)
+
+        self.assertEqual(loaded.tasks, dataset.tasks)
+        self.assertEqual(str(loaded.template), str(pipeline.template))
+
+    @patch("chemlogic.utils.Pipeline.get_dataset")
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_save_and_load(self, mock_get_evaluator, mock_get_dataset):
+        self.pipeline.save(self.directory.name)
+        loaded = Pipeline.load(self.directory.name)
+
+        mock_get_dataset.assert_not_called()
+        self.assertEqual(str(loaded.template), str(self.pipeline.template))
+        self.assertEqual(loaded.config["architecture"], ArchitectureType.CCD)
+        self.assertEqual(loaded.task, "classification")
+        loaded.evaluator.load_state_dict.assert_called_once_with(self.state)
+
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_load_rejects_changed_template(self, mock_get_evaluator):
+        self.pipeline.save(self.directory.name)
+        with open(os.path.join(self.directory.name, "template.txt"), "a") as f:
+            f.write("extra.")
+
+        with self.assertRaises(ValueError):
+            Pipeline.load(self.directory.name)
@@ -1,7 +1,18 @@
+import gc
+import os
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
+import jpype
+from neuralogic.dataset import Dataset as LogicDataset
+from neuralogic.nn.loss import CrossEntropy
+
+from chemlogic.datasets import MultiTaskDataset
+from chemlogic.utils.GroundingBudget import GroundingBudget
 from chemlogic.utils.Pipeline import ArchitectureType, Pipeline
+from chemlogic.utils.state import load_state_dict, seeded_state_dict
 
 
 class TestPipeline(unittest.TestCase):
@@ -75,7 +86,7 @@ class TestPipeline(unittest.TestCase):
         mock_evaluator.return_value = mock_eval
 
         pipeline = Pipeline(**self.default_args)
-        pipeline._train_model = lambda e, d, ep, es, ed: [0.1, 0.2, 0.15]
+        pipeline._train_model = lambda e, d, ep, es, ed, **kwargs: [0.1, 0.2, 0.15]
         pipeline._evaluate_model = lambda e, d: (0.1, 0.9)
 
         result = pipeline.train_test_cycle()
@@ -106,6 +117,179 @@ class TestPipeline(unittest.TestCase):
         self.assertLessEqual(len(losses), 20)
         self.assertTrue(all(isinstance(loss, float) for loss in losses))
 
+    def test_train_model_mini_batches(self):
+        batches = []
+
+        def train(batch):
+            batches.append(list(batch))
+            return iter([(0.5 * len(batch), len(batch))])
+
+        evaluator = MagicMock()
+        evaluator.train.side_effect = train
+        pipeline = Pipeline(**self.default_args)
+        losses = pipeline._train_model(
+            evaluator,
+            list(range(10)),
+            epochs=2,
+            batch_size=4,
+            steps_per_batch=2,
+        )
+
+        self.assertEqual(losses, [0.5, 0.5])
+        self.assertEqual(len(batches), 2 * 3 * 2)
+        self.assertEqual([len(batch) for batch in batches[:6:2]], [4, 4, 2])
+        self.assertEqual(sorted(sum(batches[:6:2], [])), list(range(10)))
+        self.assertNotEqual(sum(batches[:6:2], []), sum(batches[6::2], []))
+        self.assertEqual(len(pipeline.throughput), 2)
+
+    def test_train_model_batch_order(self):
+        batches = []
+
+        def train(batch):
+            batches.append(list(batch))
+            return iter([(0.5 * len(batch), len(batch))])
+
+        evaluator = MagicMock()
+        evaluator.train.side_effect = train
+        pipeline = Pipeline(**self.default_args)
+        order = [[0, 3], [1, 2, 4]]
+        pipeline._train_model(
+            evaluator,
+            ["a", "b", "c", "d", "e"],
+            epochs=3,
+            batch_size=2,
+            batch_order=order,
+        )
+
+        self.assertEqual(len(batches), 6)
+        self.assertEqual(
+            sorted(map(sorted, batches)), sorted([["a", "d"], ["b", "c", "e"]] * 3)
+        )
+        self.assertEqual(order, [[0, 3], [1, 2, 4]])
+
+    def test_train_model_validation_early_stopping(self):
+        epochs = []
+
+        def train(batch):
+            epochs.append(len(epochs) + 1)
+            return iter([(1.0, 1)])
+
+        evaluator = MagicMock()
+        evaluator.train.side_effect = train
+        evaluator.state_dict.side_effect = lambda: {
+            "weights": {0: float(len(epochs))},
+            "weight_names": {0: "w"},
+        }
+
+        pipeline = Pipeline(**self.default_args)
+        scores = iter([0.6, 0.8, 0.7, 0.7, 0.9])
+        pipeline._validation_score = lambda e, d: next(scores)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "best.json")
+            losses = pipeline._train_model(
+                evaluator,
+                [1],
+                epochs=10,
+                early_stopping_rounds=2,
+                validation_dataset=[1],
+                best_weights_path=path,
+            )
+            saved = load_state_dict(path)
+
+        self.assertEqual(len(losses), 4)
+        self.assertEqual(pipeline.validation_scores[1], (2, 0.8))
+        evaluator.load_state_dict.assert_called_once_with(
+            {"weights": {0: 2.0}, "weight_names": {0: "w"}}
+        )
+        self.assertEqual(saved["weights"], {0: 2.0})
+
+    def test_train_model_epoch_callback(self):
+        evaluator = MagicMock()
+        evaluator.train.side_effect = lambda batch: iter([(1.0, 1)])
+
+        pipeline = Pipeline(**self.default_args)
+        scores = iter([0.6, 0.7, 0.8])
+        pipeline._validation_score = lambda e, d: next(scores)
+
+        calls = []
+        losses = pipeline._train_model(
+            evaluator,
+            [1],
+            epochs=10,
+            validation_dataset=[1],
+            validation_interval=2,
+            epoch_callback=lambda *args: calls.append(args) or len(calls) == 5,
+        )
+
+        self.assertEqual(len(losses), 5)
+        self.assertEqual(
+            calls,
+            [
+                (1, 1.0, None),
+                (2, 1.0, 0.6),
+                (3, 1.0, None),
+                (4, 1.0, 0.7),
+                (5, 1.0, None),
+            ],
+        )
+
+    def test_train_model_checkpoint_and_resume(self):
+        def make_evaluator(batches):
+            def train(batch):
+                batches.append(list(batch))
+                return iter([(float(len(batches)), len(batch))])
+
+            evaluator = MagicMock()
+            evaluator.train.side_effect = train
+            evaluator.state_dict.side_effect = lambda: {
+                "weights": {0: float(len(batches))},
+                "weight_names": {0: "w"},
+            }
+            return evaluator
+
+        args = {"train_dataset": list(range(6)), "batch_size": 2}
+        pipeline = Pipeline(**self.default_args)
+
+        full_batches = []
+        full_losses = pipeline._train_model(
+            make_evaluator(full_batches), epochs=6, **args
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            pipeline._train_model(
+                make_evaluator([]),
+                epochs=3,
+                checkpoint_path=path,
+                checkpoint_interval=1,
+                **args,
+            )
+
+            resumed_batches = []
+            resumed_evaluator = make_evaluator(resumed_batches)
+            resumed_losses = pipeline._train_model(
+                resumed_evaluator, epochs=6, resume_from=path, **args
+            )
+
+        resumed_evaluator.load_state_dict.assert_called_once_with(
+            {"weights": {0: 9.0}, "weight_names": {0: "w"}}
+        )
+        self.assertEqual(resumed_batches, full_batches[9:])
+        self.assertEqual(len(resumed_losses), 6)
+        self.assertEqual(resumed_losses[:3], full_losses[:3])
+
+    def test_validation_score_single_class(self):
+        evaluator = MagicMock()
+        evaluator.test.return_value = [0.9, 0.4]
+        sample = MagicMock()
+        sample.java_sample.target.value = 1
+
+        pipeline = Pipeline(**self.default_args)
+        score = pipeline._validation_score(evaluator, [sample, sample])
+
+        self.assertEqual(score, -0.5)
+
     def test_evaluate_model_accuracy_and_auroc(self):
         evaluator = MagicMock()
         evaluator.test.return_value = [0.9, 0.1, 0.8, 0.2]
@@ -202,8 +386,475 @@ class TestPipeline(unittest.TestCase):
 
         pipeline.evaluator = evaluator
 
-        smiles = ["C1=CC=CC=C1", "O", "N"]
+        smiles = ["C1=CC=CC=C1", "O", "invalid", "N"]
         preds = pipeline.inference(smiles)
 
-        self.assertEqual(preds, [0.1, 0.2, 0.3])
+        self.assertEqual(preds, [0.1, 0.2, None, 0.3])
+        # The molecules are converted in memory
+        dataset = evaluator.build_dataset.call_args.args[0]
+        self.assertIsInstance(dataset, LogicDataset)
+        self.assertEqual(len(dataset._examples), 3)
+
+    def test_extend_raises_if_not_trained(self):
+        pipeline = Pipeline(**self.default_args)
+
+        with self.assertRaises(ValueError):
+            pipeline.extend(queries="queries.txt")
+
+    def test_neuron_count_counts_shared_samples_once(self):
+        pipeline = Pipeline(**self.default_args)
+        with self.assertRaises(ValueError):
+            pipeline.neuron_count()
+
+        def sample(neurons):
+            sample = MagicMock()
+            sample.java_sample.query.evidence.allNeuronsTopologic = [0] * neurons
+            return sample
+
+        shared = sample(5)
+        pipeline.samples = [shared, sample(3), shared, None]
+        self.assertEqual(pipeline.neuron_count(), 8)
+
+    def test_extend_grounds_only_new_molecules(self):
+        pipeline = Pipeline(**self.default_args)
+        pipeline.samples = ["a", "b", "c", "d"]
+        pipeline.train_indices = [0, 1, 2]
+        pipeline.test_indices = [3]
+
+        evaluator = MagicMock()
+        evaluator.build_dataset.return_value.samples = ["e", "f", "g", "h"]
+        pipeline.evaluator = evaluator
+
+        trained = []
+        pipeline._train_model = lambda e, d, ep, es, ed: trained.append(d) or [0.1]
+        pipeline._evaluate_model = lambda e, d: (0.2, 0.9)
+
+        result = pipeline.extend(
+            examples="examples.txt", queries="queries.txt", fine_tune_epochs=5
+        )
+
+        evaluator.build_dataset.assert_called_once()
+        new_data = evaluator.build_dataset.call_args.args[0]
+        self.assertTrue(new_data.queries_file.endswith("queries.txt"))
+        self.assertEqual(pipeline.samples, ["a", "b", "c", "d", "e", "f", "g", "h"])
+        self.assertEqual(len(pipeline.train_indices) + len(pipeline.test_indices), 8)
+        self.assertEqual(len(trained[0]), len(pipeline.train_indices))
+        self.assertEqual(result[:3], (0.1, 0.2, 0.9))
+
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_cross_validate_reuses_grounding(self, mock_get_evaluator):
+        evaluator = MagicMock()
+        evaluator.build_dataset.return_value.samples = list(range(10))
+        evaluator.state_dict.return_value = {"weights": {0: 0.5}}
+        mock_get_evaluator.return_value = evaluator
+
+        trained = []
+        tested = []
+        pipeline = Pipeline(**self.default_args)
+        pipeline._train_model = lambda e, d, ep, es, ed, **kwargs: (
+            trained.append(d) or [0.1]
+        )
+        pipeline._evaluate_model = lambda e, d: tested.append(d) or (0.2, 0.8)
+
+        result = pipeline.cross_validate(k=5, epochs=3)
+
+        evaluator.build_dataset.assert_called_once()
+        initial_weights = [
+            call.args[0]["weights"][0]
+            for call in evaluator.load_state_dict.call_args_list
+        ]
+        self.assertEqual(
+            initial_weights,
+            [
+                seeded_state_dict({"weights": {0: 0.5}}, 42 + i)["weights"][0]
+                for i in range(5)
+            ],
+        )
+        self.assertEqual(sorted(sum(tested, [])), list(range(10)))
+        self.assertTrue(all(len(d) == 8 for d in trained))
+        self.assertEqual([fold["fold"] for fold in result["folds"]], list(range(5)))
+        self.assertAlmostEqual(result["mean"]["metric"], 0.8)
+        self.assertAlmostEqual(result["std"]["test_loss"], 0.0)
+
+    def test_multitask_folds_keep_molecules_together(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+
+        folds = pipeline._folds(12, 3, seed=0)
+        molecules = pipeline.sample_molecules
+
+        self.assertEqual(sorted(sum((test for _, test in folds), [])), list(range(12)))
+        for train, test in folds:
+            self.assertFalse(
+                {molecules[i] for i in train} & {molecules[i] for i in test}
+            )
+        self.assertEqual(folds, pipeline._folds(12, 3, seed=0))
+
+    def test_cross_validate_requires_two_folds(self):
+        pipeline = Pipeline(**self.default_args)
+
+        with self.assertRaises(ValueError):
+            pipeline.cross_validate(k=1)
+
+    def test_seeded_state_dict(self):
+        state = {"weights": {0: 0.5, 1: [[0.0, 0.0], [0.0, 0.0]]}, "weight_names": {}}
+
+        first = seeded_state_dict(state, 1)
+        self.assertEqual(first, seeded_state_dict(state, 1))
+        self.assertNotEqual(first, seeded_state_dict(state, 2))
+        self.assertIsInstance(first["weights"][0], float)
+        self.assertEqual(len(first["weights"][1]), 2)
+        self.assertTrue(all(-1 <= v <= 1 for row in first["weights"][1] for v in row))
+
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_train_ensemble_shares_grounding(self, mock_get_evaluator):
+        evaluator = MagicMock()
+        evaluator.build_dataset.return_value.samples = list(range(8))
+        evaluator.state_dict.return_value = {
+            "weights": {0: 0.0},
+            "weight_names": {0: "w"},
+        }
+        mock_get_evaluator.return_value = evaluator
+
+        member_predictions = iter([[0.2, 0.6], [0.4, 1.0]])
+        pipeline = Pipeline(**self.default_args)
+        pipeline._train_model = lambda e, d, ep, es, ed, **kwargs: [0.1]
+        pipeline._predict = lambda e, d: (next(member_predictions), [0, 1])
+
+        result = pipeline.train_ensemble(seeds=[3, 7], epochs=2)
+
+        evaluator.build_dataset.assert_called_once()
+        self.assertEqual([member["seed"] for member in result["members"]], [3, 7])
+        self.assertEqual(len(pipeline.ensemble), 2)
+        self.assertAlmostEqual(result["predictions"][0], 0.3)
+        self.assertAlmostEqual(result["predictions"][1], 0.8)
+        self.assertEqual(result["ensemble"]["metric"], 1.0)
+        self.assertAlmostEqual(result["std"]["metric"], 0.0)
+
+    @patch(
+        "chemlogic.utils.Pipeline.ProcessPoolExecutor",
+        lambda workers, mp_context: ThreadPoolExecutor(workers),
+    )
+    @patch("chemlogic.utils.Pipeline._ensemble_worker")
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_train_ensemble_in_processes(self, mock_get_evaluator, mock_worker):
+        mock_worker.side_effect = lambda config, seeds, arguments: [
+            {
+                "seed": seed,
+                "train_loss": 0.1,
+                "test_loss": 0.2,
+                "metric": 0.5,
+                "predictions": [0.5, 0.5],
+                "targets": [0, 1],
+                "test_indices": [0, 1],
+                "state_dict": {"weights": {0: float(seed)}},
+            }
+            for seed in seeds
+        ]
+
+        pipeline = Pipeline(**self.default_args)
+        pipeline.train_ensemble(seeds=[0, 1, 2], workers=2)
+
+        # Every process grounds the dataset, the parent evaluator only predicts with the members' settings
+        self.assertEqual(
+            [call.args[1] for call in mock_worker.call_args_list], [[0, 2], [1]]
+        )
+        settings = mock_get_evaluator.call_args.args[1]
+        self.assertIsInstance(settings.error_function, CrossEntropy)
+        mock_get_evaluator.return_value.build_dataset.assert_not_called()
+        self.assertEqual(pipeline.ensemble[2], {"weights": {0: 2.0}})
+
+    def test_ensemble_inference(self):
+        pipeline = Pipeline(**self.default_args)
+        pipeline.evaluator = MagicMock()
+        pipeline.ensemble = [{"weights": {0: 1.0}}, {"weights": {0: 3.0}}]
+        pipeline._build_inference_dataset = lambda smiles_list: (
+            smiles_list,
+            list(range(len(smiles_list))),
+        )
+
+        current = {}
+        pipeline.evaluator.load_state_dict.side_effect = current.update
+        pipeline.evaluator.test.side_effect = lambda built, generator=False: [
+            current["weights"][0] * len(smiles) for smiles in built
+        ]
+
+        predictions, std = pipeline.ensemble_inference(["C", "CC"], return_std=True)
+
+        self.assertEqual(predictions, [2.0, 4.0])
+        self.assertEqual(std, [1.0, 2.0])
+        self.assertEqual(pipeline.evaluator.load_state_dict.call_count, 3)
+
+    def test_ensemble_inference_requires_ensemble(self):
+        pipeline = Pipeline(**self.default_args)
+        pipeline.evaluator = MagicMock()
+
+        with self.assertRaises(ValueError):
+            pipeline.ensemble_inference(["C"])
+
+    def _multitask_pipeline(self, directory):
+        files = {}
+        for task in ["a", "b"]:
+            examples = os.path.join(directory, f"{task}_examples.txt")
+            queries = os.path.join(directory, f"{task}_queries.txt")
+            with open(examples, "w") as e_file, open(queries, "w") as q_file:
+                for i in range(6):
+                    e_file.write(f"<1> c({i}).\n")
+                    q_file.write(f"{float(i % 2)} predict.\n")
+            files[task] = (examples, queries)
+
+        dataset = MultiTaskDataset(
+            files, param_size=4, output_directory=os.path.join(directory, "merged")
+        )
+        return Pipeline(**self.default_args, dataset=dataset)
+
+    def test_multitask_outputs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
 
+        heads = {
+            rule.head.predicate.name
+            for rule in pipeline.template.template
+            if hasattr(rule, "head")
+        }
+        self.assertIn("predict_a", heads)
+        self.assertIn("predict_b", heads)
+        self.assertNotIn("predict", heads)
+
+    def test_multitask_split_keeps_molecules_together(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+
+        train, test = pipeline._split(list(range(12)), train_size=0.5)
+        molecules = pipeline.dataset.sample_molecules
+
+        self.assertEqual(len(train), 6)
+        self.assertFalse({molecules[i] for i in train} & {molecules[i] for i in test})
+
+    def test_multitask_evaluation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+
+        pipeline.samples = list(range(12))
+        # Perfect predictions of task "a", inverted predictions of task "b"
+        pipeline._predict = lambda e, d: (
+            [(i // 2) % 2 if i % 2 == 0 else 1 - (i // 2) % 2 for i in d],
+            [(i // 2) % 2 for i in d],
+        )
+
+        loss, metric = pipeline._evaluate_tasks(MagicMock(), list(range(12)))
+
+        self.assertEqual(pipeline.task_scores["a"], (0.0, 1.0))
+        self.assertEqual(pipeline.task_scores["b"], (1.0, 0.0))
+        self.assertAlmostEqual(loss, 0.5)
+        self.assertAlmostEqual(metric, 0.5)
+
+    @patch("chemlogic.utils.Pipeline.get_evaluator")
+    def test_multitask_ensemble(self, mock_get_evaluator):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+        evaluator = MagicMock()
+        evaluator.build_dataset.return_value.samples = list(range(12))
+        evaluator.state_dict.return_value = {"weights": {0: 0.0}}
+        mock_get_evaluator.return_value = evaluator
+
+        trained = []
+        pipeline._train_model = lambda e, d, ep, es, ed, **kwargs: (
+            trained.append(d) or [0.1]
+        )
+        # Perfect predictions of task "a", inverted predictions of task "b"
+        pipeline._predict = lambda e, d: (
+            [(i // 2) % 2 if i % 2 == 0 else 1 - (i // 2) % 2 for i in d],
+            [(i // 2) % 2 for i in d],
+        )
+
+        result = pipeline.train_ensemble(seeds=[0, 1], split_ratio=0.5)
+
+        molecules = pipeline.sample_molecules
+        tested = [i for i in range(12) if i not in trained[0]]
+        self.assertFalse(
+            {molecules[i] for i in trained[0]} & {molecules[i] for i in tested}
+        )
+        self.assertEqual(result["members"][0]["task_scores"]["a"][1], 1.0)
+        self.assertEqual(pipeline.task_scores["b"][1], 0.0)
+        self.assertAlmostEqual(result["ensemble"]["metric"], 0.5)
+
+    def test_multitask_inference(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+        self.assertEqual(pipeline.output_names, ["predict_a", "predict_b"])
+
+        current = {"weights": {0: 1.0}}
+        pipeline.evaluator = MagicMock()
+        pipeline.evaluator.state_dict.side_effect = lambda: current
+        pipeline.evaluator.load_state_dict.side_effect = current.update
+        pipeline.evaluator.test.side_effect = lambda built, generator=False: [
+            current["weights"][0] * k for k in range(4)
+        ]
+
+        self.assertEqual(
+            pipeline.inference(["C", "invalid", "CO"]), [[0.0, 1.0], None, [2.0, 3.0]]
+        )
+        # Every molecule is queried once for the outputs of all tasks
+        dataset = pipeline.evaluator.build_dataset.call_args.args[0]
+        self.assertEqual(len(dataset._examples), 2)
+        self.assertEqual(
+            [[str(query) for query in queries] for queries in dataset._queries],
+            [["predict_a.", "predict_b."]] * 2,
+        )
+
+        pipeline.ensemble = [{"weights": {0: 1.0}}, {"weights": {0: 3.0}}]
+        predictions, std = pipeline.ensemble_inference(["C", "CO"], return_std=True)
+        self.assertEqual(predictions, [[0.0, 2.0], [4.0, 6.0]])
+        self.assertEqual(std, [[0.0, 1.0], [2.0, 3.0]])
+
+    def test_multitask_rejects_per_molecule_builds(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+
+        for options in [
+            {"profile": True},
+            {"workers": 2},
+            {"schedule": "sorted"},
+            {"budget": GroundingBudget(max_neurons=100)},
+        ]:
+            with self.assertRaises(ValueError):
+                pipeline._build_dataset(MagicMock(), **options)
+
+    def test_multitask_extend_raises(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self._multitask_pipeline(directory)
+        pipeline.evaluator = MagicMock()
+
+        with self.assertRaises(ValueError):
+            pipeline.extend(queries="queries.txt")
+
+    def test_compare_models_outputs(self):
+        pipeline = Pipeline(**{**self.default_args, "model_name": ["gnn", "rgcn"]})
+
+        heads = {
+            rule.head.predicate.name
+            for rule in pipeline.template.template
+            if hasattr(rule, "head")
+        }
+        self.assertIn("predict_gnn", heads)
+        self.assertIn("predict_rgcn", heads)
+        self.assertNotIn("predict", heads)
+        self.assertEqual(pipeline.tasks, ["gnn", "rgcn"])
+
+        with open(pipeline.dataset.data.queries_file) as f:
+            query = f.readline().strip()
+        label = query.split()[0]
+        self.assertEqual(query, f"{label} predict_gnn, {label} predict_rgcn.")
+        self.assertEqual(pipeline.sample_molecules[:4], [0, 0, 1, 1])
+        self.assertEqual(pipeline.sample_tasks[:4], [0, 1, 0, 1])
+
+        train, test = pipeline._split(
+            list(range(len(pipeline.sample_tasks))), train_size=0.75
+        )
+        self.assertFalse(
+            {pipeline.sample_molecules[i] for i in train}
+            & {pipeline.sample_molecules[i] for i in test}
+        )
+
+    def test_compare_models_queries_removed_with_dataset(self):
+        pipeline = Pipeline(**{**self.default_args, "model_name": ["gnn", "rgcn"]})
+        directory = os.path.dirname(pipeline.dataset.data.queries_file)
+        self.assertTrue(os.path.isdir(directory))
+
+        del pipeline
+        gc.collect()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_compare_models_invalid(self):
+        with self.assertRaises(ValueError):
+            Pipeline(**{**self.default_args, "model_name": ["kgnn", "kgnn_local"]})
+        with self.assertRaises(ValueError):
+            Pipeline(
+                **{**self.default_args, "model_name": ["gnn", "rgcn"]},
+                architecture=ArchitectureType.CCD,
+            )
+
+
+def jvm_available() -> bool:
+    try:
+        jpype.getDefaultJVMPath()
+    except jpype.JVMNotFoundException:
+        return False
+    return True
+
+
+@unittest.skipUnless(jvm_available(), "The backend requires a JVM.")
+class TestPipelineBackend(unittest.TestCase):
+    smiles = ["CCO", "c1ccccc1N(=O)=O", "not a smiles"]
+
+    def setUp(self):
+        self.default_args = {
+            "dataset_name": "mutagen",
+            "model_name": "gnn",
+            "param_size": 2,
+            "layers": 2,
+        }
+
+    def test_ensemble_grounds_once(self):
+        pipeline = Pipeline(**self.default_args)
+
+        with patch.object(
+            pipeline, "_build_dataset", wraps=pipeline._build_dataset
+        ) as build:
+            results = pipeline.train_ensemble(seeds=[0, 1], epochs=2)
+            repeated = pipeline.train_ensemble(seeds=[0, 1], epochs=2)
+
+        # Each ensemble grounds the dataset once for all of its members
+        self.assertEqual(build.call_count, 2)
+        self.assertEqual(len(pipeline.ensemble), 2)
+        # The members are seeded, so training the ensemble again gives the same results
+        self.assertEqual(
+            [member["test_loss"] for member in results["members"]],
+            [member["test_loss"] for member in repeated["members"]],
+        )
+
+        predictions, deviations = pipeline.ensemble_inference(
+            self.smiles, return_std=True
+        )
+        self.assertEqual(len(predictions), 3)
+        self.assertIsNone(predictions[2])
+        self.assertIsNone(deviations[2])
+        self.assertTrue(all(p is not None for p in predictions[:2]))
+
+    def test_cross_validate_grounds_once(self):
+        pipeline = Pipeline(**self.default_args)
+
+        with patch.object(
+            pipeline, "_build_dataset", wraps=pipeline._build_dataset
+        ) as build:
+            results = pipeline.cross_validate(k=3, epochs=2, seed=0)
+
+        build.assert_called_once()
+        self.assertEqual([fold["fold"] for fold in results["folds"]], [0, 1, 2])
+        # The folds and weights are seeded, so cross-validating again gives the same results
+        repeated = pipeline.cross_validate(k=3, epochs=2, seed=0)
+        self.assertEqual(
+            [fold["test_loss"] for fold in results["folds"]],
+            [fold["test_loss"] for fold in repeated["folds"]],
+        )
+
+    def test_multitask(self):
+        tasks = ["cyp2c9_substrate", "cyp2d6_substrate"]
+        pipeline = Pipeline(
+            **self.default_args, dataset=MultiTaskDataset(tasks, param_size=2)
+        )
+
+        pipeline.train_test_cycle(epochs=2)
+        self.assertEqual(set(pipeline.task_scores), set(tasks))
+        predictions = pipeline.inference(self.smiles)
+        self.assertEqual([len(p) for p in predictions[:2]], [2, 2])
+        self.assertIsNone(predictions[2])
+
+        results = pipeline.train_ensemble(seeds=[0, 1], epochs=2)
+        self.assertEqual(
+            set(results["members"][0]["task_scores"]), set(pipeline.task_scores)
+        )
+        predictions = pipeline.ensemble_inference(self.smiles)
+        self.assertEqual([len(p) for p in predictions[:2]], [2, 2])
+        self.assertIsNone(predictions[2])
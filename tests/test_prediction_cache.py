@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from neuralogic.core import R, V
+
+from chemlogic.datasets.utils.smiles_conversion import canonical_smiles
+from chemlogic.utils.InferenceEngine import InferenceEngine
+from chemlogic.utils.PredictionCache import PredictionCache
+from chemlogic.utils.state import model_fingerprint
+
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def predict(smiles_list):
+            self.calls.append(list(smiles_list))
+            return [float(len(smiles)) for smiles in smiles_list]
+
+        self.predict = predict
+
+    def test_canonical_smiles(self):
+        self.assertEqual(canonical_smiles("OCC"), canonical_smiles("C(O)C"))
+        self.assertIsNone(canonical_smiles("not a molecule"))
+
+    def test_deduplicates_equivalent_smiles(self):
+        cache = PredictionCache()
+        predictions = cache.predict(
+            "model", ["CCO", "OCC", "C(O)C", "c1ccccc1"], self.predict
+        )
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(self.calls[0]), 2)
+        self.assertEqual(predictions[0], predictions[1])
+        self.assertEqual(predictions[1], predictions[2])
+        self.assertEqual(cache.stats()["duplicates"], 2)
+
+    def test_hits_and_invalid(self):
+        cache = PredictionCache()
+        cache.predict("model", ["CCO", "CC"], self.predict)
+        predictions = cache.predict("model", ["OCC", "x((", "N"], self.predict)
+
+        self.assertIsNone(predictions[1])
+        self.assertEqual(self.calls[-1], ["N"])
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["invalid"], 1)
+        self.assertAlmostEqual(stats["hit_rate"], 0.25)
+
+        cache.reset_stats()
+        self.assertEqual(cache.stats()["hit_rate"], 0.0)
+
+    def test_fingerprints_are_separate(self):
+        cache = PredictionCache()
+        cache.predict("model", ["CCO"], self.predict)
+        cache.predict("retrained", ["CCO"], self.predict)
+
+        self.assertEqual(len(self.calls), 2)
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(max_size=2)
+        cache.predict("model", ["C", "CC"], self.predict)
+        cache.predict("model", ["C"], self.predict)
+        cache.predict("model", ["CCC"], self.predict)
+
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.get("model", "C")[0])
+        self.assertFalse(cache.get("model", "CC")[0])
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache", "predictions.sqlite")
+            cache = PredictionCache(path=path)
+            cache.predict("model", ["CCO", "CC"], self.predict)
+            cache.close()
+
+            reopened = PredictionCache(path=path)
+            predictions = reopened.predict("model", ["OCC", "CC"], self.predict)
+
+            self.assertEqual(len(self.calls), 1)
+            self.assertEqual(predictions, [3.0, 2.0])
+            self.assertEqual(reopened.stats()["disk_hits"], 2)
+
+            reopened.clear()
+            self.assertFalse(reopened.get("model", "CC")[0])
+            reopened.close()
+
+    def test_model_fingerprint(self):
+        state = {"weights": {0: 0.5, 1: [1.0, 2.0]}, "weight_names": {0: "a", 1: "b"}}
+        changed = {"weights": {0: 0.6, 1: [1.0, 2.0]}, "weight_names": {0: "a", 1: "b"}}
+
+        self.assertEqual(model_fingerprint("t", state), model_fingerprint("t", state))
+        self.assertNotEqual(
+            model_fingerprint("t", state), model_fingerprint("t", changed)
+        )
+        self.assertNotEqual(
+            model_fingerprint("t", state), model_fingerprint("u", state)
+        )
+
+
+class TestInferenceEngineCache(unittest.TestCase):
+    def test_engine_with_cache(self):
+        built = []
+
+        def build_dataset(dataset):
+            built.append(dataset)
+            # A sample per query of every example
+            return MagicMock(
+                samples=[
+                    example
+                    for example, queries in zip(
+                        dataset._examples, dataset._queries, strict=True
+                    )
+                    for _ in queries
+                ]
+            )
+
+        pipeline = MagicMock(output_names=["predict"])
+        pipeline.template.template = [R.predict <= R.c(V.X)]
+        pipeline.fingerprint.return_value = "model"
+        pipeline.evaluator.build_dataset.side_effect = build_dataset
+        pipeline.evaluator.test.side_effect = lambda built_dataset, generator=False: [
+            float(len(example)) for example in built_dataset.samples
+        ]
+
+        engine = InferenceEngine(pipeline, cache=PredictionCache())
+        first = engine.predict(["CCO", "OCC", "x(("])
+        second = engine.predict(["C(O)C"])
+
+        self.assertEqual(first[0], first[1])
+        self.assertEqual(second, [first[0]])
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len(built[0]._queries), 1)
+
+        stats = engine.stats()
+        self.assertEqual(stats["invalid"], 1)
+        self.assertEqual(stats["cache"]["hits"], 1)
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from neuralogic.dataset import FileDataset
+
+from chemlogic.datasets.utils.molecules import read_examples
+from chemlogic.utils.GroundingProfiler import GroundingProfiler, size_bucket
+from chemlogic.utils.Pipeline import Pipeline
+
+
+def make_neuron(node_type, name):
+    neuron = MagicMock()
+    neuron.getClass.return_value.getSimpleName.return_value = node_type
+    neuron.name = name
+    return neuron
+
+
+def make_sample(neurons):
+    sample = MagicMock()
+    sample.java_sample.query.evidence.allNeuronsTopologic = neurons
+    return sample
+
+
+class TestGroundingProfiler(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = Pipeline("mutagen", "gnn", 1, 1)
+        self.directory = tempfile.TemporaryDirectory()
+
+        examples = os.path.join(self.directory.name, "examples.txt")
+        queries = os.path.join(self.directory.name, "queries.txt")
+        with open(examples, "w") as f:
+            f.write(
+                "<1> bond(0, 1, 2),<1> bond(1, 0, 2),<1> b_1(2),<1> c(0),<1> o(1).\n"
+            )
+            f.write(
+                ",".join(f"<1> c({i})" for i in range(20))
+                + ","
+                + ",".join(f"<1> bond({i}, {i + 1}, {100 + i})" for i in range(19))
+                + ".\n"
+            )
+        with open(queries, "w") as f:
+            f.write("1.0 predict.\n0.0 predict.\n")
+        self.dataset = FileDataset(examples_file=examples, queries_file=queries)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _evaluator(self):
+        def build_dataset(dataset, batch_size=1):
+            samples = [
+                make_sample(
+                    [
+                        make_neuron("FactNeuron", "c(0)"),
+                        make_neuron("AtomNeuron", "atom_embed(0)"),
+                        make_neuron(
+                            "WeightedRuleNeuron",
+                            "gnn_1(0) :- atom_embed(0), atom_embed(1), bond(0, 1, 2), bond_embed(2)",
+                        ),
+                    ]
+                )
+                for _ in read_examples(dataset)
+            ]
+            return MagicMock(samples=samples)
+
+        evaluator = MagicMock()
+        evaluator.build_dataset.side_effect = build_dataset
+        return evaluator
+
+    def test_size_bucket(self):
+        self.assertEqual(size_bucket(3, (16, 32)), "0-15")
+        self.assertEqual(size_bucket(16, (16, 32)), "16-31")
+        self.assertEqual(size_bucket(40, (16, 32)), ">=32")
+
+    def test_profile_keeps_sample_order_and_buckets(self):
+        profiler = GroundingProfiler(self.pipeline.template, bucket_edges=(16,))
+        built = profiler.profile(self._evaluator(), self.dataset, "test")
+
+        self.assertEqual(len(built.samples), 2)
+        buckets = {row["bucket"] for row in profiler.table(per_bucket=True)}
+        self.assertEqual(buckets, {"0-15", ">=16"})
+
+    def test_rule_instances_attributed_to_origin(self):
+        profiler = GroundingProfiler(self.pipeline.template)
+        profiler.profile(self._evaluator(), self.dataset, "test")
+
+        origins = {row["origin"]: row for row in profiler.table(by="origin")}
+        self.assertEqual(origins["GNN"]["instances"], 2)
+        self.assertEqual(origins["MUTAG"]["neurons"], 2)
+        self.assertEqual(origins["facts"]["neurons"], 2)
+
+    def test_invalid_table_key(self):
+        profiler = GroundingProfiler(self.pipeline.template)
+        with self.assertRaises(ValueError):
+            profiler.table(by="invalid")
+
+    def test_export(self):
+        profiler = GroundingProfiler(self.pipeline.template)
+        profiler.profile(self._evaluator(), self.dataset, "test")
+
+        csv_path = os.path.join(self.directory.name, "profile.csv")
+        json_path = os.path.join(self.directory.name, "profile.json")
+        profiler.to_csv(csv_path)
+        profiler.to_json(json_path)
+
+        with open(csv_path) as f:
+            self.assertTrue(f.readline().startswith("dataset,bucket,rule,origin"))
+        with open(json_path) as f:
+            self.assertEqual(len(json.load(f)["records"]), len(profiler.records))
+
+
+class TestRuleOrigins(unittest.TestCase):
+    def test_pipeline_template_tracks_origins(self):
+        pipeline = Pipeline("mutagen", "gnn", 1, 1, subgraphs=True, max_cycle_size=5)
+        origins = {pipeline.template.rule_origin(r) for r in pipeline.template.template}
+
+        self.assertIn("MUTAG", origins)
+        self.assertIn("GNN", origins)
+        self.assertIn("CyclePattern", origins)
@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import optuna
+
+from chemlogic.main import main
+from chemlogic.utils.ResultCache import ResultCache
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+def make_pipeline():
+    pipeline = MagicMock()
+    pipeline.dataset.connection = "bond"
+    pipeline.costs = {"build_time": 2.0, "train_time": 3.0}
+    pipeline.neuron_count.return_value = 100
+    # The metric depends on the seed of the weights
+    pipeline.train_test_cycle.side_effect = lambda *args, seed, **kwargs: (
+        0.1,
+        0.2,
+        0.8 + seed / 10,
+        MagicMock(),
+    )
+    return pipeline
+
+
+class TestResultCache(unittest.TestCase):
+    def test_key_normalizes_floats(self):
+        cache = ResultCache(optuna.create_study())
+
+        self.assertEqual(
+            cache.key(layers=2, learning_rate=0.0012345),
+            cache.key(learning_rate=0.001234, layers=2),
+        )
+        self.assertNotEqual(
+            cache.key(layers=2, learning_rate=0.0012),
+            cache.key(layers=2, learning_rate=0.0013),
+        )
+        self.assertNotEqual(
+            ResultCache(optuna.create_study(), precision=None).key(
+                learning_rate=0.0012345
+            ),
+            ResultCache(optuna.create_study(), precision=None).key(
+                learning_rate=0.001234
+            ),
+        )
+
+    def test_repeats_are_aggregated(self):
+        study = optuna.create_study(direction="maximize")
+        cache = ResultCache(study, repeats=2)
+
+        results = []
+        for metric in [0.6, 0.8, 0.5]:
+            trial = study.ask()
+            result, seed = cache.lookup(trial, "config")
+            if result is None:
+                trial.set_user_attr("costs", {"neurons": 10})
+                result = cache.record(trial, "config", metric, seed)
+            study.tell(trial, result)
+            results.append((result, seed))
+
+        self.assertEqual(results[0], (0.6, 0))
+        self.assertAlmostEqual(results[1][0], 0.7)
+        self.assertEqual(results[1][1], 1)
+        # The third run is memoized
+        self.assertAlmostEqual(results[2][0], 0.7)
+        self.assertIsNone(results[2][1])
+        self.assertTrue(study.trials[2].user_attrs["memoized"])
+        self.assertEqual(study.trials[2].user_attrs["costs"], {"neurons": 10})
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_concurrent_runs_claim_different_seeds(self):
+        study = optuna.create_study(direction="maximize")
+        cache = ResultCache(study, repeats=2)
+
+        first, second = study.ask(), study.ask()
+        self.assertEqual(cache.lookup(first, "config"), (None, 0))
+        self.assertEqual(cache.lookup(second, "config"), (None, 1))
+
+        study.tell(first, cache.record(first, "config", 0.6, 0))
+        self.assertAlmostEqual(cache.record(second, "config", 0.8, 1), 0.7)
+        study.tell(second, 0.7)
+        self.assertAlmostEqual(cache.lookup(study.ask(), "config")[0], 0.7)
+
+    def test_runs_with_repeated_seed_counted_once(self):
+        study = optuna.create_study(direction="maximize")
+        cache = ResultCache(study, repeats=2)
+
+        for result in [0.6, 0.8]:
+            trial = study.ask()
+            study.tell(trial, cache.record(trial, "config", result, 0))
+
+        self.assertEqual([run["result"] for run in cache.runs("config")], [0.6])
+        self.assertEqual(cache.lookup(study.ask(), "config"), (None, 1))
+
+    def test_failed_runs_are_not_recorded(self):
+        study = optuna.create_study()
+        cache = ResultCache(study)
+
+        trial = study.ask()
+        cache.lookup(trial, "config")
+        study.tell(trial, state=optuna.trial.TrialState.FAIL)
+
+        self.assertEqual(cache.lookup(study.ask(), "config"), (None, 0))
+
+    def test_invalid_repeats(self):
+        with self.assertRaises(ValueError):
+            ResultCache(optuna.create_study(), repeats=0)
+
+
+class TestMainResultCache(unittest.TestCase):
+    @patch("chemlogic.main.mlflow")
+    @patch("chemlogic.main.Pipeline")
+    def test_duplicate_configurations_are_memoized(self, mock_pipeline, mock_mlflow):
+        mock_pipeline.side_effect = lambda *args, **kwargs: make_pipeline()
+        study = optuna.create_study(direction="maximize")
+        cache = ResultCache(study, repeats=2)
+
+        for lr in [0.01, 0.01, 0.010001, 0.001]:
+            study.enqueue_trial({"param_size": 3, "layers": 2, "learning_rate": lr})
+        study.optimize(
+            lambda trial: main(
+                trial, "mutagen", "gnn", False, False, "BARE", result_cache=cache
+            )[0],
+            n_trials=4,
+        )
+
+        values = [trial.value for trial in study.trials]
+        self.assertAlmostEqual(values[0], 0.8)
+        # The second run of the configuration is seeded differently and aggregated
+        self.assertAlmostEqual(values[1], 0.85)
+        self.assertAlmostEqual(values[2], 0.85)
+        self.assertAlmostEqual(values[3], 0.8)
+        self.assertEqual(mock_pipeline.call_count, 3)
+        self.assertTrue(study.trials[2].user_attrs["memoized"])
+        self.assertEqual(study.trials[2].user_attrs["costs"]["neurons"], 100)
+        mock_mlflow.log_param.assert_any_call("memoized", True)
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from neuralogic.dataset import FileDataset
+
+from chemlogic.datasets.utils.molecules import read_queries
+from chemlogic.utils.Pipeline import Pipeline
+from chemlogic.utils.SizeScheduler import SizeScheduler
+
+
+class TestSizeScheduler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        examples = os.path.join(self.directory.name, "examples.txt")
+        queries = os.path.join(self.directory.name, "queries.txt")
+
+        self.sizes = [2, 30, 3, 20, 5, 4]
+        with open(examples, "w") as f:
+            for size in self.sizes:
+                f.write(
+                    ",".join(f"c({i})" for i in range(size))
+                    + ","
+                    + ",".join(
+                        f"bond({i}, {i + 1}, {100 + i})" for i in range(size - 1)
+                    )
+                    + ".\n"
+                )
+        with open(queries, "w") as f:
+            f.writelines(f"{i}.0 predict.\n" for i in range(len(self.sizes)))
+        self.dataset = FileDataset(examples_file=examples, queries_file=queries)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_invalid_strategy(self):
+        with self.assertRaises(ValueError):
+            SizeScheduler([1, 2], strategy="random")
+
+    def test_sorted_batches_group_similar_sizes(self):
+        scheduler = SizeScheduler.from_dataset(self.dataset, strategy="sorted")
+        batches = scheduler.batches(batch_count=2)
+
+        self.assertEqual(batches, [[0, 2, 5], [4, 3, 1]])
+
+    def test_sorted_batches_respect_budget(self):
+        scheduler = SizeScheduler([5, 5, 5, 20], strategy="sorted")
+
+        self.assertEqual(scheduler.batches(max_cost=10), [[0, 1], [2], [3]])
+
+    def test_balanced_batches(self):
+        scheduler = SizeScheduler.from_dataset(self.dataset)
+        batches = scheduler.batches(batch_count=2)
+        summary = scheduler.summary(scheduler.statistics(batches))
+
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(6)))
+        self.assertLess(summary["imbalance"], 1.2)
+
+    def test_batches_of_subset(self):
+        scheduler = SizeScheduler([1, 2, 3, 4], strategy="sorted")
+
+        self.assertEqual(scheduler.batches(batch_count=1, indices=[3, 0]), [[0, 3]])
+
+    def test_template_cost_grows_with_size(self):
+        pipeline = Pipeline("mutagen", "gnn", 1, 1)
+        scheduler = SizeScheduler.from_dataset(self.dataset, template=pipeline.template)
+
+        self.assertEqual(scheduler.costs.index(max(scheduler.costs)), 1)
+
+    def test_build_keeps_order(self):
+        evaluator = MagicMock()
+        evaluator.build_dataset.side_effect = lambda dataset: MagicMock(
+            samples=read_queries(dataset)
+        )
+        scheduler = SizeScheduler.from_dataset(self.dataset, strategy="sorted")
+        built = scheduler.build(evaluator, self.dataset, batch_count=3)
+
+        self.assertEqual(built.samples, read_queries(self.dataset))
+        self.assertEqual(len(scheduler.build_statistics), 3)
+        self.assertIn("time", scheduler.build_statistics[0])
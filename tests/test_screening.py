@@ -0,0 +1,186 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from chemlogic.cli import create_parser, main
+from chemlogic.utils.screening import chunks, read_smiles, score, screen
+
+
+class FakeEngine:
+    def __init__(self):
+        self.calls = 0
+        self.threads = set()
+
+    def predict(self, smiles_list):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        return [None if "(" in smiles else float(len(smiles)) for smiles in smiles_list]
+
+
+def read_output(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestScreening(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.smi = os.path.join(self.directory.name, "library.smi")
+        with open(self.smi, "w") as f:
+            f.write("C mol_a\nCCCC mol_b\n# comment\nx(( mol_c\nCC\n\nCCC mol_e\n")
+        self.output = os.path.join(self.directory.name, "predictions.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_smi(self):
+        self.assertEqual(
+            list(read_smiles(self.smi)),
+            [
+                ("mol_a", "C"),
+                ("mol_b", "CCCC"),
+                ("mol_c", "x(("),
+                ("4", "CC"),
+                ("mol_e", "CCC"),
+            ],
+        )
+
+    def test_read_csv(self):
+        path = os.path.join(self.directory.name, "library.csv")
+        with open(path, "w") as f:
+            f.write("name,SMILES\na,CC\nb,CCO\n")
+
+        self.assertEqual(
+            list(read_smiles(path, smiles_column="SMILES", id_column="name")),
+            [("a", "CC"), ("b", "CCO")],
+        )
+        self.assertEqual(
+            list(read_smiles(path, smiles_column="SMILES"))[1], ("1", "CCO")
+        )
+        with self.assertRaises(ValueError):
+            list(read_smiles(path))
+
+    def test_chunks(self):
+        self.assertEqual(list(chunks(iter(range(5)), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunks([], 3)), [])
+
+    def test_score(self):
+        self.assertEqual(score(0.5), 0.5)
+        self.assertEqual(score([0.25]), 0.25)
+        with self.assertRaises(ValueError):
+            score([0.1, 0.9])
+
+    def test_streams_all_predictions_in_order(self):
+        engines = [FakeEngine(), FakeEngine()]
+        stats = screen(engines, self.smi, self.output, chunk_size=2)
+
+        rows = read_output(self.output)
+        self.assertEqual(
+            [row["id"] for row in rows], ["mol_a", "mol_b", "mol_c", "4", "mol_e"]
+        )
+        self.assertEqual(rows[1]["prediction"], "4.0")
+        self.assertEqual(rows[2]["prediction"], "")
+        self.assertEqual(stats["molecules"], 5)
+        self.assertEqual(stats["invalid"], 1)
+        self.assertEqual(sum(engine.calls for engine in engines), 3)
+        self.assertNotIn(threading.current_thread().name, engines[0].threads)
+
+    def test_in_flight_chunks_bounded_by_engines(self):
+        fast = FakeEngine()
+
+        class SlowEngine(FakeEngine):
+            def predict(self, smiles_list):
+                if not self.calls:
+                    # The fast engine is free while the first chunk is evaluated
+                    time.sleep(0.5)
+                    self.fast_calls = fast.calls
+                return super().predict(smiles_list)
+
+        slow = SlowEngine()
+        stats = screen([slow, fast], self.smi, self.output, chunk_size=1)
+
+        self.assertEqual(stats["molecules"], 5)
+        self.assertEqual(slow.fast_calls, 1)
+        self.assertEqual(len(read_output(self.output)), 5)
+
+    def test_top_k(self):
+        screen([FakeEngine()], self.smi, self.output, chunk_size=2, top_k=2)
+        self.assertEqual(
+            [row["id"] for row in read_output(self.output)], ["mol_b", "mol_e"]
+        )
+
+        screen([FakeEngine()], self.smi, self.output, top_k=2, ascending=True)
+        rows = read_output(self.output)
+        self.assertEqual([row["id"] for row in rows], ["mol_a", "4"])
+        self.assertEqual(rows[0]["prediction"], "1.0")
+
+    def test_requires_engine(self):
+        with self.assertRaises(ValueError):
+            screen([], self.smi, self.output)
+
+
+class TestCommandLine(unittest.TestCase):
+    def test_parser(self):
+        args = create_parser().parse_args(
+            [
+                "screen",
+                "model",
+                "library.smi",
+                "out.csv",
+                "--workers",
+                "4",
+                "--top-k",
+                "10",
+            ]
+        )
+
+        self.assertEqual(args.model, "model")
+        self.assertEqual(args.workers, 4)
+        self.assertEqual(args.top_k, 10)
+        self.assertFalse(args.ascending)
+
+    def test_search_parser(self):
+        args = create_parser().parse_args(
+            ["search", "mutagen", "gnn", "--workers", "8", "--pruner", "median"]
+        )
+
+        self.assertEqual(args.dataset_name, "mutagen")
+        self.assertEqual(args.workers, 8)
+        self.assertEqual(args.pruner, "median")
+        self.assertEqual(args.architecture, "BARE")
+        self.assertEqual(args.storage, "study.log")
+        self.assertIsNone(args.repeats)
+
+    def test_screen_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            smi = os.path.join(directory, "library.smi")
+            output = os.path.join(directory, "out.csv")
+            with open(smi, "w") as f:
+                f.write("CC a\nC b\n")
+
+            with (
+                patch(
+                    "chemlogic.cli.InferenceEngine.load",
+                    side_effect=lambda *args, **kwargs: FakeEngine(),
+                ) as load,
+                patch("builtins.print"),
+            ):
+                main(
+                    [
+                        "screen",
+                        "model",
+                        smi,
+                        output,
+                        "--workers",
+                        "3",
+                        "--chunk-size",
+                        "1",
+                    ]
+                )
+
+            self.assertEqual(load.call_count, 3)
+            self.assertEqual(len(read_output(output)), 2)
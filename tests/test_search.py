@@ -0,0 +1,262 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import optuna
+
+from chemlogic.datasets.datasets import get_dataset
+from chemlogic.datasets.utils.molecules import read_queries
+from chemlogic.utils.GroundingCache import GroundingCache
+from chemlogic.utils.Pipeline import Pipeline
+from chemlogic.utils.search import (
+    _search_worker,
+    cheapest_configuration,
+    fail_worker_trials,
+    get_pruner,
+    get_storage,
+    multi_objective_search,
+    parallel_search,
+    stratified_order,
+    successive_halving,
+)
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+def objective(trial, trial_cache, pruning, crash_marker=None):
+    # The first trial kills its worker process
+    if crash_marker is not None and not os.path.exists(crash_marker):
+        open(crash_marker, "w").close()
+        os._exit(1)
+    if trial.number == 1:
+        raise ValueError("Failed trial")
+    return trial.suggest_float("x", 0, 1), None
+
+
+def fidelity_objective(trial, trial_cache, epochs, molecules, calls, **kwargs):
+    pipeline, _, _ = trial_cache.get(str(trial.number), MagicMock)
+    calls.append((trial.number, epochs, list(molecules), len(trial_cache)))
+    return trial.suggest_float("x", 0, 1), pipeline
+
+
+def cost_objective(trial, trial_cache, **kwargs):
+    layers = trial.suggest_int("layers", 1, 4)
+    trial.set_user_attr(
+        "costs", {"build_time": 1.0, "train_time": layers, "neurons": 10 * layers}
+    )
+    return layers / 4, None
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_storage(self):
+        self.assertIsInstance(
+            get_storage(os.path.join(self.path, "study.db")),
+            optuna.storages.RDBStorage,
+        )
+        self.assertIsInstance(
+            get_storage(os.path.join(self.path, "study.log")),
+            optuna.storages.JournalStorage,
+        )
+
+    def test_get_pruner(self):
+        self.assertIsNone(get_pruner(None))
+        self.assertIsInstance(get_pruner("median"), optuna.pruners.MedianPruner)
+        with self.assertRaises(ValueError):
+            get_pruner("random")
+
+    def test_fail_worker_trials(self):
+        study = optuna.create_study()
+        first, second = study.ask(), study.ask()
+        first.set_user_attr("worker_pid", 1)
+        second.set_user_attr("worker_pid", 2)
+
+        self.assertEqual(fail_worker_trials(study, 1), [first.number])
+        states = [trial.state for trial in study.trials]
+        self.assertEqual(
+            states, [optuna.trial.TrialState.FAIL, optuna.trial.TrialState.RUNNING]
+        )
+
+    def test_worker_continues_after_failed_trial(self):
+        storage = os.path.join(self.path, "study.log")
+        optuna.create_study(
+            study_name="study", storage=get_storage(storage), direction="maximize"
+        )
+
+        _search_worker(
+            0,
+            "study",
+            storage,
+            4,
+            os.path.join(self.path, "mlruns"),
+            None,
+            1,
+            objective,
+            {},
+        )
+
+        study = optuna.load_study(study_name="study", storage=get_storage(storage))
+        states = [trial.state.name for trial in study.trials]
+        self.assertEqual(states, ["COMPLETE", "FAIL", "COMPLETE", "COMPLETE"])
+        self.assertEqual(study.trials[0].user_attrs["worker_pid"], os.getpid())
+
+    def test_parallel_search_restarts_dead_worker(self):
+        study = parallel_search(
+            "study",
+            os.path.join(self.path, "study.log"),
+            6,
+            workers=2,
+            tracking_uri=os.path.join(self.path, "mlruns"),
+            seed=0,
+            poll_interval=0.1,
+            objective_function=objective,
+            crash_marker=os.path.join(self.path, "crashed"),
+        )
+
+        states = [trial.state.name for trial in study.trials]
+        self.assertNotIn("RUNNING", states)
+        self.assertGreaterEqual(len(states), 6)
+        # The crashed trial and trial 1 (unless it was the crashed one)
+        self.assertIn(states.count("FAIL"), [1, 2])
+        self.assertGreaterEqual(states.count("COMPLETE"), 4)
+
+    def test_stratified_order(self):
+        labels = ["1"] * 30 + ["0"] * 10
+        order = stratified_order(labels, seed=1)
+
+        self.assertEqual(sorted(order), list(range(40)))
+        for size in [4, 8, 20]:
+            positives = sum(labels[i] == "1" for i in order[:size])
+            self.assertLessEqual(abs(positives - size * 0.75), 1)
+        self.assertNotEqual(order, stratified_order(labels, seed=2))
+
+    @patch("chemlogic.utils.search.get_dataset")
+    def test_successive_halving(self, mock_get_dataset):
+        queries = os.path.join(self.path, "queries.txt")
+        with open(queries, "w") as f:
+            f.writelines(f"{i % 2}.0 predict.\n" for i in range(90))
+        mock_get_dataset.return_value = SimpleNamespace(
+            data=SimpleNamespace(queries_file=queries)
+        )
+
+        calls = []
+        study = optuna.create_study(
+            direction="maximize", sampler=optuna.samplers.RandomSampler(seed=0)
+        )
+        result = successive_halving(
+            study,
+            n_configs=9,
+            rungs=[(1 / 9, 10), (1 / 3, 30), (1.0, 90)],
+            eta=3,
+            objective_function=fidelity_objective,
+            dataset_name="mutagen",
+            calls=calls,
+        )
+
+        self.assertEqual([len(call[2]) for call in calls], [10] * 9 + [30] * 3 + [90])
+        # The subsets are nested
+        self.assertTrue(set(calls[0][2]) <= set(calls[9][2]) <= set(calls[12][2]))
+        # Only the promoted configurations are kept in the cache
+        self.assertEqual(calls[9][3], 3)
+
+        states = [trial.state.name for trial in study.trials]
+        self.assertEqual(states.count("PRUNED"), 8)
+        self.assertEqual(states.count("COMPLETE"), 1)
+        self.assertEqual(study.best_value, max(t.params["x"] for t in study.trials))
+        self.assertEqual(result["best_trial"], study.best_trial.number)
+        self.assertAlmostEqual(
+            result["relative_compute"],
+            (9 * 10 * 10 + 3 * 30 * 30 + 90 * 90) / (9 * 90 * 90),
+        )
+
+    @patch("chemlogic.main.mlflow")
+    @patch("chemlogic.utils.GroundingCache.get_evaluator")
+    @patch.object(Pipeline, "neuron_count", return_value=10)
+    @patch.object(Pipeline, "_evaluate_model", return_value=(0.2, 0.9))
+    @patch.object(Pipeline, "_train_model", return_value=[0.1])
+    def test_promotion_builds_only_new_molecules(
+        self, mock_train, mock_evaluate, mock_neurons, mock_get_evaluator, mock_mlflow
+    ):
+        builds = {}
+
+        def create_evaluator(template, settings):
+            evaluator = MagicMock()
+            builds[evaluator] = []
+            evaluator.build_dataset.side_effect = lambda dataset, batch_size: (
+                builds[evaluator].append(len(read_queries(dataset)))
+                or SimpleNamespace(samples=[object() for _ in read_queries(dataset)])
+            )
+            return evaluator
+
+        mock_get_evaluator.side_effect = create_evaluator
+        study = optuna.create_study(direction="maximize")
+        for layers in [1, 2, 3]:
+            study.enqueue_trial(
+                {"param_size": 2, "layers": layers, "learning_rate": 0.01}
+            )
+
+        successive_halving(
+            study,
+            n_configs=3,
+            rungs=[(1 / 3, 2), (1.0, 5)],
+            eta=3,
+            dataset_name="mutagen",
+            model_name="gnn",
+            chemical_rules=False,
+            subgraphs=False,
+            architecture="BARE",
+        )
+
+        # The promoted configuration keeps its evaluator and grounds only the molecules added by the full dataset
+        self.assertEqual(mock_get_evaluator.call_count, 3)
+        promoted = [counts for counts in builds.values() if len(counts) == 2]
+        self.assertEqual(len(promoted), 1)
+        molecules = len(
+            set(GroundingCache().molecule_keys(get_dataset("mutagen", 1).data))
+        )
+        self.assertEqual(sum(promoted[0]), molecules)
+        self.assertLess(promoted[0][1], molecules)
+
+    def test_multi_objective_search(self):
+        storage = os.path.join(self.path, "study.log")
+        study, front = multi_objective_search(
+            12, "study", storage, seed=0, objective_function=cost_objective
+        )
+
+        self.assertEqual(len(study.trials), 12)
+        self.assertEqual(len(study.directions), 4)
+        # Every number of layers trades the metric for the cost
+        self.assertEqual(
+            {row["params"]["layers"] for row in front},
+            {trial.params["layers"] for trial in study.trials},
+        )
+        self.assertEqual(front[0]["neurons"], 10 * front[0]["params"]["layers"])
+        self.assertEqual(
+            sorted(front, key=lambda row: row["metric"], reverse=True), front
+        )
+
+    def test_cheapest_configuration(self):
+        front = [
+            {"metric": 0.9, "neurons": 400, "train_time": 4.0},
+            {"metric": 0.89, "neurons": 200, "train_time": 5.0},
+            {"metric": 0.8, "neurons": 100, "train_time": 1.0},
+        ]
+
+        self.assertEqual(cheapest_configuration(front)["neurons"], 200)
+        self.assertEqual(cheapest_configuration(front, tolerance=0)["neurons"], 400)
+        self.assertEqual(
+            cheapest_configuration(front, tolerance=0.1, cost="train_time")["neurons"],
+            100,
+        )
+        with self.assertRaises(ValueError):
+            cheapest_configuration(front, cost="metric")
+        with self.assertRaises(ValueError):
+            cheapest_configuration([])
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+import jpype
+from neuralogic.core import Settings
+from neuralogic.dataset import FileDataset
+from neuralogic.nn import get_evaluator
+
+from chemlogic.datasets.utils.molecules import read_queries, subset_dataset
+from chemlogic.utils.Pipeline import Pipeline
+from chemlogic.utils.sharding import build_dataset_sharded, shard_indices
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        examples = os.path.join(self.directory.name, "examples.txt")
+        queries = os.path.join(self.directory.name, "queries.txt")
+
+        sizes = [2, 12, 3, 7, 5, 4]
+        with open(examples, "w") as f:
+            for size in sizes:
+                f.write(
+                    ",".join(f"c({i})" for i in range(size))
+                    + ","
+                    + ",".join(
+                        f"bond({i}, {i + 1}, {100 + i})" for i in range(size - 1)
+                    )
+                    + ".\n"
+                )
+        with open(queries, "w") as f:
+            f.writelines(f"{i}.0 predict.\n" for i in range(len(sizes)))
+        self.dataset = FileDataset(examples_file=examples, queries_file=queries)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _evaluator(self):
+        def build_dataset(dataset, batch_size=1):
+            return MagicMock(samples=read_queries(dataset))
+
+        evaluator = MagicMock()
+        evaluator.build_dataset.side_effect = build_dataset
+        return evaluator
+
+    def test_shard_indices_balanced(self):
+        costs = [10, 1, 1, 1, 9, 1, 1]
+        shards = shard_indices(costs, 2)
+
+        self.assertEqual(sorted(i for shard in shards for i in shard), list(range(7)))
+        self.assertEqual([sum(costs[i] for i in shard) for shard in shards], [12, 12])
+        self.assertEqual(shards[0], sorted(shards[0]))
+
+    def test_shard_indices_drops_empty(self):
+        self.assertEqual(shard_indices([1, 1], 4), [[0], [1]])
+        with self.assertRaises(ValueError):
+            shard_indices([1], 0)
+
+    def test_merge_keeps_order(self):
+        evaluator = self._evaluator()
+        built = build_dataset_sharded(evaluator, self.dataset, workers=3)
+
+        self.assertEqual(built.samples, read_queries(self.dataset))
+        self.assertEqual(evaluator.build_dataset.call_count, 3)
+
+    def test_shards_built_concurrently_on_own_files(self):
+        barrier = threading.Barrier(3, timeout=5)
+        datasets = []
+
+        def build_dataset(dataset, batch_size=1):
+            # Fails unless all shards are being built at the same time
+            barrier.wait()
+            datasets.append(dataset)
+            return MagicMock(samples=read_queries(dataset))
+
+        evaluator = MagicMock()
+        evaluator.build_dataset.side_effect = build_dataset
+        built = build_dataset_sharded(
+            evaluator, self.dataset, workers=3, concurrent=True
+        )
+
+        self.assertEqual(built.samples, read_queries(self.dataset))
+        self.assertEqual(len({dataset.queries_file for dataset in datasets}), 3)
+        self.assertTrue(all(isinstance(d, FileDataset) for d in datasets))
+
+    def test_shards_built_one_after_another(self):
+        running = []
+        overlaps = []
+
+        def build_dataset(dataset, batch_size=1):
+            overlaps.append(bool(running))
+            running.append(dataset)
+            result = MagicMock(samples=read_queries(dataset))
+            running.remove(dataset)
+            return result
+
+        evaluator = MagicMock()
+        evaluator.build_dataset.side_effect = build_dataset
+        built = build_dataset_sharded(evaluator, self.dataset, workers=3)
+
+        self.assertEqual(built.samples, read_queries(self.dataset))
+        self.assertEqual(overlaps, [False] * 3)
+
+    def test_other_datasets_built_directly(self):
+        evaluator = self._evaluator()
+        dataset = MagicMock()
+        build_dataset_sharded(evaluator, dataset, workers=3)
+
+        evaluator.build_dataset.assert_called_once_with(dataset, batch_size=1)
+
+    def test_single_worker_builds_directly(self):
+        evaluator = self._evaluator()
+        build_dataset_sharded(evaluator, self.dataset, workers=1)
+
+        evaluator.build_dataset.assert_called_once_with(self.dataset, batch_size=1)
+
+    def test_pipeline_rejects_profiled_sharded_build(self):
+        pipeline = Pipeline("mutagen", "gnn", 1, 1)
+        with self.assertRaises(ValueError):
+            pipeline._build_dataset(MagicMock(), profile=True, workers=2)
+
+
+def jvm_available() -> bool:
+    try:
+        jpype.getDefaultJVMPath()
+    except jpype.JVMNotFoundException:
+        return False
+    return True
+
+
+@unittest.skipUnless(jvm_available(), "The backend requires a JVM.")
+class TestShardingBackend(unittest.TestCase):
+    def test_sharded_build_matches_plain_build(self):
+        pipeline = Pipeline("mutagen", "gnn", 2, 2)
+        evaluator = get_evaluator(pipeline.template, Settings())
+
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = subset_dataset(pipeline.dataset.data, list(range(24)), directory)
+
+            def fingerprint(built_dataset):
+                neurons = [
+                    len(sample.java_sample.query.evidence.allNeuronsTopologic)
+                    for sample in built_dataset.samples
+                ]
+                return neurons, list(evaluator.test(built_dataset, generator=False))
+
+            plain = fingerprint(evaluator.build_dataset(dataset))
+            for concurrent in [False, True]:
+                sharded = build_dataset_sharded(
+                    evaluator, dataset, workers=4, concurrent=concurrent
+                )
+                neurons, predictions = fingerprint(sharded)
+                self.assertEqual(neurons, plain[0])
+                for prediction, expected in zip(predictions, plain[1], strict=True):
+                    self.assertAlmostEqual(float(prediction), float(expected))
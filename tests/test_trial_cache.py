@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import optuna
+from neuralogic.dataset import FileDataset
+from optuna.trial import FixedTrial
+
+from chemlogic.datasets.utils.molecules import read_queries
+from chemlogic.main import main
+from chemlogic.utils.TrialCache import TrialCache
+
+
+def make_pipeline():
+    pipeline = MagicMock()
+    pipeline.dataset.connection = "bond"
+    pipeline.train_test_cycle.return_value = (0.1, 0.2, 0.9, MagicMock())
+    pipeline.costs = {"build_time": 2.0, "train_time": 3.0}
+    pipeline.neuron_count.return_value = 100
+    return pipeline
+
+
+class TestTrialCache(unittest.TestCase):
+    def test_key_ignores_argument_order(self):
+        self.assertEqual(
+            TrialCache.key(layers=2, param_size=3),
+            TrialCache.key(param_size=3, layers=2),
+        )
+        self.assertNotEqual(
+            TrialCache.key(layers=2, param_size=3),
+            TrialCache.key(layers=3, param_size=3),
+        )
+
+    def test_get_reuses_pipeline(self):
+        cache = TrialCache()
+        create = MagicMock(side_effect=make_pipeline)
+
+        pipeline, grounding_cache, hit = cache.get("a", create)
+        self.assertFalse(hit)
+        self.assertEqual(grounding_cache.connection, "bond")
+
+        self.assertEqual(cache.get("a", create), (pipeline, grounding_cache, True))
+        create.assert_called_once()
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_least_recently_used_evicted(self):
+        cache = TrialCache(max_size=2)
+        create = MagicMock(side_effect=make_pipeline)
+
+        cache.get("a", create)
+        cache.get("b", create)
+        cache.get("a", create)
+        cache.get("c", create)
+
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.get("b", create)[2])
+        self.assertTrue(cache.get("c", create)[2])
+
+        with self.assertRaises(ValueError):
+            TrialCache(max_size=0)
+
+
+class TestMainTrialCache(unittest.TestCase):
+    @patch("chemlogic.main.mlflow")
+    @patch("chemlogic.main.Pipeline")
+    def test_trials_differing_in_learning_rate_share_pipeline(
+        self, mock_pipeline, mock_mlflow
+    ):
+        mock_pipeline.side_effect = lambda *args, **kwargs: make_pipeline()
+        cache = TrialCache()
+
+        def run(lr, layers=2):
+            trial = FixedTrial({"param_size": 3, "layers": layers, "learning_rate": lr})
+            return main(
+                trial, "mutagen", "gnn", False, False, "BARE", trial_cache=cache
+            )[1]
+
+        first = run(0.01)
+        second = run(0.001)
+        third = run(0.01, layers=3)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(mock_pipeline.call_count, 2)
+        self.assertIs(
+            first.train_test_cycle.call_args_list[0].kwargs["grounding_cache"],
+            first.train_test_cycle.call_args_list[1].kwargs["grounding_cache"],
+        )
+        self.assertEqual(first.train_test_cycle.call_args_list[1].args[0], 0.001)
+        mock_mlflow.log_param.assert_any_call("trial_cache_hit", True)
+        mock_mlflow.log_metric.assert_any_call("trial_cache_hit_rate", 1 / 3)
+
+
+class TestMainPruning(unittest.TestCase):
+    @patch("chemlogic.main.mlflow")
+    @patch("chemlogic.main.Pipeline")
+    def test_pruned_trial(self, mock_pipeline, mock_mlflow):
+        pipeline = make_pipeline()
+        mock_pipeline.return_value = pipeline
+
+        def train_test_cycle(*args, epoch_callback, **kwargs):
+            self.assertFalse(epoch_callback(1, 0.5, None))
+            self.assertTrue(epoch_callback(10, 0.5, 0.6))
+            return 0.1, 0.2, 0.6, MagicMock()
+
+        pipeline.train_test_cycle.side_effect = train_test_cycle
+        trial = MagicMock()
+        trial.suggest_int.return_value = 2
+        trial.suggest_float.return_value = 0.01
+        trial.should_prune.return_value = True
+
+        with self.assertRaises(optuna.TrialPruned):
+            main(trial, "mutagen", "gnn", False, False, "BARE", pruning=True)
+
+        trial.report.assert_called_once_with(0.6, 10)
+        self.assertEqual(
+            pipeline.train_test_cycle.call_args.kwargs["validation_split"], 0.1
+        )
+        mock_mlflow.log_param.assert_any_call("pruned", True)
+
+
+class TestMainSubset(unittest.TestCase):
+    @patch("chemlogic.main.mlflow")
+    @patch("chemlogic.main.Pipeline")
+    def test_trains_on_molecule_subset(self, mock_pipeline, mock_mlflow):
+        with tempfile.TemporaryDirectory() as directory:
+            queries = os.path.join(directory, "queries.txt")
+            with open(queries, "w") as f:
+                f.writelines(f"{i}.0 predict.\n" for i in range(5))
+            full_data = FileDataset(queries_file=queries)
+
+            pipeline = make_pipeline()
+            pipeline.dataset.data = full_data
+            mock_pipeline.return_value = pipeline
+            trained = []
+            pipeline.train_test_cycle.side_effect = lambda *args, **kwargs: (
+                trained.append((args[1], read_queries(pipeline.dataset.data)))
+                or (0.1, 0.2, 0.9, MagicMock())
+            )
+
+            trial = FixedTrial({"param_size": 3, "layers": 2, "learning_rate": 0.01})
+            main(
+                trial,
+                "mutagen",
+                "gnn",
+                False,
+                False,
+                "BARE",
+                epochs=20,
+                molecules=[1, 3],
+            )
+
+        self.assertEqual(trained, [(20, ["1.0 predict.", "3.0 predict."])])
+        self.assertIs(pipeline.dataset.data, full_data)
+        mock_mlflow.log_param.assert_any_call("molecules", 2)